@@ -2,6 +2,8 @@
 ASGI config for ocr_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn ocr_project.asgi:application``) so the
+task status streams of memory/tasks/events/ and memory/tasks/wait/ hold no worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -161,3 +162,168 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Translation memory import jobs
+# Uploaded TMX/XLSX files are stored here until a `run_import_worker` process imports them
+
+MEMORY_IMPORT_DIR = BASE_DIR / 'imports'
+
+IMPORT_WORKER_POLL_INTERVAL = 2  # seconds between queue checks of an idle worker
+
+IMPORT_JOB_STALE_AFTER = 600  # seconds without progress before a running job is requeued
+
+
+# Translation memory lookup cache
+# Exact-match maps per language pair, held in each worker process and invalidated by memory_pair_versions
+
+TM_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+TM_BATCH_LOOKUP_MAX = 1000  # source texts accepted per memory/get-by-source-text/batch/ call
+
+
+# Fuzzy translation memory matches
+# Source texts are indexed into MinHash LSH buckets on write; candidates are scored by edit-distance similarity
+
+TM_FUZZY_ENABLED = True
+
+TM_FUZZY_MIN_SCORE = 0.75  # default minimum similarity (0-1) for a fuzzy match to be returned
+
+TM_FUZZY_MAX_CANDIDATES = 25  # candidates scored per query, ranked by shared buckets
+
+
+# GPT translation
+# Segments are translated concurrently; the limits are shared by every request using the same API key
+
+GPT_MODEL = "gpt-4o-mini"
+
+GPT_MAX_CONCURRENCY = 8  # calls in flight per translation request
+
+GPT_REQUESTS_PER_MINUTE = 500
+
+GPT_TOKENS_PER_MINUTE = 200000
+
+GPT_REQUEST_TIMEOUT = 60  # seconds
+
+GPT_MAX_RETRIES = 5  # retries of a call failing with 429, 5xx or a connection error
+
+GPT_RETRY_BASE_DELAY = 1.0  # seconds, doubled on each retry
+
+GPT_RETRY_MAX_DELAY = 30.0
+
+GPT_BATCH_ENABLED = True  # pack several segments into one JSON prompt
+
+GPT_BATCH_MAX_TOKENS = 1500  # estimated prompt tokens of the segments in one batch
+
+GPT_BATCH_MAX_SEGMENTS = 40
+
+GPT_BATCH_MAX_OUTPUT_TOKENS = 8000  # completion allowance of a batch call
+
+GPT_SEGMENT_MAX_TOKENS = 400  # estimated tokens above which a segment is split at sentence boundaries
+
+GPT_STREAM_PROGRESS_INTERVAL = 5  # seconds between progress frames of a streamed translation while no batch finishes
+
+
+# Machine translation write-back
+# GPT results are buffered in memory and saved to the TM in bulk by a background thread
+
+MT_WRITEBACK_INTERVAL = 5  # seconds between flushes
+
+MT_WRITEBACK_BATCH_SIZE = 500  # pending translations that trigger an early flush
+
+MT_MEMORY_ASSET_NAME = "Machine translations"  # asset created per language pair for saved machine translations
+
+
+# External services
+# Overridable from the environment, e.g. to run against the servers of `manage.py run_fake_servers`
+
+ABBYY_BASE_URL = os.environ.get('ABBYY_BASE_URL', 'https://cloud-westus.ocrsdk.com')
+
+# Used until credentials are saved through memory/settings/, never committed
+ABBYY_APPLICATION_ID = os.environ.get('ABBYY_APPLICATION_ID', '')
+
+ABBYY_PASSWORD = os.environ.get('ABBYY_PASSWORD', '')
+
+ABBYY_POOL_SIZE = 32  # keep-alive connections per host in each worker process
+
+ABBYY_CONNECT_TIMEOUT = 5  # seconds
+
+ABBYY_READ_TIMEOUT = 30  # seconds without a byte from processImage / getTaskStatus
+
+ABBYY_DOWNLOAD_TIMEOUT = 60  # seconds without a byte while downloading a result
+
+ABBYY_MAX_RETRIES = 3  # retries of getTaskStatus and result downloads, processImage is never repeated
+
+ABBYY_RETRY_BASE_DELAY = 0.5
+
+ABBYY_RETRY_MAX_DELAY = 10.0
+
+OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1')
+
+
+# OCR tasks
+# Status requests are answered from the ocr_tasks registry, ABBYY is polled at most once per interval per task
+
+OCR_POLL_INTERVAL = 3  # seconds between getTaskStatus calls for one task
+
+OCR_RESULT_DIR = BASE_DIR / 'ocr_results'  # content-addressed result store, see services/result_store.py
+
+OCR_POLLER_CONCURRENCY = 16  # getTaskStatus calls the async task poller makes at once
+
+OCR_STATUS_HEARTBEAT_INTERVAL = 15  # seconds between heartbeat frames of memory/tasks/events/
+
+OCR_STATUS_STREAM_TIMEOUT = 600  # seconds a status stream is held open before it ends
+
+OCR_LONG_POLL_TIMEOUT = 30  # longest wait of one memory/tasks/wait/ request
+
+OCR_RESULT_TTL = 24 * 60 * 60  # seconds an OCR result is kept after it was last read
+
+OCR_RESULT_MAX_BYTES = 2 * 1024 ** 3  # size cap of OCR_RESULT_DIR, least recently read results go first
+
+OCR_RESULT_EVICT_INTERVAL = 300  # seconds between eviction passes
+
+OCR_RESULT_TMP_GRACE = 60 * 60  # seconds a temporary result file may live before eviction treats it as abandoned
+
+OCR_CACHE_ENABLED = True  # serve re-uploads of a recognized file from the result store
+
+OCR_CACHE_MAX_ENTRIES = 10000  # cache entries kept, least recently used ones go first
+
+OCR_SHARD_PAGES = 0  # pages per shard of a PDF submitted without shardPages, 0 sends PDFs whole
+
+OCR_SHARD_CONCURRENCY = 8  # shards submitted and polled at once
+
+OCR_SHARD_MAX_ATTEMPTS = 3  # submissions of a page range before the whole task fails
+
+
+# PDF text layer
+# Pages with a usable embedded text layer are extracted locally instead of being sent to ABBYY
+
+OCR_TEXT_LAYER_ENABLED = True
+
+OCR_TEXT_LAYER_MIN_CHARS = 20  # non-space characters below which a page counts as image-only
+
+OCR_TEXT_LAYER_MAX_GARBLED = 0.1  # share of glyphs without a Unicode mapping above which the text layer is unusable
+
+OCR_TEXT_LAYER_PARAGRAPH_GAP = 0.8  # vertical gap, in line heights, that starts a new paragraph
+
+OCR_TEXT_LAYER_SCAN_IMAGE_COVERAGE = 0.5  # share of the page covered by images from which a page counts as a scan
+
+OCR_TEXT_LAYER_MIN_TEXT_COVERAGE = 0.05  # share of a scanned page its text must cover to be used instead of OCR
+
+
+# OCR engines
+# 'abbyy' (cloud) or 'tesseract' (local, needs the tesseract binary and its language data)
+
+OCR_ENGINE = os.environ.get('OCR_ENGINE', 'abbyy')  # engine of requests that don't pass `engine`
+
+OCR_ENGINE_FALLBACK = os.environ.get('OCR_ENGINE_FALLBACK', '')  # engine used when submitting to the chosen one fails, '' for none
+
+OCR_LOCAL_WORKERS = 0  # Tesseract processes, 0 for one per CPU core
+
+OCR_TESSERACT_CMD = os.environ.get('OCR_TESSERACT_CMD', 'tesseract')  # path of the tesseract binary
+
+OCR_LOCAL_DPI = 300  # resolution PDF pages are rendered at for Tesseract
+
+OCR_LOCAL_SECONDS_PER_PAGE = 3  # per-page estimate for estimatedProcessingTime
+
+OCR_LOCAL_TASK_TIMEOUT = 60 * 60  # a local task without a state file after this long was lost with its process
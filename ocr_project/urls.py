@@ -1,16 +1,20 @@
 from django.urls import path
-from ocr_service.views.ocr_views import ConvertPDFToDocxAPI, DownloadOriginalDocxAPI, DownloadReplacedDocxAPI,GetTaskStatusAPI,TranslateRecordsView, SaveApplicationSettings
-from ocr_service.views.memory_views import TranslationMemoryUploadAPI, MemoryListAPI, MemoryAssetListAPI, MemoryListAPIById, MemoryDeleteAPI, MemoryUpdateAPI, MemoryBulkDeleteAPI, MemoryUpdateAPIBySourceAndTargetLanguage, MemoryExportAPIById, DuplicateMemory, GetMemoryBySource
+from ocr_service.views.ocr_views import ConvertPDFToDocxAPI, OcrCacheStatsAPI, DownloadOriginalDocxAPI, DownloadReplacedDocxAPI,GetTaskStatusAPI,TaskStatusEventsView,TaskStatusWaitView,TranslateRecordsView, SaveApplicationSettings
+from ocr_service.views.memory_views import TranslationMemoryUploadAPI, MemoryListAPI, MemoryAssetListAPI, MemoryListAPIById, MemoryDeleteAPI, MemoryUpdateAPI, MemoryBulkDeleteAPI, MemoryUpdateAPIBySourceAndTargetLanguage, MemoryExportAPIById, DuplicateMemory, GetMemoryBySource, GetMemoryBySourceBatch, ImportJobStatusAPI
 
 urlpatterns = [
     path('extract-text/', ConvertPDFToDocxAPI.as_view(), name='convert_pdf_to_docx'),
+    path('extract-text/cache/stats/', OcrCacheStatsAPI.as_view(), name='ocr-cache-stats'),
     path('download-generated-docx/', DownloadOriginalDocxAPI.as_view(), name='download_original_docx'),
     path('download-replaced-docx/', DownloadReplacedDocxAPI.as_view(), name='download_replaced_docx'),
     # MEMORY ASSET
     path('memory/assets/list/', MemoryAssetListAPI.as_view(), name='memory-asset-list'),
     path('memory/tasks/', GetTaskStatusAPI.as_view(), name='get-task-status'),
+    path('memory/tasks/events/', TaskStatusEventsView.as_view(), name='task-status-events'),
+    path('memory/tasks/wait/', TaskStatusWaitView.as_view(), name='task-status-wait'),
     # MEMORY_VIEW
     path('memory/upload/', TranslationMemoryUploadAPI.as_view(), name='upload-memory'),
+    path('memory/upload/status/<int:job_id>/', ImportJobStatusAPI.as_view(), name='upload-memory-status'),
     path('memory/list/', MemoryListAPI.as_view(), name='memory-list'),
     path('memory/list/<int:id>/', MemoryListAPIById.as_view(), name='memory-list'),
     path('memory/assets/export/<int:id>/', MemoryExportAPIById.as_view(), name='memory-list-export'),
@@ -23,6 +27,7 @@ urlpatterns = [
     path('memory/duplicate/<int:memory_asset_id>/', DuplicateMemory.as_view(), name='memory-duplicate'),
     
     path('memory/get-by-source-text/', GetMemoryBySource.as_view(), name='memory-duplicate'),
+    path('memory/get-by-source-text/batch/', GetMemoryBySourceBatch.as_view(), name='memory-get-by-source-batch'),
     
     path('memory/settings/', SaveApplicationSettings.as_view(), name='memory-duplicate')
 ]
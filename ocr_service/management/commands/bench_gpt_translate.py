@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from ocr_service.services import gpt_translate
+from ocr_service.services.fake_servers import openai_server
+from ocr_service.services.gpt_translate import translate_texts
+
+
+class Command(BaseCommand):
+    help = "Measure GPT translation throughput against a local fake OpenAI server at several concurrency levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segments', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=0.2, help="Seconds the server takes per call")
+        parser.add_argument('--token-latency', type=float, default=0.0, help="Extra seconds per completion token")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of calls answered with a 500")
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4, 8, 16, 32])
+        parser.add_argument('--mode', choices=['single', 'batch', 'both'], default='both')
+        parser.add_argument('--sentences', type=int, default=1, help="Sentences per segment, long ones get split")
+
+    def handle(self, *args, **options):
+        server = openai_server(
+            latency=options['latency'], token_latency=options['token_latency'], error_rate=options['error_rate']
+        ).start()
+
+        texts = [
+            " ".join(f"Sentence {j} of segment number {i} of the benchmark document." for j in range(options['sentences']))
+            for i in range(options['segments'])
+        ]
+        split_sentences = lambda text: [sentence + "." for sentence in text.split(".") if sentence.strip()]
+
+        modes = ['single', 'batch'] if options['mode'] == 'both' else [options['mode']]
+        try:
+            baseline = None
+            for batch in (mode == 'batch' for mode in modes):
+                for concurrency in options['concurrency']:
+                    # Fresh limiters so one run's spent budget does not slow the next
+                    gpt_translate._limiters.clear()
+                    server.calls = server.prompt_tokens = 0
+                    with override_settings(OPENAI_API_BASE=f"{server.base_url}/v1", GPT_RETRY_BASE_DELAY=0.05):
+                        started = time.perf_counter()
+                        translated = translate_texts(
+                            texts, 'English', 'French', 'stub-key', concurrency=concurrency, batch=batch,
+                            split_sentences=split_sentences,
+                        )
+                        elapsed = time.perf_counter() - started
+
+                    assert translated == [text.upper() for text in texts], "output order does not match input order"
+                    baseline = baseline or elapsed
+                    self.stdout.write(
+                        f"{'batch' if batch else 'single':>6} concurrency {concurrency:>3}: {elapsed:7.2f}s  "
+                        f"{len(texts) / elapsed:7.1f} segments/s  speedup x{baseline / elapsed:.1f} over the first run  "
+                        f"{server.calls} calls  {server.prompt_tokens} prompt tokens"
+                    )
+        finally:
+            server.shutdown()
@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ocr_service.models import Memory, MemoryAsset
+from ocr_service.models.memory_models import source_text_hash
+
+
+BENCH_ASSET_NAME = 'bench_tm_lookup'
+
+
+class Command(BaseCommand):
+    help = "Seed translation_memory and compare exact lookup latency by source_text and by source_hash."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000, help="Rows to seed for the benchmark pair")
+        parser.add_argument('--lookups', type=int, default=200, help="Lookups timed per strategy")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows for later runs")
+
+    def seed(self, asset, rows):
+        existing = Memory.objects.filter(memory_asset=asset).count()
+        batch = []
+        for i in range(existing, rows):
+            source_text = f"Benchmark source sentence number {i} of the translation memory."
+            batch.append(Memory(
+                name=BENCH_ASSET_NAME,
+                source_language='en',
+                target_language='fr',
+                source_text=source_text,
+                source_hash=source_text_hash(source_text),
+                target_text=f"Phrase source de benchmark numero {i}.",
+                memory_asset=asset,
+            ))
+            if len(batch) >= 10_000:
+                with transaction.atomic():
+                    Memory.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f"Seeded {i + 1}/{rows} rows", ending='\r')
+        if batch:
+            Memory.objects.bulk_create(batch)
+        self.stdout.write('')
+
+    def time_lookups(self, texts, build_filter):
+        timings = []
+        for text in texts:
+            started = time.perf_counter()
+            Memory.objects.filter(source_language='en', target_language='fr', **build_filter(text)).first()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def handle(self, *args, **options):
+        asset = MemoryAsset.objects.with_target_languages('en', ['fr']).filter(name=BENCH_ASSET_NAME).first()
+        if asset is None:
+            asset = MemoryAsset(name=BENCH_ASSET_NAME, source_language='en')
+            asset.set_target_languages(['fr'])
+        rows = options['rows']
+        self.seed(asset, rows)
+
+        texts = [
+            f"Benchmark source sentence number {random.randrange(rows)} of the translation memory."
+            for _ in range(options['lookups'])
+        ]
+
+        by_text = self.time_lookups(texts, lambda text: {'source_text': text})
+        by_hash = self.time_lookups(texts, lambda text: {'source_hash': source_text_hash(text)})
+
+        self.stdout.write(f"Rows: {rows}, lookups per strategy: {len(texts)}")
+        self.stdout.write(f"source_text scan:  p50 {by_text[0]:.2f} ms, p95 {by_text[1]:.2f} ms")
+        self.stdout.write(f"source_hash index: p50 {by_hash[0]:.2f} ms, p95 {by_hash[1]:.2f} ms")
+
+        if not options['keep']:
+            Memory.objects.filter(memory_asset=asset).delete()
+            asset.delete()
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from lxml import etree
+
+from ocr_service.services.memory_import import iter_tmx_units
+
+
+def write_tmx(path, units, source_language='en', target_language='fr'):
+    """Write a synthetic TMX file with the given number of translation units."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4"><header srclang="%s"/><body>\n' % source_language)
+        for i in range(units):
+            f.write(
+                f'<tu><tuv xml:lang="{source_language}"><seg>Source sentence number {i} for the benchmark.</seg></tuv>'
+                f'<tuv xml:lang="{target_language}"><seg>Phrase cible numero {i} pour le benchmark.</seg></tuv></tu>\n'
+            )
+        f.write('</body></tmx>\n')
+
+
+def parse_tree(path, result):
+    # Previous implementation: the whole tree is built before the first unit is read
+    started = time.perf_counter()
+    root = etree.parse(path).getroot()
+    count = 0
+    for tu in root.findall('.//tu'):
+        for tuv in tu.findall('./tuv'):
+            seg = tuv.find('./seg')
+            etree.tostring(seg, encoding='unicode', method='text').strip()
+        count += 1
+    result.put((count, time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def parse_stream(path, result):
+    started = time.perf_counter()
+    count = sum(1 for _ in iter_tmx_units(path, 'en', ['fr']))
+    result.put((count, time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def parse_nothing(path, result):
+    result.put((0, 0.0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+class Command(BaseCommand):
+    help = "Measure peak RSS of the tree-based and streaming TMX parsers against file size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--units', nargs='+', type=int, default=[10_000, 100_000, 500_000, 1_000_000])
+
+    def run_child(self, target, path):
+        # Every measurement runs in a fresh process so peaks do not carry over
+        result = multiprocessing.Queue()
+        process = multiprocessing.Process(target=target, args=(path, result))
+        process.start()
+        measurement = result.get()
+        process.join()
+        return measurement
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            _, _, baseline = self.run_child(parse_nothing, os.devnull)
+            self.stdout.write(f"Baseline RSS: {baseline / 1024:.1f} MB")
+            self.stdout.write(f"{'units':>10} {'file MB':>9} {'tree MB':>9} {'tree s':>8} {'stream MB':>10} {'stream s':>9}")
+
+            for units in options['units']:
+                path = os.path.join(directory, f'bench_{units}.tmx')
+                write_tmx(path, units)
+                size = os.path.getsize(path) / (1024 * 1024)
+
+                _, tree_seconds, tree_rss = self.run_child(parse_tree, path)
+                _, stream_seconds, stream_rss = self.run_child(parse_stream, path)
+
+                self.stdout.write(
+                    f"{units:>10} {size:>9.1f} {(tree_rss - baseline) / 1024:>9.1f} {tree_seconds:>8.2f} "
+                    f"{(stream_rss - baseline) / 1024:>10.1f} {stream_seconds:>9.2f}"
+                )
+                os.remove(path)
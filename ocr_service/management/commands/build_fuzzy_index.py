@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from ocr_service.models import Memory, MemoryFuzzyBucket
+from ocr_service.services.memory_fuzzy import index_memories
+
+
+class Command(BaseCommand):
+    help = "Build fuzzy-match buckets for memories that are not indexed yet (or all of them with --rebuild)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Re-index every memory")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        indexed = 0
+
+        # Walk the table by primary key so each batch is an index range scan
+        while True:
+            rows = list(
+                Memory.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'source_language', 'target_language', 'source_text')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            if not options['rebuild']:
+                done = set(
+                    MemoryFuzzyBucket.objects.filter(memory_id__in=[row[0] for row in rows])
+                    .values_list('memory_id', flat=True).distinct()
+                )
+                rows = [row for row in rows if row[0] not in done]
+
+            index_memories(rows)
+            indexed += len(rows)
+            self.stdout.write(f"Indexed {indexed} memories (up to id {last_id})", ending='\r')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"Fuzzy index built for {indexed} memories."))
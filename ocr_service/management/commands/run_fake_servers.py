@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ocr_service.services.fake_servers import abbyy_server, canned_docx, openai_server
+
+
+class Command(BaseCommand):
+    help = "Run local fake ABBYY Cloud OCR and OpenAI servers for offline load tests and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--abbyy-port', type=int, default=8801)
+        parser.add_argument('--openai-port', type=int, default=8802)
+        parser.add_argument('--latency', type=float, default=0.1, help="Seconds every request waits")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with a 500")
+        parser.add_argument('--requests-per-minute', type=int, default=None, help="Answer 429 past this rate")
+        parser.add_argument('--processing-time', type=float, default=2.0, help="Seconds until an OCR task completes")
+        parser.add_argument('--token-latency', type=float, default=0.0, help="Extra seconds per completion token")
+        parser.add_argument('--result-docx', help="DOCX returned for every OCR task instead of the canned one")
+        parser.add_argument('--paragraphs', type=int, default=0, help="Size of a generated canned result")
+
+    def handle(self, *args, **options):
+        limits = {
+            'latency': options['latency'],
+            'error_rate': options['error_rate'],
+            'requests_per_minute': options['requests_per_minute'],
+        }
+
+        result = None
+        if options['result_docx']:
+            with open(options['result_docx'], 'rb') as f:
+                result = f.read()
+        elif options['paragraphs']:
+            result = canned_docx([
+                f"Paragraph {i} of the generated OCR result, long enough to look like a real sentence."
+                for i in range(options['paragraphs'])
+            ])
+
+        abbyy = abbyy_server(
+            options['host'], options['abbyy_port'], processing_time=options['processing_time'], result=result, **limits
+        ).start()
+        openai = openai_server(
+            options['host'], options['openai_port'], token_latency=options['token_latency'], **limits
+        ).start()
+
+        self.stdout.write(self.style.SUCCESS("Fake servers running, start the app with:"))
+        self.stdout.write(
+            f"  ABBYY_BASE_URL={abbyy.base_url} ABBYY_APPLICATION_ID=fake ABBYY_PASSWORD=fake "
+            f"OPENAI_API_BASE={openai.base_url}/v1"
+        )
+
+        try:
+            while True:
+                time.sleep(60)
+                self.stdout.write(f"ABBYY: {abbyy.calls} requests, OpenAI: {openai.calls} requests")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            abbyy.shutdown()
+            openai.shutdown()
@@ -0,0 +1,48 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ocr_service.services.import_jobs import claim_next_job, run_job, worker_name
+
+
+def work(once=False):
+    name = worker_name()
+    while True:
+        job = claim_next_job(name)
+        if job is None:
+            if once:
+                return
+            time.sleep(settings.IMPORT_WORKER_POLL_INTERVAL)
+            continue
+
+        print(f"[{name}] Running import job #{job.id} ({job.file_type}, {job.source_language} -> {job.target_languages})")
+        succeeded = run_job(job)
+        print(f"[{name}] Import job #{job.id} {'completed' if succeeded else 'failed'}")
+
+
+class Command(BaseCommand):
+    help = "Run translation memory import jobs queued by memory/upload/."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Number of worker processes to start")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue has no runnable job")
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        if processes == 1:
+            work(options['once'])
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=work, args=(options['once'],), daemon=True)
+            for _ in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
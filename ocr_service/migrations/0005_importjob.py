@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0004_settings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name given to the imported memories', max_length=255)),
+                ('source_language', models.CharField(help_text='Source language of the import', max_length=50)),
+                ('target_languages', models.TextField(help_text='Comma-separated target languages')),
+                ('file_type', models.CharField(help_text='Uploaded file type (tmx or xlsx)', max_length=10)),
+                ('file_path', models.CharField(help_text='Location of the uploaded file on disk', max_length=500)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('worker', models.CharField(blank=True, default='', help_text='Worker process running the job', max_length=255)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('progress', models.FloatField(blank=True, help_text='Fraction of the file consumed, when known', null=True)),
+                ('inserted', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the job was queued')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Last progress report of the worker', null=True)),
+                ('memory_asset', models.ForeignKey(help_text='The memory asset the imported translations are attached to', on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='ocr_service.memoryasset')),
+            ],
+            options={
+                'db_table': 'memory_import_jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:22
+
+import hashlib
+import unicodedata
+
+from django.db import migrations, models
+
+
+def backfill_source_hash(apps, schema_editor):
+    # Mirrors memory_models.source_text_hash, historical models cannot import it
+    Memory = apps.get_model('ocr_service', 'Memory')
+    batch = []
+    for memory in Memory.objects.only('id', 'source_text').iterator(chunk_size=2000):
+        normalized = unicodedata.normalize('NFC', memory.source_text or '').strip()
+        memory.source_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        batch.append(memory)
+        if len(batch) >= 2000:
+            Memory.objects.bulk_update(batch, ['source_hash'])
+            batch = []
+    if batch:
+        Memory.objects.bulk_update(batch, ['source_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0005_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='source_hash',
+            field=models.CharField(default='', editable=False, help_text='SHA-256 of the normalized source text, kept in sync on save', max_length=64),
+        ),
+        migrations.RunPython(backfill_source_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['source_language', 'target_language', 'source_hash'], name='tm_pair_source_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_language_links(apps, schema_editor):
+    MemoryAsset = apps.get_model('ocr_service', 'MemoryAsset')
+    MemoryAssetLanguage = apps.get_model('ocr_service', 'MemoryAssetLanguage')
+    links = []
+    for asset in MemoryAsset.objects.only('id', 'source_language', 'target_languages').iterator():
+        languages = []
+        for lang in (asset.target_languages or '').split(','):
+            lang = lang.strip()
+            if lang and lang not in languages:
+                languages.append(lang)
+        links.extend(
+            MemoryAssetLanguage(memory_asset_id=asset.id, source_language=asset.source_language, target_language=lang)
+            for lang in languages
+        )
+    MemoryAssetLanguage.objects.bulk_create(links, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0006_memory_source_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryAssetLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_language', models.CharField(help_text='Source language of the memory asset', max_length=50)),
+                ('target_language', models.CharField(help_text='One of the target languages of the memory asset', max_length=50)),
+                ('memory_asset', models.ForeignKey(help_text='The memory asset covering this language pair', on_delete=django.db.models.deletion.CASCADE, related_name='language_links', to='ocr_service.memoryasset')),
+            ],
+            options={
+                'db_table': 'memory_asset_languages',
+                'indexes': [models.Index(fields=['source_language', 'target_language'], name='memory_asset_pair_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='memoryassetlanguage',
+            constraint=models.UniqueConstraint(fields=('memory_asset', 'target_language'), name='memory_asset_language_unique'),
+        ),
+        migrations.RunPython(create_language_links, migrations.RunPython.noop),
+    ]
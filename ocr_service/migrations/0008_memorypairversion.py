@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0007_memoryassetlanguage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryPairVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_language', models.CharField(help_text='Source language of the pair', max_length=50)),
+                ('target_language', models.CharField(help_text='Target language of the pair', max_length=50)),
+                ('version', models.BigIntegerField(default=0, help_text="Bumped by every write to the pair's memories")),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp of the last bump')),
+            ],
+            options={
+                'db_table': 'memory_pair_versions',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='memorypairversion',
+            constraint=models.UniqueConstraint(fields=('source_language', 'target_language'), name='memory_pair_version_unique'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0008_memorypairversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryFuzzyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_language', models.CharField(help_text='Source language of the memory', max_length=50)),
+                ('target_language', models.CharField(help_text='Target language of the memory', max_length=50)),
+                ('bucket', models.BigIntegerField(help_text='MinHash LSH band signature of the source text')),
+                ('memory', models.ForeignKey(help_text='The memory whose source text produced this bucket', on_delete=django.db.models.deletion.CASCADE, related_name='fuzzy_buckets', to='ocr_service.memory')),
+            ],
+            options={
+                'db_table': 'translation_memory_fuzzy_buckets',
+                'indexes': [models.Index(fields=['source_language', 'target_language', 'bucket'], name='tm_fuzzy_bucket_idx')],
+            },
+        ),
+    ]
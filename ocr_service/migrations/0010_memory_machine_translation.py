@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0009_memoryfuzzybucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='is_machine_translation',
+            field=models.BooleanField(default=False, help_text='Whether target_text was produced by a machine translation model rather than a translator'),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='mt_model',
+            field=models.CharField(blank=True, default='', help_text='Model that produced a machine translation', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='translated_at',
+            field=models.DateTimeField(blank=True, help_text='When the machine translation was produced', null=True),
+        ),
+    ]
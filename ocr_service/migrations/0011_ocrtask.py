@@ -0,0 +1,35 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0010_memory_machine_translation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(help_text='ABBYY Cloud OCR task id', max_length=64, unique=True)),
+                ('file_name', models.CharField(blank=True, default='', help_text='Name of the submitted file', max_length=255)),
+                ('source_language', models.CharField(blank=True, default='', help_text='OCR recognition language', max_length=100)),
+                ('target_language', models.CharField(blank=True, default='', help_text='Target language requested', max_length=100)),
+                ('status', models.CharField(default='Submitted', help_text='Last status reported by ABBYY', max_length=30)),
+                ('estimated_processing_time', models.CharField(blank=True, default='', max_length=20)),
+                ('result_url', models.TextField(blank=True, default='', help_text='ABBYY result download URL once completed')),
+                ('result_path', models.CharField(blank=True, default='', help_text='Downloaded result on disk', max_length=500)),
+                ('error', models.TextField(blank=True, help_text='Last polling error', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the task was submitted')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_polled_at', models.DateTimeField(blank=True, help_text='Last getTaskStatus call made for the task', null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ocr_tasks',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0011_ocrtask'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ocrtask',
+            name='result_path',
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='result_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the result in the result store', max_length=64),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0012_ocrtask_result_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrResultCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(help_text="SHA-256 of the uploaded file's hash and the recognition settings", max_length=64, unique=True)),
+                ('language', models.CharField(help_text='OCR recognition language', max_length=100)),
+                ('result_hash', models.CharField(help_text='SHA-256 of the DOCX in the result store', max_length=64)),
+                ('task_id', models.CharField(help_text='ABBYY task that produced the result', max_length=64)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True, help_text='Last time the entry was stored or hit')),
+            ],
+            options={
+                'db_table': 'ocr_result_cache',
+            },
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='cache_key',
+            field=models.CharField(blank=True, default='', help_text='Dedup cache key of the upload', max_length=64),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0013_ocr_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrtask',
+            name='attempts',
+            field=models.PositiveIntegerField(default=1, help_text='Submissions of a shard to ABBYY'),
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='page_end',
+            field=models.PositiveIntegerField(blank=True, help_text='Page after the last page of a shard', null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='page_start',
+            field=models.PositiveIntegerField(blank=True, help_text='First page of a shard, 0-based', null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Sharded task this page range belongs to', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='ocr_service.ocrtask'),
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='shard_count',
+            field=models.PositiveIntegerField(default=0, help_text='Page-range shards of a sharded task'),
+        ),
+    ]
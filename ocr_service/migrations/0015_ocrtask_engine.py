@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_service', '0014_ocrtask_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrtask',
+            name='engine',
+            field=models.CharField(default='abbyy', help_text='OCR engine running the task', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='ocrtask',
+            name='status',
+            field=models.CharField(default='Submitted', help_text='Last status reported by the engine', max_length=30),
+        ),
+    ]
@@ -1,3 +1,8 @@
 from .memory_models import Memory
-from .memory_asset_model import MemoryAsset
-from .settings_model import Settings
\ No newline at end of file
+from .memory_asset_model import MemoryAsset, MemoryAssetLanguage
+from .settings_model import Settings
+from .import_job_model import ImportJob
+from .memory_pair_version_model import MemoryPairVersion
+from .memory_fuzzy_model import MemoryFuzzyBucket
+from .ocr_task_model import OcrTask
+from .ocr_result_cache_model import OcrResultCacheEntry
@@ -0,0 +1,49 @@
+from django.db import models
+from .memory_asset_model import MemoryAsset
+
+
+class ImportJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    memory_asset = models.ForeignKey(
+        MemoryAsset,
+        related_name="import_jobs",
+        on_delete=models.CASCADE,
+        help_text="The memory asset the imported translations are attached to"
+    )
+    name = models.CharField(max_length=255, help_text="Name given to the imported memories")
+    source_language = models.CharField(max_length=50, help_text="Source language of the import")
+    target_languages = models.TextField(help_text="Comma-separated target languages")
+    file_type = models.CharField(max_length=10, help_text="Uploaded file type (tmx or xlsx)")
+    file_path = models.CharField(max_length=500, help_text="Location of the uploaded file on disk")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    worker = models.CharField(max_length=255, blank=True, default='', help_text="Worker process running the job")
+    rows_processed = models.PositiveIntegerField(default=0)
+    progress = models.FloatField(null=True, blank=True, help_text="Fraction of the file consumed, when known")
+    inserted = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp when the job was queued")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress report of the worker")
+
+    class Meta:
+        db_table = 'memory_import_jobs'
+
+    def __str__(self):
+        return f"ImportJob #{self.id}: {self.source_language} -> {self.target_languages} ({self.status})"
+
+    @property
+    def target_language_list(self):
+        return [lang for lang in self.target_languages.split(',') if lang]
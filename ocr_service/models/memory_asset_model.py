@@ -1,15 +1,98 @@
 from django.db import models
+from django.db.models import Count, Q
+
+
+def parse_target_languages(target_languages):
+    """Split a comma-separated language string (or list) into unique, ordered codes."""
+    if isinstance(target_languages, str):
+        target_languages = target_languages.split(',')
+    languages = []
+    for lang in target_languages:
+        lang = lang.strip()
+        if lang and lang not in languages:
+            languages.append(lang)
+    return languages
+
+
+class MemoryAssetQuerySet(models.QuerySet):
+    def covering(self, source_language, target_language):
+        """Assets that hold translations for the source_language -> target_language pair."""
+        return self.filter(
+            language_links__source_language=source_language,
+            language_links__target_language=target_language,
+        )
+
+    def with_target_languages(self, source_language, target_languages):
+        """
+        Assets whose target language set is exactly target_languages, in any order.
+
+        Candidates come from the pair index of the first language's links, only
+        their link counts are compared.
+        """
+        target_languages = parse_target_languages(target_languages)
+        if not target_languages:
+            return self.filter(source_language=source_language, language_links__isnull=True)
+        candidates = MemoryAssetLanguage.objects.filter(
+            source_language=source_language, target_language=target_languages[0]
+        ).values('memory_asset_id')
+        return self.filter(pk__in=candidates).annotate(
+            language_count=Count('language_links', distinct=True),
+            matched_count=Count(
+                'language_links',
+                filter=Q(language_links__target_language__in=target_languages),
+                distinct=True,
+            ),
+        ).filter(language_count=len(target_languages), matched_count=len(target_languages))
 
 
 class MemoryAsset(models.Model):
     name= models.CharField(max_length=100, help_text="Name of the memory asset", default='')
     source_language = models.CharField(max_length=50, help_text="Source language of the memory asset")
+    # Kept for display, pair lookups go through the indexed language_links rows
     target_languages = models.TextField(help_text="Comma-separated target languages")
     created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp when the memory asset was created")
     updated_at = models.DateTimeField(auto_now=True, help_text="Timestamp when the memory asset was last updated")
 
+    objects = MemoryAssetQuerySet.as_manager()
+
     class Meta:
         db_table = 'memory_assets'
 
     def __str__(self):
-        return f"MemoryAsset: {self.source_language} -> {self.target_languages}"
\ No newline at end of file
+        return f"MemoryAsset: {self.source_language} -> {self.target_languages}"
+
+    def set_target_languages(self, target_languages):
+        """Store the target languages on the asset and sync its language_links rows."""
+        target_languages = parse_target_languages(target_languages)
+        self.target_languages = ",".join(target_languages)
+        self.save()
+
+        self.language_links.exclude(target_language__in=target_languages).delete()
+        existing = set(self.language_links.values_list('target_language', flat=True))
+        MemoryAssetLanguage.objects.bulk_create([
+            MemoryAssetLanguage(memory_asset=self, source_language=self.source_language, target_language=lang)
+            for lang in target_languages if lang not in existing
+        ])
+
+
+class MemoryAssetLanguage(models.Model):
+    memory_asset = models.ForeignKey(
+        MemoryAsset,
+        related_name="language_links",
+        on_delete=models.CASCADE,
+        help_text="The memory asset covering this language pair"
+    )
+    source_language = models.CharField(max_length=50, help_text="Source language of the memory asset")
+    target_language = models.CharField(max_length=50, help_text="One of the target languages of the memory asset")
+
+    class Meta:
+        db_table = 'memory_asset_languages'
+        constraints = [
+            models.UniqueConstraint(fields=['memory_asset', 'target_language'], name='memory_asset_language_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['source_language', 'target_language'], name='memory_asset_pair_idx'),
+        ]
+
+    def __str__(self):
+        return f"MemoryAssetLanguage: {self.source_language} -> {self.target_language} (asset {self.memory_asset_id})"
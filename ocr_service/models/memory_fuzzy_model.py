@@ -0,0 +1,23 @@
+from django.db import models
+from .memory_models import Memory
+
+
+class MemoryFuzzyBucket(models.Model):
+    memory = models.ForeignKey(
+        Memory,
+        related_name="fuzzy_buckets",
+        on_delete=models.CASCADE,
+        help_text="The memory whose source text produced this bucket"
+    )
+    source_language = models.CharField(max_length=50, help_text="Source language of the memory")
+    target_language = models.CharField(max_length=50, help_text="Target language of the memory")
+    bucket = models.BigIntegerField(help_text="MinHash LSH band signature of the source text")
+
+    class Meta:
+        db_table = 'translation_memory_fuzzy_buckets'
+        indexes = [
+            models.Index(fields=['source_language', 'target_language', 'bucket'], name='tm_fuzzy_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"MemoryFuzzyBucket: memory {self.memory_id} ({self.source_language} -> {self.target_language})"
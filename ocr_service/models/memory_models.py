@@ -1,11 +1,31 @@
+import hashlib
+import unicodedata
+
 from django.db import models
 from .memory_asset_model import MemoryAsset
 
+
+def normalize_source_text(text):
+    """Normalization applied before hashing: Unicode NFC and surrounding whitespace removed."""
+    return unicodedata.normalize('NFC', text or '').strip()
+
+
+def source_text_hash(text):
+    """SHA-256 hex digest of the normalized source text, used for indexed exact lookups."""
+    return hashlib.sha256(normalize_source_text(text).encode('utf-8')).hexdigest()
+
+
 class Memory(models.Model):
     name = models.CharField(max_length=255, help_text="Name of the memory")
     source_language = models.CharField(max_length=50, help_text="Source language of the text")
     target_language = models.CharField(max_length=50, help_text="Target language of the text")
     source_text = models.TextField(help_text="Original text in the source language")
+    source_hash = models.CharField(
+        max_length=64,
+        default='',
+        editable=False,
+        help_text="SHA-256 of the normalized source text, kept in sync on save"
+    )
     target_text = models.TextField(help_text="Translated text in the target language")
     memory_asset = models.ForeignKey(
         MemoryAsset,
@@ -13,9 +33,26 @@ class Memory(models.Model):
         on_delete=models.CASCADE,
         help_text="The memory asset to which this memory belongs"
     )
+    is_machine_translation = models.BooleanField(
+        default=False,
+        help_text="Whether target_text was produced by a machine translation model rather than a translator"
+    )
+    mt_model = models.CharField(max_length=100, blank=True, default='', help_text="Model that produced a machine translation")
+    translated_at = models.DateTimeField(null=True, blank=True, help_text="When the machine translation was produced")
 
     class Meta:
         db_table = 'translation_memory'
+        indexes = [
+            # MySQL cannot index the TEXT column, exact lookups go through the hash instead
+            models.Index(fields=['source_language', 'target_language', 'source_hash'], name='tm_pair_source_hash_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.source_hash = source_text_hash(self.source_text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'source_text' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'source_hash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Memory: {self.name} ({self.source_language} -> {self.target_language})"
\ No newline at end of file
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class MemoryPairVersion(models.Model):
+    source_language = models.CharField(max_length=50, help_text="Source language of the pair")
+    target_language = models.CharField(max_length=50, help_text="Target language of the pair")
+    version = models.BigIntegerField(default=0, help_text="Bumped by every write to the pair's memories")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Timestamp of the last bump")
+
+    class Meta:
+        db_table = 'memory_pair_versions'
+        constraints = [
+            models.UniqueConstraint(fields=['source_language', 'target_language'], name='memory_pair_version_unique'),
+        ]
+
+    def __str__(self):
+        return f"MemoryPairVersion: {self.source_language} -> {self.target_language} v{self.version}"
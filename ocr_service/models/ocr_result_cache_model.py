@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class OcrResultCacheEntry(models.Model):
+    cache_key = models.CharField(
+        max_length=64, unique=True, help_text="SHA-256 of the uploaded file's hash and the recognition settings"
+    )
+    language = models.CharField(max_length=100, help_text="OCR recognition language")
+    result_hash = models.CharField(max_length=64, help_text="SHA-256 of the DOCX in the result store")
+    task_id = models.CharField(max_length=64, help_text="ABBYY task that produced the result")
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True, help_text="Last time the entry was stored or hit")
+
+    class Meta:
+        db_table = 'ocr_result_cache'
+
+    def __str__(self):
+        return f"OcrResultCacheEntry {self.cache_key[:12]} ({self.language})"
@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class OcrTask(models.Model):
+    # ABBYY task statuses after which the task never changes again
+    TERMINAL_STATUSES = ('Completed', 'ProcessingFailed', 'Deleted', 'NotEnoughCredits')
+
+    task_id = models.CharField(max_length=64, unique=True, help_text="ABBYY Cloud OCR task id")
+    file_name = models.CharField(max_length=255, blank=True, default='', help_text="Name of the submitted file")
+    source_language = models.CharField(max_length=100, blank=True, default='', help_text="OCR recognition language")
+    target_language = models.CharField(max_length=100, blank=True, default='', help_text="Target language requested")
+    engine = models.CharField(max_length=20, default='abbyy', help_text="OCR engine running the task")
+    status = models.CharField(max_length=30, default='Submitted', help_text="Last status reported by the engine")
+    estimated_processing_time = models.CharField(max_length=20, blank=True, default='')
+    result_url = models.TextField(blank=True, default='', help_text="ABBYY result download URL once completed")
+    cache_key = models.CharField(max_length=64, blank=True, default='', help_text="Dedup cache key of the upload")
+    result_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 of the result in the result store")
+    error = models.TextField(null=True, blank=True, help_text="Last polling error")
+    parent = models.ForeignKey(
+        'self',
+        related_name='shards',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        help_text="Sharded task this page range belongs to"
+    )
+    shard_count = models.PositiveIntegerField(default=0, help_text="Page-range shards of a sharded task")
+    page_start = models.PositiveIntegerField(null=True, blank=True, help_text="First page of a shard, 0-based")
+    page_end = models.PositiveIntegerField(null=True, blank=True, help_text="Page after the last page of a shard")
+    attempts = models.PositiveIntegerField(default=1, help_text="Submissions of a shard to ABBYY")
+    created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp when the task was submitted")
+    updated_at = models.DateTimeField(auto_now=True)
+    last_polled_at = models.DateTimeField(null=True, blank=True, help_text="Last getTaskStatus call made for the task")
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'ocr_tasks'
+
+    def __str__(self):
+        return f"OcrTask {self.task_id} ({self.status})"
+
+    @property
+    def is_terminal(self):
+        return self.status in self.TERMINAL_STATUSES
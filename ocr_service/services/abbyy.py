@@ -0,0 +1,150 @@
+import os
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+
+from ocr_service.models.settings_model import Settings
+
+
+def credentials():
+    """(application id, password) saved through memory/settings/, else ABBYY_APPLICATION_ID / ABBYY_PASSWORD."""
+    saved = Settings.objects.values_list('abby_app_id', 'abby_password').first()
+    if saved and saved[0] and saved[1]:
+        return saved
+    if settings.ABBYY_APPLICATION_ID and settings.ABBYY_PASSWORD:
+        return settings.ABBYY_APPLICATION_ID, settings.ABBYY_PASSWORD
+    raise ImproperlyConfigured(
+        "No ABBYY credentials: save them through memory/settings/ or set ABBYY_APPLICATION_ID and ABBYY_PASSWORD"
+    )
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """
+    The process-wide requests session to ABBYY.
+
+    Its connection pool keeps up to ABBYY_POOL_SIZE connections alive per host,
+    so status polls and downloads skip the TCP and TLS handshakes. A forked
+    worker builds its own session instead of sharing the parent's sockets.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.ABBYY_POOL_SIZE)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session_pid = os.getpid()
+        return _session
+
+
+def is_retryable(response=None, error=None):
+    """Connection failures, timeouts, 429s and 5xx responses are retried."""
+    if error is not None:
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def retry_delay(response, attempt):
+    """Retry-After when ABBYY sent one, otherwise exponential backoff with full jitter."""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    backoff = min(settings.ABBYY_RETRY_MAX_DELAY, settings.ABBYY_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, backoff)
+
+
+def request(method, url, retry=False, timeout=None, **kwargs):
+    """
+    One call through the pooled session with connect and read timeouts.
+
+    Only idempotent calls pass retry=True: a repeated processImage would start
+    (and bill) a second task.
+    """
+    timeout = timeout or (settings.ABBYY_CONNECT_TIMEOUT, settings.ABBYY_READ_TIMEOUT)
+    attempt = 0
+    while True:
+        response = error = None
+        try:
+            response = session().request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            error = e
+        if response is not None and not is_retryable(response):
+            response.raise_for_status()
+            return response
+        if not retry or attempt >= settings.ABBYY_MAX_RETRIES or (error is not None and not is_retryable(error=error)):
+            if error is not None:
+                raise error
+            response.raise_for_status()
+        delay = retry_delay(response, attempt)
+        attempt += 1
+        reason = error.__class__.__name__ if error is not None else response.status_code
+        print(f"ABBYY call failed ({reason}), retry {attempt} in {delay:.1f}s")
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+
+
+# Function to parse XML responses and extract taskId, status, and resultUrl
+def parse_xml_response(response_text):
+    root = ET.fromstring(response_text)
+    task_element = root.find('task')
+    if task_element is not None:
+        return {
+            'taskId': task_element.attrib.get('id'),
+            'status': task_element.attrib.get('status'),
+            'resultUrl': task_element.attrib.get('resultUrl'),
+            'estimatedProcessingTime': task_element.attrib.get('estimatedProcessingTime')
+        }
+    return None
+
+
+# processImage settings besides the language, part of the OCR result cache key
+PROCESS_IMAGE_PARAMS = {
+    'exportFormat': 'docx',
+    'textType': 'normal,handprinted,gothic,typewriter,cmc7',
+    'correctSkew': 'true',
+    'correctOrientation': 'true',
+    'imageSource': 'auto'
+}
+
+
+# Submit file to ABBYY OCR
+def submit_file_for_ocr(file, file_type, language):
+    url = f'{settings.ABBYY_BASE_URL}/processImage'
+    files = {'file': file}
+    data = {'language': language, **PROCESS_IMAGE_PARAMS}
+    response = request('POST', url, files=files, auth=credentials(), data=data)
+    return parse_xml_response(response.text)
+
+
+def get_task_status(task_id):
+    """One getTaskStatus call, parsed like parse_xml_response."""
+    url = f'{settings.ABBYY_BASE_URL}/getTaskStatus'
+    response = request('GET', url, retry=True, params={'taskId': task_id}, auth=credentials())
+    return parse_xml_response(response.text)
+
+
+def download_result(result_url, output_path):
+    """Stream the result to `output_path`; the read timeout applies to every chunk."""
+    response = request(
+        'GET', result_url, retry=True, stream=True,
+        timeout=(settings.ABBYY_CONNECT_TIMEOUT, settings.ABBYY_DOWNLOAD_TIMEOUT),
+    )
+    with response, open(output_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            f.write(chunk)
+    return output_path
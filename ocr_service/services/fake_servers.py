@@ -0,0 +1,242 @@
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import quoteattr
+
+from docx import Document
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    Local stand-in for ABBYY Cloud OCR or the OpenAI API, see abbyy_server() and openai_server().
+
+    Point ABBYY_BASE_URL / OPENAI_API_BASE at it to run the real views offline.
+    Every request waits `latency` seconds, a fraction `error_rate` fails with a
+    500, and past `requests_per_minute` requests are answered with 429 and
+    Retry-After, like the real services.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, handler, latency=0.0, error_rate=0.0, requests_per_minute=None):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.lock = threading.Lock()
+        self.calls = 0
+        self._window = []  # request times of the last minute, for the rate limit
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def admit(self):
+        """None when the request may proceed, else (status, retry_after) to answer with."""
+        with self.lock:
+            self.calls += 1
+            if self.requests_per_minute:
+                now = time.monotonic()
+                self._window = [at for at in self._window if now - at < 60]
+                if len(self._window) >= self.requests_per_minute:
+                    return 429, 60 - (now - self._window[0])
+                self._window.append(now)
+        if random.random() < self.error_rate:
+            return 500, None
+        return None
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    # Keep-alive like the real services, every response carries a Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes, don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def send_body(self, status, body, content_type, headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def refuse(self):
+        """Apply latency, the rate limit and injected errors; True when the request was answered."""
+        time.sleep(self.server.latency)
+        rejection = self.server.admit()
+        if rejection is None:
+            return False
+        status, retry_after = rejection
+        headers = {'Retry-After': str(math.ceil(retry_after))} if retry_after is not None else {}
+        self.send_error_body(status, headers)
+        return True
+
+    def send_error_body(self, status, headers):
+        self.send_body(status, f"Fake server error {status}", 'text/plain', headers)
+
+    def log_message(self, *args):
+        pass
+
+
+def canned_docx(paragraphs):
+    """A small DOCX holding the given paragraphs, served as every OCR result."""
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+DEFAULT_PARAGRAPHS = [
+    "This agreement is made between the parties listed below.",
+    "Payment is due within thirty days of the invoice date.",
+    "The contract is valid until 31 December 2024.",
+]
+
+
+class AbbyyHandler(FakeHandler):
+    """processImage, getTaskStatus and result download of the ABBYY Cloud OCR API v1."""
+
+    def task_xml(self, task_id, task):
+        attributes = {
+            'id': task_id,
+            'registrationTime': task['registered'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'status': task['status'],
+            'filesCount': '1',
+            'credits': '0',
+            'estimatedProcessingTime': str(max(1, round(self.server.processing_time))),
+        }
+        if task['status'] == 'Completed':
+            attributes['resultUrl'] = f"{self.server.base_url}/results/{task_id}.docx"
+        attrs = ' '.join(f"{name}={quoteattr(value)}" for name, value in attributes.items())
+        return f'<?xml version="1.0" encoding="utf-8"?><response><task {attrs} /></response>'
+
+    def send_error_body(self, status, headers):
+        body = f'<?xml version="1.0" encoding="utf-8"?><error><message>Fake server error {status}</message></error>'
+        self.send_body(status, body, 'application/xml', headers)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        self.read_body()
+        if path != '/processImage':
+            return self.send_body(404, 'Not found', 'text/plain')
+        if self.refuse():
+            return
+
+        task_id = str(uuid.uuid4())
+        task = {
+            'registered': datetime.now(timezone.utc),
+            'ready_at': time.monotonic() + self.server.processing_time,
+            'status': 'Queued',
+        }
+        with self.server.lock:
+            self.server.tasks[task_id] = task
+        self.send_body(200, self.task_xml(task_id, task), 'application/xml')
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith('/results/'):
+            # Result downloads come from blob storage in the real service, no limits apply
+            task_id = parsed.path[len('/results/'):].removesuffix('.docx')
+            if task_id not in self.server.tasks:
+                return self.send_body(404, 'Not found', 'text/plain')
+            return self.send_body(
+                200, self.server.result, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            )
+
+        if parsed.path != '/getTaskStatus':
+            return self.send_body(404, 'Not found', 'text/plain')
+        if self.refuse():
+            return
+
+        task_id = parse_qs(parsed.query).get('taskId', [''])[0]
+        with self.server.lock:
+            task = self.server.tasks.get(task_id)
+            # Tests mark a task 'ProcessingFailed' to make it fail
+            if task is not None and task['status'] in ('Queued', 'InProgress'):
+                task['status'] = 'Completed' if time.monotonic() >= task['ready_at'] else 'InProgress'
+        if task is None:
+            return self.send_error_body(400, {})
+        self.send_body(200, self.task_xml(task_id, task), 'application/xml')
+
+
+def fake_translation(body):
+    """The upper-cased text for a single-segment prompt, the same per item for a JSON batch prompt."""
+    content = body["messages"][-1]["content"]
+    if body.get("response_format", {}).get("type") != "json_object":
+        return content.upper()
+    items = json.loads(content)
+    return json.dumps({"translations": [{"id": item["id"], "text": item["text"].upper()} for item in items]})
+
+
+class OpenAIHandler(FakeHandler):
+    """POST /v1/chat/completions; the reply takes `token_latency` more per completion token."""
+
+    def send_error_body(self, status, headers):
+        kind = "requests" if status == 429 else "server_error"
+        body = json.dumps({"error": {"message": f"Fake server error {status}", "type": kind, "code": None}})
+        self.send_body(status, body, 'application/json', headers)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self.read_body()
+            return self.send_body(404, 'Not found', 'text/plain')
+        body = json.loads(self.read_body())
+        if self.refuse():
+            return
+
+        content = fake_translation(body)
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        completion_tokens = len(content) // 4
+        with self.server.lock:
+            self.server.prompt_tokens += prompt_tokens
+        time.sleep(completion_tokens * self.server.token_latency)
+
+        self.send_body(200, json.dumps({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }), 'application/json')
+
+
+def abbyy_server(host='127.0.0.1', port=0, processing_time=2.0, result=None, **options):
+    """Fake ABBYY server; tasks complete `processing_time` seconds after submission."""
+    server = FakeServer((host, port), AbbyyHandler, **options)
+    server.processing_time = processing_time
+    server.result = result or canned_docx(DEFAULT_PARAGRAPHS)
+    server.tasks = {}
+    return server
+
+
+def openai_server(host='127.0.0.1', port=0, token_latency=0.0, **options):
+    """Fake OpenAI server; its API base is base_url + '/v1'."""
+    server = FakeServer((host, port), OpenAIHandler, **options)
+    server.token_latency = token_latency
+    server.prompt_tokens = 0
+    return server
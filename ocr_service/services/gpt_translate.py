@@ -0,0 +1,440 @@
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+from django.conf import settings
+
+
+# Rough characters per token, used to charge the tokens-per-minute bucket before the reply is known
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` units per minute.
+
+    acquire() blocks until the requested amount is available; a request larger
+    than the whole bucket waits for a full bucket instead of blocking forever.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def refund(self, amount):
+        """Give back units that were charged but not used (negative amounts charge more)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits of one API key."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens):
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(api_key):
+    """Process-wide limiter per API key, so concurrent HTTP requests share the key's budget."""
+    with _limiters_lock:
+        limiter = _limiters.get(api_key)
+        if limiter is None:
+            limiter = RateLimiter(settings.GPT_REQUESTS_PER_MINUTE, settings.GPT_TOKENS_PER_MINUTE)
+            _limiters[api_key] = limiter
+        return limiter
+
+
+def translation_prompt(source_language, target_language):
+    return (
+        f"You are a professional translator. Translate the following text from {source_language} to "
+        f"{target_language}. If a translation isn't possible or the text doesn't require translation, "
+        f"return it as it is without adding any unrelated content."
+    )
+
+
+def batch_prompt(source_language, target_language):
+    return (
+        f"You are a professional translator. Translate each item of the JSON array in the user message from "
+        f"{source_language} to {target_language}. Items that can't or don't need to be translated are returned "
+        f"as they are, without adding any unrelated content. Reply with a JSON object of the form "
+        f'{{"translations": [{{"id": <id>, "text": "<translation>"}}]}} containing every id exactly once.'
+    )
+
+
+def estimate_tokens(*texts, max_tokens=0):
+    """Upper-bound token charge of a call: prompt estimate plus the completion allowance."""
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + 10 + max_tokens
+
+
+def is_retryable(error):
+    """429s, 5xx responses and transport failures are retried; other API errors are not."""
+    if isinstance(error, (
+        openai.error.RateLimitError,
+        openai.error.ServiceUnavailableError,
+        openai.error.Timeout,
+        openai.error.TryAgain,
+        openai.error.APIConnectionError,
+    )):
+        return True
+    http_status = getattr(error, 'http_status', None)
+    return isinstance(error, openai.error.APIError) and http_status is not None and http_status >= 500
+
+
+def retry_delay(error, attempt):
+    """Retry-After when the server sent one, otherwise exponential backoff with full jitter."""
+    headers = getattr(error, 'headers', None) or {}
+    retry_after = headers.get('retry-after') or headers.get('Retry-After')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    backoff = min(settings.GPT_RETRY_MAX_DELAY, settings.GPT_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, backoff)
+
+
+def chat_completion(messages, api_key, max_tokens, limiter=None, **params):
+    """
+    One ChatCompletion call under the key's rate limits, retried on 429/5xx.
+
+    Returns the stripped content of the first choice.
+    """
+    limiter = limiter or rate_limiter(api_key)
+    charge = estimate_tokens(*(message["content"] for message in messages), max_tokens=max_tokens)
+
+    attempt = 0
+    while True:
+        limiter.acquire(charge)
+        try:
+            response = openai.ChatCompletion.create(
+                model=settings.GPT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                api_key=api_key,
+                api_base=settings.OPENAI_API_BASE,
+                request_timeout=settings.GPT_REQUEST_TIMEOUT,
+                **params,
+            )
+        except openai.error.OpenAIError as e:
+            if attempt >= settings.GPT_MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            attempt += 1
+            print(f"GPT call failed ({e.__class__.__name__}), retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        usage = response.get("usage") or {}
+        if usage.get("total_tokens"):
+            limiter.tokens.refund(charge - usage["total_tokens"])
+        return response.choices[0].message['content'].strip()
+
+
+def completion_allowance(text, max_tokens):
+    """Completion tokens of a single-segment call: max_tokens, or room for a translation twice the input."""
+    return max(max_tokens, 2 * estimate_tokens(text))
+
+
+def _pieces(text, split_sentences):
+    """Sentences of text, each with the whitespace that follows it, covering the whole text."""
+    sentences = [sentence for sentence in (split_sentences(text) if split_sentences else []) if sentence.strip()]
+    pieces = []
+    cursor = 0
+    for sentence in sentences:
+        start = text.find(sentence.strip(), cursor)
+        if start < 0:
+            # The splitter normalized the text, fall back to word windows
+            return [match.group() for match in re.finditer(r'\S+\s*', text)]
+        if start > cursor and pieces:
+            pieces[-1] += text[cursor:start]
+        cursor = start + len(sentence.strip())
+        pieces.append(text[start:cursor])
+    if cursor < len(text):
+        if pieces and not text[cursor:].strip():
+            pieces[-1] += text[cursor:]
+        else:
+            pieces.append(text[cursor:])
+    return pieces or [text]
+
+
+def _split_oversized(piece, max_tokens):
+    """Word windows of a piece over the budget, character slices of a single oversized word."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    words = re.findall(r'\S+\s*', piece) or [piece]
+    for word in words:
+        for start in range(0, len(word), max_chars):
+            yield word[start:start + max_chars]
+
+
+def split_long_text(text, split_sentences=None, max_tokens=None):
+    """
+    Split text into chunks of at most max_tokens estimated tokens at sentence boundaries.
+
+    Returns [(chunk, separator)]: translated chunks joined with their separators
+    rebuild the text. Consecutive sentences share a chunk while they fit;
+    sentences over the budget are cut between words.
+    """
+    max_tokens = max_tokens or settings.GPT_SEGMENT_MAX_TOKENS
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
+    pieces = []
+    for piece in _pieces(text, split_sentences):
+        if len(piece) > max_chars:
+            pieces.extend(_split_oversized(piece, max_tokens))
+        else:
+            pieces.append(piece)
+
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ''
+        current += piece
+    if current:
+        chunks.append(current)
+
+    # Whitespace around a chunk moves into the separator before or after it
+    result = []
+    for chunk in chunks:
+        content = chunk.strip()
+        leading = chunk[:len(chunk) - len(chunk.lstrip())]
+        if result:
+            result[-1] = (result[-1][0], result[-1][1] + leading)
+        if content:
+            result.append((content, chunk[len(leading) + len(content):]))
+    return result or [(text, '')]
+
+
+def plan_batches(texts):
+    """
+    Group (index, text) items into batches under the prompt token and segment budgets.
+
+    A segment over the token budget on its own gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            current_tokens + tokens > settings.GPT_BATCH_MAX_TOKENS
+            or len(current) >= settings.GPT_BATCH_MAX_SEGMENTS
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append((index, text))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_reply(content, items):
+    """
+    Translations of a batch reply as {index: text}.
+
+    Ids that are unknown, duplicated or not paired with a string are dropped, so
+    the caller retries them; a reply that is not valid JSON yields nothing.
+    """
+    # Tolerate a reply wrapped in a ```json fence
+    content = re.sub(r'^```(?:json)?\s*|\s*```$', '', content.strip())
+    try:
+        reply = json.loads(content)
+    except ValueError:
+        return {}
+    translations = reply.get("translations") if isinstance(reply, dict) else reply
+    if not isinstance(translations, list):
+        return {}
+
+    expected = {index for index, _ in items}
+    seen = {}
+    duplicated = set()
+    for item in translations:
+        if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+            continue
+        try:
+            index = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if index not in expected:
+            continue
+        if index in seen:
+            duplicated.add(index)
+        seen[index] = item["text"].strip()
+    return {index: text for index, text in seen.items() if index not in duplicated}
+
+
+def translate_batch(items, source_language, target_language, api_key, max_tokens, limiter):
+    """
+    Translate a batch of (index, text) items with one JSON prompt.
+
+    Items missing from the reply are split in halves and retried; a lone item
+    falls back to the single-segment prompt, so every item gets a translation.
+    """
+    if len(items) == 1:
+        index, text = items[0]
+        messages = [
+            {"role": "system", "content": translation_prompt(source_language, target_language)},
+            {"role": "user", "content": text},
+        ]
+        return {index: chat_completion(messages, api_key, completion_allowance(text, max_tokens), limiter)}
+
+    payload = json.dumps([{"id": index, "text": text} for index, text in items], ensure_ascii=False)
+    messages = [
+        {"role": "system", "content": batch_prompt(source_language, target_language)},
+        {"role": "user", "content": payload},
+    ]
+    # Room for every translation plus the JSON around it
+    reply_tokens = min(
+        settings.GPT_BATCH_MAX_OUTPUT_TOKENS,
+        sum(2 * estimate_tokens(text) for _, text in items) + 20 * len(items),
+    )
+    content = chat_completion(
+        messages, api_key, reply_tokens, limiter, response_format={"type": "json_object"}
+    )
+
+    translated = parse_batch_reply(content, items)
+    missing = [item for item in items if item[0] not in translated]
+    if missing:
+        print(f"GPT batch reply missed {len(missing)} of {len(items)} segments, retrying them")
+        middle = (len(missing) + 1) // 2
+        for part in (missing[:middle], missing[middle:]):
+            if part:
+                translated.update(
+                    translate_batch(part, source_language, target_language, api_key, max_tokens, limiter)
+                )
+    return translated
+
+
+def iter_translated_batches(texts, source_language, target_language, api_key, max_tokens=500, concurrency=None,
+                            batch=None, heartbeat=None, split_sentences=None):
+    """
+    Translate texts and yield (items, translations, error) as soon as texts finish.
+
+    items are the (index, text) pairs completed by a finished batch, translations
+    is {index: text} and error the exception of a batch that failed after its
+    retries (translations is then empty); other batches carry on. Texts over
+    GPT_SEGMENT_MAX_TOKENS are split at the sentences returned by
+    `split_sentences(text)`, their chunks translated in parallel and rejoined in
+    order. With `heartbeat` seconds set, (None, None, None) is yielded whenever
+    that long passes without a batch finishing. Closing the generator cancels the
+    batches not started yet.
+    """
+    if not texts:
+        return
+    concurrency = concurrency or settings.GPT_MAX_CONCURRENCY
+    batch = settings.GPT_BATCH_ENABLED if batch is None else batch
+    limiter = rate_limiter(api_key)
+
+    # Translation units: whole texts, or the chunks of long ones
+    units = []
+    owners = []
+    layouts = []  # per text: [(unit index, separator)]
+    for index, text in enumerate(texts):
+        if estimate_tokens(text) > settings.GPT_SEGMENT_MAX_TOKENS:
+            chunks = split_long_text(text, split_sentences)
+        else:
+            chunks = [(text, '')]
+        layouts.append([(len(units) + position, separator) for position, (_, separator) in enumerate(chunks)])
+        for chunk, _ in chunks:
+            units.append(chunk)
+            owners.append(index)
+    remaining = [len(layout) for layout in layouts]
+    translated_units = {}
+    failed = set()
+
+    batches = plan_batches(units) if batch else [[(index, unit)] for index, unit in enumerate(units)]
+
+    def translate(items):
+        return translate_batch(items, source_language, target_language, api_key, max_tokens, limiter)
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+        pending = {executor.submit(translate, items): items for items in batches}
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=heartbeat, return_when=FIRST_COMPLETED)
+                if not done:
+                    yield None, None, None
+                    continue
+                for future in done:
+                    items = pending.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        lost = sorted({owners[unit] for unit, _ in items} - failed)
+                        failed.update(lost)
+                        if lost:
+                            yield [(index, texts[index]) for index in lost], {}, error
+                        continue
+
+                    translated_units.update(future.result())
+                    completed = []
+                    for unit, _ in items:
+                        index = owners[unit]
+                        remaining[index] -= 1
+                        if remaining[index] == 0 and index not in failed:
+                            completed.append(index)
+                    if completed:
+                        yield [(index, texts[index]) for index in completed], {
+                            index: ''.join(translated_units[unit] + separator for unit, separator in layouts[index]).strip()
+                            for index in completed
+                        }, None
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def translate_texts(texts, source_language, target_language, api_key, max_tokens=500, concurrency=None, batch=None,
+                    split_sentences=None):
+    """
+    Translate texts, at most `concurrency` calls in flight.
+
+    With batching (GPT_BATCH_ENABLED by default) segments are packed into JSON
+    prompts under GPT_BATCH_MAX_TOKENS, otherwise each text is its own call; long
+    texts are split first (see iter_translated_batches). The result list is in
+    input order. The first call that still fails after its retries cancels the
+    calls not started yet and its error is raised.
+    """
+    translated = {}
+    for _, translations, error in iter_translated_batches(
+        texts, source_language, target_language, api_key, max_tokens, concurrency, batch,
+        split_sentences=split_sentences,
+    ):
+        if error is not None:
+            raise error
+        translated.update(translations)
+    return [translated[index] for index in range(len(texts))]
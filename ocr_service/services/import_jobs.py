@@ -0,0 +1,191 @@
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ocr_service.models.import_job_model import ImportJob
+from ocr_service.services.memory_import import import_tmx, import_xlsx
+
+
+IMPORTERS = {
+    'tmx': import_tmx,
+    'xlsx': import_xlsx,
+}
+
+
+def enqueue_import(file, file_type, memory_asset, name, source_language, target_languages):
+    """Save an uploaded TMX/XLSX file to disk and queue it for a worker."""
+    directory = settings.MEMORY_IMPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    file_path = os.path.join(directory, f"{uuid.uuid4().hex}.{file_type}")
+    with open(file_path, 'wb') as destination:
+        for chunk in file.chunks():
+            destination.write(chunk)
+
+    return ImportJob.objects.create(
+        memory_asset=memory_asset,
+        name=name,
+        source_language=source_language,
+        target_languages=",".join(target_languages),
+        file_type=file_type,
+        file_path=file_path,
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job(worker):
+    """
+    Mark the oldest runnable queued job as running and return it, or None.
+
+    Jobs whose language pairs overlap with a running job stay queued, so two
+    workers never upsert the same (source_language, target_language, source_text)
+    rows at the same time. Claims are serialized by locking the active job rows.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+
+    with transaction.atomic():
+        active = list(
+            ImportJob.objects.select_for_update()
+            .filter(status__in=[ImportJob.STATUS_QUEUED, ImportJob.STATUS_RUNNING])
+            .order_by('id')
+        )
+
+        busy_pairs = set()
+        for job in active:
+            if job.status != ImportJob.STATUS_RUNNING:
+                continue
+            if job.heartbeat_at and job.heartbeat_at < stale_before:
+                # The worker died mid-import, the upserts are idempotent so the job starts over.
+                # Clearing `worker` also fences off one that is only slow, see run_job().
+                job.status = ImportJob.STATUS_QUEUED
+                job.worker = ''
+                job.rows_processed = job.inserted = job.updated = job.skipped = 0
+                job.progress = None
+                job.save(update_fields=['status', 'worker', 'rows_processed', 'progress', 'inserted', 'updated', 'skipped'])
+                continue
+            busy_pairs.update((job.source_language, lang) for lang in job.target_language_list)
+
+        for job in active:
+            if job.status != ImportJob.STATUS_QUEUED:
+                continue
+            pairs = {(job.source_language, lang) for lang in job.target_language_list}
+            if pairs & busy_pairs:
+                continue
+
+            now = timezone.now()
+            job.status = ImportJob.STATUS_RUNNING
+            job.worker = worker
+            job.started_at = now
+            job.heartbeat_at = now
+            job.save(update_fields=['status', 'worker', 'started_at', 'heartbeat_at'])
+            return job
+
+    return None
+
+
+class ImportJobLost(Exception):
+    """The job was requeued as stale while this worker was still running it."""
+
+
+def run_job(job):
+    """
+    Import the job's file, reporting progress on every flushed chunk.
+
+    Every write is conditional on the job still being claimed by this worker:
+    each chunk first renews the claim inside its own transaction, so a worker
+    that was requeued as stale rolls back its current chunk and leaves the
+    job, and its file, to the one that claimed it again.
+    """
+    claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_RUNNING, worker=job.worker)
+
+    def hold_claim(writer):
+        # Also locks the job row until the chunk commits, a concurrent requeue waits for it
+        if not claimed.update(heartbeat_at=timezone.now()):
+            raise ImportJobLost(f"Import job #{job.pk} was requeued")
+
+    def report(writer):
+        reported = claimed.update(
+            rows_processed=writer.rows_processed,
+            progress=writer.progress,
+            inserted=writer.inserted,
+            updated=writer.updated,
+            skipped=writer.skipped,
+            heartbeat_at=timezone.now(),
+        )
+        if not reported:
+            raise ImportJobLost(f"Import job #{job.pk} was requeued")
+
+    importer = IMPORTERS[job.file_type]
+    try:
+        with open(job.file_path, 'rb') as file:
+            importer(
+                file,
+                job.source_language,
+                job.target_language_list,
+                job.name,
+                job.memory_asset,
+                on_flush=report,
+                before_write=hold_claim,
+            )
+    except Exception as e:
+        finished = claimed.update(
+            status=ImportJob.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+        succeeded = False
+    else:
+        finished = claimed.update(
+            status=ImportJob.STATUS_COMPLETED,
+            progress=1.0,
+            finished_at=timezone.now(),
+        )
+        succeeded = bool(finished)
+
+    if not finished:
+        print(f"Import job #{job.pk} was requeued while {job.worker} ran it, leaving it to its new worker")
+    elif os.path.exists(job.file_path):
+        os.remove(job.file_path)
+    return succeeded
+
+
+def job_status(job):
+    """Build the status payload of an import job, including throughput and ETA."""
+    rows_per_second = None
+    eta_seconds = None
+
+    if job.started_at:
+        end = job.finished_at or timezone.now()
+        elapsed = (end - job.started_at).total_seconds()
+        if elapsed > 0:
+            rows_per_second = round(job.rows_processed / elapsed, 2)
+        if job.status == ImportJob.STATUS_RUNNING and job.progress and elapsed > 0:
+            eta_seconds = round(elapsed * (1 - job.progress) / job.progress, 1)
+
+    if job.status == ImportJob.STATUS_COMPLETED:
+        eta_seconds = 0
+
+    return {
+        "job_id": job.id,
+        "memory_asset_id": job.memory_asset_id,
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "progress": job.progress,
+        "rows_per_second": rows_per_second,
+        "eta_seconds": eta_seconds,
+        "inserted": job.inserted,
+        "updated": job.updated,
+        "skipped": job.skipped,
+        "errors": [job.error] if job.error else [],
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -0,0 +1,197 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ocr_service.models.memory_models import Memory, source_text_hash
+from ocr_service.models.memory_pair_version_model import MemoryPairVersion
+
+
+# Hashes per IN (...) query when a pair is resolved without the cache
+MATCH_CHUNK_SIZE = 500
+
+# Rough per-entry cost of the tuple, the dict slot and the hash key on top of the strings
+ENTRY_OVERHEAD_BYTES = 250
+
+
+def bump_pair_versions(pairs):
+    """Invalidate cached lookups of every (source_language, target_language) pair written to."""
+    for source_language, target_language in set(pairs):
+        updated = MemoryPairVersion.objects.filter(
+            source_language=source_language, target_language=target_language
+        ).update(version=F('version') + 1)
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                MemoryPairVersion.objects.create(
+                    source_language=source_language, target_language=target_language, version=1
+                )
+        except IntegrityError:
+            # Another writer created the row first
+            MemoryPairVersion.objects.filter(
+                source_language=source_language, target_language=target_language
+            ).update(version=F('version') + 1)
+
+
+def memory_pairs(queryset):
+    """
+    Distinct (source_language, target_language) pairs of a Memory queryset.
+
+    Collect them before a delete or update, and bump them once the write is done:
+    bumping first would let a concurrent reader cache the old rows under the new version.
+    """
+    return set(queryset.values_list('source_language', 'target_language').distinct())
+
+
+def preferred(candidate, current):
+    """
+    Whether a later match should replace the current one for the same source text.
+
+    The oldest record wins, unless it has no translation and the later one does, or
+    it is a machine translation and the later one a translator's.
+    """
+    if not candidate[2]:
+        return False
+    return not current[2] or (current[3] and not candidate[3])
+
+
+def pair_version(source_language, target_language):
+    version = MemoryPairVersion.objects.filter(
+        source_language=source_language, target_language=target_language
+    ).values_list('version', flat=True).first()
+    return version or 0
+
+
+class PairLookupCache:
+    """
+    In-process LRU of exact-match maps, one per (source_language, target_language).
+
+    A map is source_hash -> (id, source_text, target_text, is_machine_translation).
+    Each access costs one
+    query on memory_pair_versions; the pair's memories are only reloaded after a
+    write bumped its version. Pairs larger than the budget are not cached and
+    get() returns None so callers fall back to indexed queries.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # pair -> (version, lookup, size)
+        self._oversized = {}  # pair -> version found too large to cache
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, source_language, target_language):
+        pair = (source_language, target_language)
+        version = pair_version(source_language, target_language)
+
+        with self._lock:
+            entry = self._entries.get(pair)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(pair)
+                return entry[1]
+            if self._oversized.get(pair) == version:
+                return None
+
+        lookup, size = self._load(source_language, target_language)
+        if lookup is None:
+            with self._lock:
+                self._oversized[pair] = version
+            return None
+
+        with self._lock:
+            previous = self._entries.pop(pair, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._entries[pair] = (version, lookup, size)
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+        return lookup
+
+    def _load(self, source_language, target_language):
+        lookup = {}
+        size = 0
+        rows = Memory.objects.filter(
+            source_language=source_language, target_language=target_language
+        ).order_by('id').values_list('source_hash', 'id', 'source_text', 'target_text', 'is_machine_translation')
+
+        for source_hash, memory_id, source_text, target_text, machine in rows.iterator(chunk_size=5000):
+            current = lookup.get(source_hash)
+            if current is not None and not preferred((memory_id, source_text, target_text, machine), current):
+                continue
+            lookup[source_hash] = (memory_id, source_text, target_text, machine)
+            size += len(source_text) + len(target_text) + ENTRY_OVERHEAD_BYTES
+            if size > self.max_bytes:
+                return None, 0
+        return lookup, size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._oversized.clear()
+            self._size = 0
+
+
+pair_cache = PairLookupCache(settings.TM_CACHE_MAX_BYTES)
+
+
+def find_exact(source_language, target_language, source_text):
+    """
+    Exact TM match as (id, source_text, target_text, is_machine_translation), from
+    the pair cache when it fits the budget.
+    """
+    source_hash = source_text_hash(source_text)
+    lookup = pair_cache.get(source_language, target_language)
+    if lookup is not None:
+        return lookup.get(source_hash)
+
+    match = None
+    rows = Memory.objects.filter(
+        source_language=source_language,
+        target_language=target_language,
+        source_hash=source_hash,
+    ).order_by('id').values_list('id', 'source_text', 'target_text', 'is_machine_translation')
+    for row in rows:
+        if match is None or preferred(row, match):
+            match = row
+    return match
+
+
+def find_exact_many(source_language, target_language, source_texts):
+    """
+    Resolve many source texts of one pair at once.
+
+    Returns {source_text: (id, source_text, target_text, is_machine_translation)}
+    for the texts with a match. Uses the pair cache when it fits the budget,
+    otherwise one indexed IN query per MATCH_CHUNK_SIZE distinct texts.
+    """
+    hashes = {}
+    for text in source_texts:
+        hashes.setdefault(source_text_hash(text), []).append(text)
+
+    lookup = pair_cache.get(source_language, target_language)
+    if lookup is None:
+        lookup = {}
+        pending = list(hashes)
+        for start in range(0, len(pending), MATCH_CHUNK_SIZE):
+            rows = Memory.objects.filter(
+                source_language=source_language,
+                target_language=target_language,
+                source_hash__in=pending[start:start + MATCH_CHUNK_SIZE],
+            ).order_by('id').values_list('source_hash', 'id', 'source_text', 'target_text', 'is_machine_translation')
+            for source_hash, *match in rows:
+                current = lookup.get(source_hash)
+                if current is None or preferred(match, current):
+                    lookup[source_hash] = tuple(match)
+
+    matches = {}
+    for source_hash, texts in hashes.items():
+        match = lookup.get(source_hash)
+        if match is not None:
+            for text in texts:
+                matches[text] = match
+    return matches
@@ -0,0 +1,230 @@
+import hashlib
+import re
+
+from django.conf import settings
+
+from ocr_service.models.memory_fuzzy_model import MemoryFuzzyBucket
+from ocr_service.models.memory_models import Memory, normalize_source_text
+
+
+# One-permutation MinHash: every n-gram is hashed once and falls into one of NUM_BANDS * ROWS_PER_BAND
+# bins, the signature is the minimum of each bin. Two rows per band keeps recall high for short
+# segments (a candidate needs one shared band); precision comes from the edit-distance scoring.
+NUM_BANDS = 16
+ROWS_PER_BAND = 2
+NUM_BINS = NUM_BANDS * ROWS_PER_BAND
+NGRAM_SIZE = 3
+
+# Buckets per IN (...) query and rows per bulk write
+QUERY_CHUNK_SIZE = 1000
+WRITE_BATCH_SIZE = 5000
+
+# Buckets shared by more memories than this are boilerplate n-grams that say little about
+# similarity; rarer buckets take precedence when ranking candidates
+COMMON_BUCKET_MEMBERS = 1000
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fuzzy_key(text):
+    """Text form compared by the fuzzy matcher: normalized, lower-cased, single-spaced."""
+    return _WHITESPACE.sub(' ', normalize_source_text(text).lower())
+
+
+def _ngrams(key):
+    if len(key) <= NGRAM_SIZE:
+        return {key}
+    return {key[i:i + NGRAM_SIZE] for i in range(len(key) - NGRAM_SIZE + 1)}
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def band_buckets(text):
+    """LSH bucket ids of a text, one signed 64-bit value per band."""
+    key = fuzzy_key(text)
+    if not key:
+        return []
+
+    signature = [None] * NUM_BINS
+    for gram in _ngrams(key):
+        value = _hash64(gram)
+        index = value % NUM_BINS
+        if signature[index] is None or value < signature[index]:
+            signature[index] = value
+
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        if None in rows:
+            # Short texts leave bins empty, an empty band would make unrelated texts collide
+            continue
+        digest = hashlib.blake2b(f"{band}:{rows}".encode('ascii'), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def similarity(a, b, min_score=0.0):
+    """
+    Levenshtein similarity between two fuzzy keys: 1 - distance / longest length.
+
+    Only the diagonal band that can still reach min_score is computed, and the
+    scan stops as soon as every cell of a row is over budget; 0.0 is returned
+    for pairs below min_score.
+    """
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    if len(a) < len(b):
+        a, b = b, a
+
+    longest = len(a)
+    max_distance = int((1 - min_score) * longest + 1e-9)
+    if longest - len(b) > max_distance:
+        return 0.0
+
+    over = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= max_distance else over
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return 0.0
+        previous = current
+
+    distance = previous[-1]
+    if distance > max_distance:
+        return 0.0
+    return 1 - distance / longest
+
+
+def index_memories(memories):
+    """
+    (Re)build the fuzzy buckets of the given memories.
+
+    Accepts Memory instances or (id, source_language, target_language, source_text)
+    tuples. Existing buckets of those memories are replaced.
+    """
+    if not settings.TM_FUZZY_ENABLED:
+        return
+
+    rows = [
+        (memory.id, memory.source_language, memory.target_language, memory.source_text)
+        if isinstance(memory, Memory) else memory
+        for memory in memories
+    ]
+    if not rows:
+        return
+
+    MemoryFuzzyBucket.objects.filter(memory_id__in=[row[0] for row in rows]).delete()
+
+    batch = []
+    for memory_id, source_language, target_language, source_text in rows:
+        for bucket in set(band_buckets(source_text)):
+            batch.append(MemoryFuzzyBucket(
+                memory_id=memory_id,
+                source_language=source_language,
+                target_language=target_language,
+                bucket=bucket,
+            ))
+        if len(batch) >= WRITE_BATCH_SIZE:
+            MemoryFuzzyBucket.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        MemoryFuzzyBucket.objects.bulk_create(batch)
+
+
+def find_fuzzy_many(source_language, target_language, source_texts, min_score=None, limit=1):
+    """
+    Fuzzy TM matches for many texts of one pair.
+
+    Returns {source_text: [{id, source_text, target_text, is_machine_translation, score}, ...]}
+    with at most `limit` matches per text, best first, scoring at least min_score.
+    Memories without a target text are never returned.
+    Candidate lookup costs one indexed query per QUERY_CHUNK_SIZE buckets, never a
+    table scan.
+    """
+    if min_score is None:
+        min_score = settings.TM_FUZZY_MIN_SCORE
+    if not settings.TM_FUZZY_ENABLED:
+        return {}
+
+    buckets_by_text = {text: band_buckets(text) for text in set(source_texts)}
+    all_buckets = list({bucket for buckets in buckets_by_text.values() for bucket in buckets})
+    if not all_buckets:
+        return {}
+
+    # bucket -> memory ids sharing it
+    members = {}
+    for start in range(0, len(all_buckets), QUERY_CHUNK_SIZE):
+        rows = MemoryFuzzyBucket.objects.filter(
+            source_language=source_language,
+            target_language=target_language,
+            bucket__in=all_buckets[start:start + QUERY_CHUNK_SIZE],
+        ).values_list('bucket', 'memory_id')
+        for bucket, memory_id in rows:
+            members.setdefault(bucket, []).append(memory_id)
+
+    # Rank candidates by the number of shared bands, keep the best ones per text. Common
+    # buckets only count when a text has nothing rarer to go on.
+    candidates_by_text = {}
+    for text, buckets in buckets_by_text.items():
+        rare = [bucket for bucket in buckets if len(members.get(bucket, ())) <= COMMON_BUCKET_MEMBERS]
+        hits = {}
+        for bucket in rare or buckets:
+            for memory_id in members.get(bucket, ()):
+                hits[memory_id] = hits.get(memory_id, 0) + 1
+        if hits:
+            ranked = sorted(hits, key=hits.get, reverse=True)
+            candidates_by_text[text] = ranked[:settings.TM_FUZZY_MAX_CANDIDATES]
+
+    candidate_ids = list({memory_id for ids in candidates_by_text.values() for memory_id in ids})
+    memories = {}
+    for start in range(0, len(candidate_ids), QUERY_CHUNK_SIZE):
+        # Untranslated rows (DuplicateMemory copies, pending write-backs) have nothing to offer
+        rows = Memory.objects.filter(id__in=candidate_ids[start:start + QUERY_CHUNK_SIZE]).exclude(
+            target_text=''
+        ).values_list('id', 'source_text', 'target_text', 'is_machine_translation')
+        for memory_id, source_text, target_text, machine in rows:
+            memories[memory_id] = (source_text, target_text, machine)
+
+    matches = {}
+    for text, ids in candidates_by_text.items():
+        key = fuzzy_key(text)
+        scored = []
+        for memory_id in ids:
+            if memory_id not in memories:
+                continue
+            source_text, target_text, machine = memories[memory_id]
+            score = similarity(key, fuzzy_key(source_text), min_score)
+            if score >= min_score:
+                scored.append({
+                    "id": memory_id,
+                    "source_text": source_text,
+                    "target_text": target_text,
+                    "is_machine_translation": machine,
+                    "score": round(score, 4),
+                })
+        if scored:
+            scored.sort(key=lambda match: (-match["score"], match["id"]))
+            matches[text] = scored[:limit]
+    return matches
+
+
+def find_fuzzy(source_language, target_language, source_text, min_score=None, limit=5):
+    """Top fuzzy matches of a single text, best first."""
+    return find_fuzzy_many(source_language, target_language, [source_text], min_score, limit).get(source_text, [])
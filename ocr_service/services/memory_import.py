@@ -0,0 +1,321 @@
+from django.conf import settings
+from django.db import transaction
+from lxml import etree
+from openpyxl import load_workbook
+
+from ocr_service.models.memory_models import Memory, source_text_hash
+from ocr_service.services.memory_cache import bump_pair_versions
+from ocr_service.services.memory_fuzzy import index_memories
+
+
+# Number of (source_text, target_language) pairs resolved and written per round-trip
+DEFAULT_BATCH_SIZE = 1000
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+def iter_tmx_units(file, source_language, target_languages):
+    """
+    Stream translation units out of a TMX file without building the whole tree.
+
+    Yields (tu_number, source_text, target_texts) and clears every <tu> once it
+    has been read, so memory stays flat regardless of the file size.
+    """
+    target_languages = set(target_languages)
+    context = etree.iterparse(file, events=('end',), tag='tu', huge_tree=True)
+
+    for tu_number, (_, tu) in enumerate(context, start=1):
+        source_text = None
+        target_texts = {lang: None for lang in target_languages}
+
+        for tuv in tu.iterchildren('tuv'):  # Translation unit variants
+            lang = tuv.get(XML_LANG)
+            seg = next(tuv.iterchildren('seg'), None)
+
+            if seg is not None:
+                # Clean the text content, inline markup inside <seg> is flattened to its text
+                cleaned_text = seg.text if len(seg) == 0 else ''.join(seg.itertext())
+                cleaned_text = (cleaned_text or '').strip()
+
+                if lang == source_language:
+                    source_text = cleaned_text
+                elif lang in target_languages:
+                    target_texts[lang] = cleaned_text
+
+        yield tu_number, source_text, target_texts
+
+        # Release the unit and every already processed sibling still hanging off <body>
+        tu.clear()
+        while tu.getprevious() is not None:
+            del tu.getparent()[0]
+
+    del context
+
+
+def iter_xlsx_rows(file, source_language, target_languages, on_dimensions=None):
+    """
+    Stream the source and target language columns out of the first worksheet.
+
+    The workbook is opened in read-only mode so rows are parsed lazily, and only
+    the column span holding the requested languages is read. Yields
+    (row_number, source_text, target_texts) with empty cells as None.
+    on_dimensions, when given, receives the number of data rows declared by the sheet.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = {str(value).strip(): index for index, value in enumerate(header) if value is not None}
+
+        # Verify columns
+        if source_language not in columns:
+            raise ValueError(f"Source language column '{source_language}' not found in the file.")
+        for lang in target_languages:
+            if lang not in columns:
+                raise ValueError(f"Target language column '{lang}' not found in the file.")
+
+        if on_dimensions and sheet.max_row:
+            on_dimensions(sheet.max_row - 1)
+
+        wanted = [columns[source_language]] + [columns[lang] for lang in target_languages]
+        first_column = min(wanted)
+        source_index = columns[source_language] - first_column
+        target_indexes = {lang: columns[lang] - first_column for lang in target_languages}
+
+        data_rows = sheet.iter_rows(
+            min_row=2, min_col=first_column + 1, max_col=max(wanted) + 1, values_only=True
+        )
+        for row_number, row in enumerate(data_rows, start=1):
+            yield (
+                row_number,
+                _cell_text(row, source_index),
+                {lang: _cell_text(row, index) for lang, index in target_indexes.items()},
+            )
+    finally:
+        workbook.close()
+
+
+def _cell_text(row, index):
+    value = row[index] if index < len(row) else None
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+class MemoryBatchWriter:
+    """
+    Collects translation units and upserts them into Memory in chunks.
+
+    Each chunk costs one SELECT to resolve the rows that already exist, one
+    bulk_update and one bulk_create, all inside a single transaction.
+    before_write, when given, runs first inside that transaction; an exception
+    from it rolls the chunk back. on_flush runs after the chunk committed.
+    """
+
+    def __init__(self, source_language, name, memory_asset, batch_size=DEFAULT_BATCH_SIZE, label="TU", on_flush=None,
+                 before_write=None):
+        self.source_language = source_language
+        self.name = name
+        self.memory_asset = memory_asset
+        self.batch_size = batch_size
+        self.label = label
+        self.on_flush = on_flush
+        self.before_write = before_write
+
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+
+        # Maintained by the caller: units read so far and the fraction of the input consumed
+        self.rows_processed = 0
+        self.progress = None
+
+        # (target_language, source_hash) -> (unit_number, source_text, target_text)
+        self._pending = {}
+
+    def add(self, unit_number, source_text, target_language, target_text):
+        """
+        Queue one source/target pair. A missing target_text only refreshes the
+        asset and name of an existing record, it never creates a new one.
+        """
+        # Later units win over earlier ones within the same chunk, like the per-row upsert did
+        key = (target_language, source_text_hash(source_text))
+        previous = self._pending.get(key)
+        if previous is not None and not target_text:
+            target_text = previous[2]
+        self._pending[key] = (unit_number, source_text, target_text)
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def skip(self, unit_number, target_language=None, reason="Missing source text"):
+        self.skipped += 1
+        if target_language:
+            print(f"Skipping {self.label} #{unit_number} for target language '{target_language}': {reason}")
+        else:
+            print(f"Skipping {self.label} #{unit_number}: {reason}")
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        pending = self._pending
+        self._pending = {}
+
+        target_languages = {lang for lang, _ in pending}
+        source_hashes = {source_hash for _, source_hash in pending}
+
+        with transaction.atomic():
+            if self.before_write:
+                self.before_write(self)
+
+            # Resolve every existing row of the chunk with a single query
+            existing = {}
+            candidates = Memory.objects.filter(
+                source_language=self.source_language,
+                target_language__in=target_languages,
+                source_hash__in=source_hashes,
+            ).order_by('id')
+            for memory in candidates:
+                existing.setdefault((memory.target_language, memory.source_hash), memory)
+
+            to_update = []
+            to_create = []
+            skipped = 0
+            for (lang, source_hash), (unit_number, source_text, target_text) in pending.items():
+                record = existing.get((lang, source_hash))
+                if record is not None:
+                    if target_text:
+                        record.target_text = target_text
+                        # An imported translation replaces a machine translation saved earlier
+                        record.is_machine_translation = False
+                        record.mt_model = ''
+                        record.translated_at = None
+                    record.memory_asset = self.memory_asset
+                    record.name = self.name
+                    to_update.append(record)
+                elif target_text:
+                    to_create.append(Memory(
+                        name=self.name,
+                        source_language=self.source_language,
+                        target_language=lang,
+                        source_text=source_text,
+                        source_hash=source_hash,
+                        target_text=target_text,
+                        memory_asset=self.memory_asset,
+                    ))
+                else:
+                    skipped += 1
+                    print(f"Skipping {self.label} #{unit_number} for target language '{lang}': Missing target text")
+
+            if to_update:
+                Memory.objects.bulk_update(
+                    to_update,
+                    ['target_text', 'memory_asset', 'name', 'is_machine_translation', 'mt_model', 'translated_at'],
+                    batch_size=self.batch_size,
+                )
+            if to_create:
+                Memory.objects.bulk_create(to_create, batch_size=self.batch_size)
+            if to_update or to_create:
+                bump_pair_versions((self.source_language, record.target_language) for record in to_update + to_create)
+            if to_create and settings.TM_FUZZY_ENABLED:
+                # bulk_create does not return primary keys on MySQL, read them back for the fuzzy index
+                index_memories(Memory.objects.filter(
+                    source_language=self.source_language,
+                    target_language__in=target_languages,
+                    source_hash__in={record.source_hash for record in to_create},
+                    fuzzy_buckets__isnull=True,
+                ).values_list('id', 'source_language', 'target_language', 'source_text'))
+
+        self.updated += len(to_update)
+        self.inserted += len(to_create)
+        self.skipped += skipped
+        print(f"Added {len(to_create)}, updated {len(to_update)}, skipped {skipped} {self.label}s "
+              f"(total: {self.inserted} added, {self.updated} updated, {self.skipped} skipped)")
+
+        if self.on_flush:
+            self.on_flush(self)
+
+    def close(self):
+        """Flush the remaining chunk and return the import summary."""
+        self.flush()
+        if self.on_flush:
+            # Final report, also covers inputs where every unit was skipped
+            self.on_flush(self)
+        return {"inserted": self.inserted, "updated": self.updated, "skipped": self.skipped}
+
+
+def import_tmx(file, source_language, target_languages, name, memory_asset, on_flush=None, before_write=None):
+    """Process TMX file and update or save translations for multiple target languages."""
+    try:
+        writer = MemoryBatchWriter(
+            source_language, name, memory_asset, label="TU", on_flush=on_flush, before_write=before_write
+        )
+        total_bytes = _stream_size(file)
+
+        # Translation units are streamed one at a time and written in bounded chunks
+        for tu_number, source_text, target_texts in iter_tmx_units(file, source_language, target_languages):
+            writer.rows_processed = tu_number
+            if total_bytes:
+                writer.progress = min(file.tell() / total_bytes, 1.0)
+
+            # Queue source and target text, existing records are resolved per chunk
+            if source_text:
+                for lang, target_text in target_texts.items():
+                    target_text = target_text.strip() if target_text else None
+
+                    if target_text:
+                        writer.add(tu_number, source_text, lang, target_text)
+                    else:
+                        writer.skip(tu_number, lang, "Missing target text")
+            else:
+                writer.skip(tu_number)
+
+        writer.progress = 1.0
+        return writer.close()
+
+    except Exception as e:
+        print(f"Error processing TMX file: {e}")
+        raise ValueError(f"Error processing TMX file: {e}")
+
+
+def import_xlsx(file, source_language, target_languages, name, memory_asset, on_flush=None, before_write=None):
+    """Process XLSX file and update or save translations for multiple target languages."""
+    try:
+        writer = MemoryBatchWriter(
+            source_language, name, memory_asset, label="Row", on_flush=on_flush, before_write=before_write
+        )
+        total_rows = []
+
+        # Rows are streamed from the workbook and written in bounded chunks
+        rows = iter_xlsx_rows(file, source_language, target_languages, on_dimensions=total_rows.append)
+        for row_number, source_text, target_texts in rows:
+            writer.rows_processed = row_number
+            if total_rows and total_rows[0] > 0:
+                writer.progress = min(row_number / total_rows[0], 1.0)
+
+            if source_text:
+                for lang, target_text in target_texts.items():
+                    # Existing records are refreshed even without a target text
+                    writer.add(row_number, source_text, lang, target_text)
+            else:
+                writer.skip(row_number)
+
+        writer.progress = 1.0
+        return writer.close()
+
+    except Exception as e:
+        print(f"Error processing XLSX file: {e}")
+        raise ValueError(f"Error processing XLSX file: {e}")
+
+
+def _stream_size(file):
+    try:
+        position = file.tell()
+        file.seek(0, 2)
+        size = file.tell()
+        file.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
@@ -0,0 +1,148 @@
+import atexit
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ocr_service.models.memory_asset_model import MemoryAsset
+from ocr_service.models.memory_models import Memory, source_text_hash
+from ocr_service.services.memory_cache import bump_pair_versions
+from ocr_service.services.memory_fuzzy import index_memories
+
+
+def machine_translation_asset(source_language, target_language):
+    """The asset holding machine translations of a pair, created on first use."""
+    asset = MemoryAsset.objects.with_target_languages(source_language, [target_language]).filter(
+        name=settings.MT_MEMORY_ASSET_NAME
+    ).order_by('id').first()
+    if asset is None:
+        asset = MemoryAsset(name=settings.MT_MEMORY_ASSET_NAME, source_language=source_language)
+        asset.set_target_languages([target_language])
+    return asset
+
+
+class MachineTranslationBuffer:
+    """
+    Write-behind buffer of machine translations headed for Memory.
+
+    add() only appends to a list, so the HTTP response never waits on inserts. A
+    background thread flushes every MT_WRITEBACK_INTERVAL seconds, or as soon as
+    MT_WRITEBACK_BATCH_SIZE translations are pending, and once more at exit.
+    Texts that already have a translated Memory row for the pair are left
+    alone, so a translator's entry is never overwritten by a machine
+    translation; rows without a translation yet (e.g. from DuplicateMemory)
+    are filled in.
+    """
+
+    def __init__(self):
+        self._pending = []  # (source_language, target_language, source_text, target_text, model, translated_at)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, source_language, target_language, translations, model):
+        """Queue (source_text, target_text) pairs produced by `model`."""
+        translated_at = timezone.now()
+        with self._lock:
+            self._pending.extend(
+                (source_language, target_language, source_text, target_text, model, translated_at)
+                for source_text, target_text in translations
+                if source_text and target_text
+            )
+            pending = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mt-writeback", daemon=True)
+                self._thread.start()
+        if pending >= settings.MT_WRITEBACK_BATCH_SIZE:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.MT_WRITEBACK_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Machine translation write-back failed: {e}")
+            finally:
+                # The thread outlives requests, don't keep a connection open between flushes
+                connection.close()
+
+    def flush(self):
+        """Write every pending translation; returns the number of Memory rows created or filled in."""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = []
+            if not pending:
+                return 0
+
+            # (source_language, target_language) -> {source_hash: entry}, the first translation of a text wins
+            by_pair = {}
+            for entry in pending:
+                source_language, target_language, source_text = entry[:3]
+                by_pair.setdefault((source_language, target_language), {}).setdefault(
+                    source_text_hash(source_text), entry
+                )
+
+            written = 0
+            for (source_language, target_language), entries in by_pair.items():
+                written += self._write_pair(source_language, target_language, entries)
+            print(f"Machine translation write-back: {len(pending)} queued, {written} memories written")
+            return written
+
+    def _write_pair(self, source_language, target_language, entries):
+        with transaction.atomic():
+            existing = list(Memory.objects.filter(
+                source_language=source_language,
+                target_language=target_language,
+                source_hash__in=list(entries),
+            ).only('id', 'source_hash', 'target_text'))
+            new = dict(entries)
+            untranslated = []
+            for memory in existing:
+                entry = new.pop(memory.source_hash, None)
+                if entry is not None and not memory.target_text.strip():
+                    # Looked up as a miss every time until it has a translation
+                    _, _, _, memory.target_text, memory.mt_model, memory.translated_at = entry
+                    memory.is_machine_translation = True
+                    untranslated.append(memory)
+            if not new and not untranslated:
+                return 0
+
+            Memory.objects.bulk_update(
+                untranslated, ['target_text', 'is_machine_translation', 'mt_model', 'translated_at'],
+                batch_size=settings.MT_WRITEBACK_BATCH_SIZE,
+            )
+            asset = machine_translation_asset(source_language, target_language) if new else None
+            Memory.objects.bulk_create([
+                Memory(
+                    name=asset.name,
+                    source_language=source_language,
+                    target_language=target_language,
+                    source_text=source_text,
+                    source_hash=source_hash,
+                    target_text=target_text,
+                    memory_asset=asset,
+                    is_machine_translation=True,
+                    mt_model=model,
+                    translated_at=translated_at,
+                )
+                for source_hash, (_, _, source_text, target_text, model, translated_at) in new.items()
+            ], batch_size=settings.MT_WRITEBACK_BATCH_SIZE)
+            bump_pair_versions([(source_language, target_language)])
+            if new and settings.TM_FUZZY_ENABLED:
+                # bulk_create does not return primary keys on MySQL, read them back for the fuzzy index
+                index_memories(Memory.objects.filter(
+                    source_language=source_language,
+                    target_language=target_language,
+                    source_hash__in=list(new),
+                    fuzzy_buckets__isnull=True,
+                ).values_list('id', 'source_language', 'target_language', 'source_text'))
+        return len(new) + len(untranslated)
+
+
+mt_buffer = MachineTranslationBuffer()
+atexit.register(mt_buffer.flush)
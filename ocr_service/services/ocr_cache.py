@@ -0,0 +1,120 @@
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from ocr_service.models.ocr_result_cache_model import OcrResultCacheEntry
+from ocr_service.models.ocr_task_model import OcrTask
+from ocr_service.services.abbyy import PROCESS_IMAGE_PARAMS
+from ocr_service.services.result_store import result_store
+
+
+def file_hash(file):
+    """SHA-256 of an uploaded file, which is rewound for the upload to ABBYY."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash, language, engine='abbyy'):
+    recognition = {'language': language, **PROCESS_IMAGE_PARAMS}
+    if engine != 'abbyy':
+        # Keys of ABBYY results predate the engine choice
+        recognition['engine'] = engine
+    settings_json = json.dumps(recognition, sort_keys=True)
+    return hashlib.sha256(f"{content_hash}:{settings_json}".encode('utf-8')).hexdigest()
+
+
+class OcrResultCache:
+    """
+    Recognized DOCX results by upload content and recognition settings.
+
+    Entries live in ocr_result_cache and point at the result store, so a hit
+    costs one indexed query and no ABBYY call. An entry whose blob has been
+    evicted from the store is dropped on lookup; past OCR_CACHE_MAX_ENTRIES
+    the least recently used entries are deleted. Hits and misses are counted
+    per process, hits also per entry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, key):
+        """The cached result hash for `key`, or None."""
+        entry = OcrResultCacheEntry.objects.filter(cache_key=key).first()
+        if entry is not None and result_store.get(entry.result_hash) is None:
+            entry.delete()
+            entry = None
+        self._count(entry is not None)
+        if entry is None:
+            return None
+        OcrResultCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        return entry.result_hash
+
+    def store(self, task):
+        """Remember the result of a completed task submitted with a cache key."""
+        if not task.cache_key or not task.result_hash:
+            return
+        OcrResultCacheEntry.objects.update_or_create(
+            cache_key=task.cache_key,
+            defaults={
+                'result_hash': task.result_hash,
+                'task_id': task.task_id,
+                'language': task.source_language,
+                'last_used_at': timezone.now(),
+            },
+        )
+        self.trim()
+
+    def trim(self):
+        limit = settings.OCR_CACHE_MAX_ENTRIES
+        stale_ids = list(
+            OcrResultCacheEntry.objects.order_by('-last_used_at').values_list('pk', flat=True)[limit:limit + 1000]
+        )
+        if stale_ids:
+            OcrResultCacheEntry.objects.filter(pk__in=stale_ids).delete()
+
+    def completed_task(self, result_hash, key, file_name='', source_language='', target_language='', prefix='cached'):
+        """A synthetic, already completed task serving a cached or locally produced result."""
+        now = timezone.now()
+        return OcrTask.objects.create(
+            task_id=f"{prefix}-{uuid.uuid4()}",
+            file_name=file_name,
+            source_language=source_language,
+            target_language=target_language,
+            status='Completed',
+            estimated_processing_time='0',
+            cache_key=key,
+            result_hash=result_hash,
+            last_polled_at=now,
+            completed_at=now,
+        )
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hitRate': hits / lookups if lookups else None,
+            'entries': OcrResultCacheEntry.objects.count(),
+        }
+
+
+ocr_cache = OcrResultCache()
@@ -0,0 +1,211 @@
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import pypdfium2 as pdfium
+from django.conf import settings
+from django.utils import timezone
+
+from ocr_service.services.abbyy import submit_file_for_ocr
+from ocr_service.services.ocr_tasks import poll_upstream
+from ocr_service.services.result_store import result_store
+from ocr_service.services.tesseract_pages import recognize_page
+from ocr_service.services.text_layer import build_docx
+
+
+# ABBYY recognition languages (see LANGUAGE_CODES) and their Tesseract traineddata
+TESSERACT_LANGUAGES = {
+    'Arabic': 'ara',
+    'Chinese Simplified': 'chi_sim',
+    'Chinese Traditional': 'chi_tra',
+    'Czech': 'ces',
+    'Danish': 'dan',
+    'Dutch (Netherlands)': 'nld',
+    'English': 'eng',
+    'Finnish': 'fin',
+    'French': 'fra',
+    'German': 'deu',
+    'Greek': 'ell',
+    'Hungarian': 'hun',
+    'Italian': 'ita',
+    'Japanese': 'jpn',
+    'Korean': 'kor',
+    'Norwegian (Bokmal)': 'nor',
+    'Polish': 'pol',
+    'Portuguese': 'por',
+    'Romanian': 'ron',
+    'Russian': 'rus',
+    'Spanish': 'spa',
+    'Swedish': 'swe',
+    'Turkish': 'tur',
+    'Ukrainian': 'ukr',
+}
+
+
+def tesseract_language(language):
+    """'English,Turkish' as 'eng+tur'; languages Tesseract has no model for are left out."""
+    codes = [TESSERACT_LANGUAGES[name.strip()] for name in language.split(',') if name.strip() in TESSERACT_LANGUAGES]
+    return '+'.join(codes) or 'eng'
+
+
+class OcrEngine(ABC):
+    """
+    Where a submitted file is recognized.
+
+    submit() starts recognition and returns a parsed response shaped like
+    ABBYY's (taskId, status, estimatedProcessingTime); poll() updates a
+    registry row from the engine without saving it, refresh_task does that.
+    """
+
+    name = None
+
+    @abstractmethod
+    def submit(self, file, file_type, language, local_pages=None):
+        pass
+
+    @abstractmethod
+    def poll(self, task):
+        pass
+
+
+class AbbyyEngine(OcrEngine):
+    name = 'abbyy'
+
+    def submit(self, file, file_type, language, local_pages=None):
+        # Text layer pages only reach ABBYY through the sharded path
+        return submit_file_for_ocr(file, file_type, language)
+
+    def poll(self, task):
+        return poll_upstream(task)
+
+
+class TesseractEngine(OcrEngine):
+    """
+    Local Tesseract on a process pool of OCR_LOCAL_WORKERS processes (all cores by default).
+
+    Every page is a pool job. A thread per task waits for its pages, builds
+    the DOCX into the result store and writes the outcome to a state file
+    under OCR_RESULT_DIR/local, which poll() reads, so any worker process on
+    the node can answer for the task like it would for an ABBYY task.
+    """
+
+    name = 'tesseract'
+
+    def __init__(self):
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def pool(self, broken=None):
+        with self._lock:
+            if self._pool is None or self._pool is broken or self._pool_pid != os.getpid():
+                # Spawned, forking a process with live threads (write-back, GPT pool, task threads) can deadlock
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.OCR_LOCAL_WORKERS or os.cpu_count(),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def job_dir(self):
+        directory = os.path.join(settings.OCR_RESULT_DIR, 'local')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def state_path(self, task_id):
+        return os.path.join(self.job_dir(), f"{task_id}.json")
+
+    def write_state(self, task_id, state):
+        path = self.state_path(task_id)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    def submit(self, file, file_type, language, local_pages=None):
+        local_pages = local_pages or {}
+        task_id = f"tesseract-{uuid.uuid4()}"
+        path = os.path.join(self.job_dir(), f"{task_id}{os.path.splitext(file.name)[1].lower()}")
+        with open(path, 'wb') as f:
+            for chunk in file.chunks():
+                f.write(chunk)
+        file.seek(0)
+
+        if file_type == 'pdf':
+            pdf = pdfium.PdfDocument(path)
+            page_indexes = list(range(len(pdf)))
+            pdf.close()
+        else:
+            page_indexes = [None]
+        ocr_pages = [page for page in page_indexes if page not in local_pages]
+
+        arguments = (tesseract_language(language), settings.OCR_LOCAL_DPI, settings.OCR_TESSERACT_CMD)
+        pool = self.pool()
+        try:
+            futures = {page: pool.submit(recognize_page, path, page, *arguments) for page in ocr_pages}
+        except BrokenProcessPool:
+            # A crashed worker breaks the whole pool, start a new one
+            pool = self.pool(broken=pool)
+            futures = {page: pool.submit(recognize_page, path, page, *arguments) for page in ocr_pages}
+
+        self.write_state(task_id, {'status': 'InProgress'})
+        threading.Thread(
+            target=self._finish, args=(task_id, path, page_indexes, local_pages, futures),
+            name=f"ocr-{task_id}", daemon=True,
+        ).start()
+        workers = settings.OCR_LOCAL_WORKERS or os.cpu_count()
+        seconds = max(1, round(len(ocr_pages) * settings.OCR_LOCAL_SECONDS_PER_PAGE / workers))
+        return {'taskId': task_id, 'status': 'InProgress', 'estimatedProcessingTime': str(seconds)}
+
+    def _finish(self, task_id, path, page_indexes, local_pages, futures):
+        docx_path = result_store.temporary_path()
+        try:
+            pages = [local_pages[page] if page in local_pages else futures[page].result() for page in page_indexes]
+            result_hash = result_store.put_file(build_docx(pages, docx_path))
+            state = {'status': 'Completed', 'resultHash': result_hash}
+        except Exception as e:
+            print(f"Local OCR of {task_id} failed: {e}")
+            result_store.discard(docx_path)
+            state = {'status': 'ProcessingFailed', 'error': str(e)}
+        finally:
+            os.remove(path)
+        self.write_state(task_id, state)
+
+    def poll(self, task):
+        try:
+            with open(self.state_path(task.task_id)) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            if task.created_at and timezone.now() - task.created_at > timedelta(seconds=settings.OCR_LOCAL_TASK_TIMEOUT):
+                # The process that ran it is gone
+                task.status = 'ProcessingFailed'
+                task.error = 'Local OCR task was lost'
+            return task
+
+        task.status = state['status']
+        task.error = state.get('error')
+        if task.status == 'Completed':
+            task.result_hash = state['resultHash']
+            task.completed_at = timezone.now()
+        if task.is_terminal:
+            # The registry row holds the outcome from here on
+            os.remove(self.state_path(task.task_id))
+        return task
+
+
+ENGINES = {engine.name: engine for engine in (AbbyyEngine(), TesseractEngine())}
+
+
+def get_engine(name):
+    return ENGINES[name or 'abbyy']
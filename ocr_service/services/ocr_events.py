@@ -0,0 +1,98 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from ocr_service.services.ocr_tasks import get_task, refresh_task
+
+
+def task_state(task):
+    """What status clients see of a registry row."""
+    return {
+        'taskId': task.task_id,
+        'status': task.status,
+        'estimatedProcessingTime': task.estimated_processing_time or None,
+        'error': task.error,
+        'terminal': task.is_terminal,
+    }
+
+
+def poll_task(task_id):
+    try:
+        return task_state(refresh_task(get_task(task_id)))
+    finally:
+        # Runs on executor threads that outlive the call, like the end of a request would
+        close_old_connections()
+
+
+class TaskWatcher:
+    """
+    Waits for OCR task status changes without a sleeping thread per client.
+
+    Waiters register a future per task; a single asyncio poller per event loop
+    refreshes the watched tasks every OCR_POLL_INTERVAL seconds, at most
+    OCR_POLLER_CONCURRENCY at a time, and resolves the futures of those whose
+    status moved on. The poller stops when nobody is waiting. refresh_task keeps
+    the at-most-once-per-interval guarantee across processes.
+    """
+
+    def __init__(self):
+        self._waiters = {}  # loop -> {task_id: [(known_status, future)]}
+        self._pollers = {}  # loop -> poller asyncio.Task
+
+    async def wait(self, task_id, known_status=None, timeout=None):
+        """
+        The task state once its status differs from `known_status` or it is terminal.
+
+        Answers at once when that is already the case; None after `timeout` seconds.
+        """
+        state = await sync_to_async(poll_task, thread_sensitive=False)(task_id)
+        if state['status'] != known_status or state['terminal']:
+            return state
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (state['status'], future)
+        waiters = self._waiters.setdefault(loop, {})
+        waiters.setdefault(task_id, []).append(waiter)
+        poller = self._pollers.get(loop)
+        if poller is None or poller.done():
+            self._pollers[loop] = loop.create_task(self._poll(loop))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            task_waiters = waiters.get(task_id, [])
+            if waiter in task_waiters:
+                task_waiters.remove(waiter)
+            if not task_waiters:
+                waiters.pop(task_id, None)
+
+    async def _poll(self, loop):
+        waiters = self._waiters[loop]
+        semaphore = asyncio.Semaphore(settings.OCR_POLLER_CONCURRENCY)
+
+        async def check(task_id):
+            async with semaphore:
+                try:
+                    state = await sync_to_async(poll_task, thread_sensitive=False)(task_id)
+                except Exception as e:
+                    print(f"OCR status poller failed for {task_id}: {e}")
+                    return
+            for known_status, future in list(waiters.get(task_id, [])):
+                if not future.done() and (state['status'] != known_status or state['terminal']):
+                    future.set_result(state)
+
+        try:
+            while waiters:
+                await asyncio.sleep(settings.OCR_POLL_INTERVAL)
+                await asyncio.gather(*(check(task_id) for task_id in list(waiters)))
+        finally:
+            self._pollers.pop(loop, None)
+            if not waiters:
+                self._waiters.pop(loop, None)
+
+
+task_watcher = TaskWatcher()
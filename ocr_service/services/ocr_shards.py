@@ -0,0 +1,268 @@
+import copy
+import io
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pypdfium2 as pdfium
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from docx import Document
+from docx.enum.text import WD_BREAK
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+
+from ocr_service.models.ocr_task_model import OcrTask
+from ocr_service.services.abbyy import submit_file_for_ocr
+from ocr_service.services.ocr_tasks import poll_upstream
+from ocr_service.services.result_store import result_store
+from ocr_service.services.text_layer import build_docx
+
+
+def page_ranges(pages, shard_pages):
+    """(start, end) runs of consecutive page indexes, cut after `shard_pages` pages unless that is 0."""
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and (not shard_pages or page - ranges[-1][0] < shard_pages):
+            ranges[-1][1] = page + 1
+        else:
+            ranges.append([page, page + 1])
+    return [tuple(page_range) for page_range in ranges]
+
+
+def extract_pages(pdf, start, end):
+    """Pages start..end-1 of a pypdfium2 document as PDF bytes."""
+    shard = pdfium.PdfDocument.new()
+    try:
+        shard.import_pages(pdf, list(range(start, end)))
+        buffer = io.BytesIO()
+        shard.save(buffer)
+        return buffer.getvalue()
+    finally:
+        shard.close()
+
+
+def processing_seconds(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def shard_dir(parent):
+    return os.path.join(settings.OCR_RESULT_DIR, 'shards', parent.task_id)
+
+
+def shard_input_path(shard):
+    return os.path.join(shard_dir(shard.parent), f"{shard.page_start}-{shard.page_end}.pdf")
+
+
+def run_concurrently(function, items):
+    """function(item) for every item on up to OCR_SHARD_CONCURRENCY threads, results in order."""
+    def call(item):
+        try:
+            return function(item)
+        finally:
+            # Pool threads end with the call, don't leave their connection behind
+            connection.close()
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(settings.OCR_SHARD_CONCURRENCY, len(items))) as pool:
+        return list(pool.map(call, items))
+
+
+def submit_shard(path, language):
+    """The parsed processImage response for one shard, or the exception it failed with."""
+    try:
+        with open(path, 'rb') as f:
+            return submit_file_for_ocr(f, 'pdf', language)
+    except Exception as e:
+        return e
+
+
+def apply_submission(shard, ocr_response):
+    if isinstance(ocr_response, Exception) or not ocr_response or not ocr_response.get('taskId'):
+        # Picked up by the retry of the next refresh like a failed task
+        shard.status = 'ProcessingFailed'
+        shard.error = str(ocr_response) if isinstance(ocr_response, Exception) else 'Failed to process the file'
+        if not shard.task_id:
+            shard.task_id = f"{shard.parent.task_id}-{shard.page_start}"
+    else:
+        shard.task_id = ocr_response['taskId']
+        shard.status = ocr_response.get('status') or 'Submitted'
+        shard.estimated_processing_time = ocr_response.get('estimatedProcessingTime') or ''
+        shard.error = None
+    shard.result_url = ''
+    shard.result_hash = ''
+
+
+def submit_sharded(content, shard_pages, file_name='', source_language='', target_language='', cache_key='',
+                   local_pages=None):
+    """
+    Submit a PDF as page-range shards of `shard_pages` pages, all at once.
+
+    `local_pages` maps page indexes to the paragraphs of their text layer;
+    those pages become already completed shards and only the others go to
+    ABBYY. Returns the parent task the client polls, or None when the PDF
+    would be a single shard and is better sent whole.
+    """
+    local_pages = local_pages or {}
+    pdf = pdfium.PdfDocument(content)
+    try:
+        page_count = len(pdf)
+        ocr_ranges = page_ranges([page for page in range(page_count) if page not in local_pages], shard_pages)
+        local_ranges = page_ranges(sorted(local_pages), 0)
+        if len(ocr_ranges) + len(local_ranges) < 2:
+            return None
+
+        parent = OcrTask.objects.create(
+            task_id=f"sharded-{uuid.uuid4()}",
+            file_name=file_name,
+            source_language=source_language,
+            target_language=target_language,
+            status='InProgress',
+            cache_key=cache_key,
+            shard_count=len(ocr_ranges) + len(local_ranges),
+        )
+        os.makedirs(shard_dir(parent), exist_ok=True)
+        children = []
+        for start, end in ocr_ranges:
+            child = OcrTask(parent=parent, page_start=start, page_end=end, source_language=source_language)
+            with open(shard_input_path(child), 'wb') as f:
+                f.write(extract_pages(pdf, start, end))
+            children.append(child)
+    finally:
+        pdf.close()
+
+    responses = run_concurrently(lambda child: submit_shard(shard_input_path(child), source_language), children)
+    for child, ocr_response in zip(children, responses):
+        apply_submission(child, ocr_response)
+    parent.estimated_processing_time = max(
+        (child.estimated_processing_time for child in children), key=processing_seconds, default='0'
+    )
+
+    for start, end in local_ranges:
+        docx_path = build_docx([local_pages[page] for page in range(start, end)], result_store.temporary_path())
+        children.append(OcrTask(
+            task_id=f"{parent.task_id}-{start}",
+            parent=parent,
+            page_start=start,
+            page_end=end,
+            source_language=source_language,
+            status='Completed',
+            result_hash=result_store.put_file(docx_path),
+            completed_at=timezone.now(),
+        ))
+    OcrTask.objects.bulk_create(children)
+    parent.save(update_fields=['estimated_processing_time', 'updated_at'])
+    return parent
+
+
+def refresh_sharded_task(parent):
+    """
+    Poll the unfinished shards of `parent` concurrently and resubmit failed ones.
+
+    A failed shard is sent again from its saved page range, up to
+    OCR_SHARD_MAX_ATTEMPTS times, without touching the others. Once every
+    shard is completed their DOCX results are merged in page order. Only
+    updates `parent`, refresh_task saves it.
+    """
+    shards = list(parent.shards.order_by('page_start'))
+    pending = [shard for shard in shards if not shard.is_terminal]
+    run_concurrently(poll_upstream, pending)
+
+    failed = [shard for shard in shards if shard.is_terminal and shard.status != 'Completed']
+    exhausted = [shard for shard in failed if shard.attempts >= settings.OCR_SHARD_MAX_ATTEMPTS]
+    if exhausted:
+        parent.status = 'ProcessingFailed'
+        shard = exhausted[0]
+        parent.error = f"Pages {shard.page_start + 1}-{shard.page_end} failed: {shard.error or shard.status}"
+    elif failed:
+        print(f"OCR shards of {parent.task_id} failed, resubmitting pages "
+              + ", ".join(f"{shard.page_start + 1}-{shard.page_end}" for shard in failed))
+        responses = run_concurrently(lambda shard: submit_shard(shard_input_path(shard), parent.source_language), failed)
+        for shard, ocr_response in zip(failed, responses):
+            apply_submission(shard, ocr_response)
+            shard.attempts += 1
+            shard.last_polled_at = None
+
+    with transaction.atomic():
+        for shard in {shard.pk: shard for shard in pending + failed}.values():
+            shard.save()
+
+    if exhausted:
+        shutil.rmtree(shard_dir(parent), ignore_errors=True)
+        return parent
+
+    parent.status = 'InProgress'
+    parent.error = next((shard.error for shard in shards if shard.error), None)
+    if any(shard.status != 'Completed' for shard in shards):
+        parent.estimated_processing_time = max(
+            (shard.estimated_processing_time for shard in shards if shard.status != 'Completed'),
+            key=processing_seconds,
+        )
+        return parent
+
+    paths = [result_store.get(shard.result_hash) for shard in shards]
+    evicted = [shard for shard, path in zip(shards, paths) if path is None]
+    if any(not shard.result_url for shard in evicted):
+        # Pages extracted from the text layer have no upstream copy
+        parent.status = 'ProcessingFailed'
+        parent.error = 'Result expired, submit the file again'
+        shutil.rmtree(shard_dir(parent), ignore_errors=True)
+        return parent
+    if evicted:
+        # A shard result was evicted before the merge, ABBYY still has it
+        OcrTask.objects.filter(pk__in=[shard.pk for shard in evicted]).update(status='InProgress')
+        return parent
+
+    merged_path = result_store.temporary_path()
+    merge_docx(paths, merged_path)
+    parent.result_hash = result_store.put_file(merged_path)
+    parent.status = 'Completed'
+    parent.completed_at = timezone.now()
+    shutil.rmtree(shard_dir(parent), ignore_errors=True)
+    return parent
+
+
+def copy_relationships(element, source_part, target_part):
+    """Re-point images and hyperlinks of an element copied between documents."""
+    for node in element.iter():
+        for attribute in (qn('r:embed'), qn('r:link'), qn('r:id')):
+            r_id = node.get(attribute)
+            if not r_id or r_id not in source_part.rels:
+                continue
+            rel = source_part.rels[r_id]
+            if rel.is_external:
+                new_id = target_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+            elif rel.reltype == RT.IMAGE:
+                # Added again so it gets a part name of its own in the merged package
+                new_id, _ = target_part.get_or_add_image(io.BytesIO(rel.target_part.blob))
+            else:
+                continue
+            node.set(attribute, new_id)
+
+
+def merge_docx(paths, output_path):
+    """Concatenate DOCX files into `output_path`, each after a page break, keeping the first one's styles."""
+    merged = Document(paths[0])
+    body = merged.element.body
+    section_properties = body.find(qn('w:sectPr'))
+    for path in paths[1:]:
+        document = Document(path)
+        # Each shard starts on a new page, like in the original PDF
+        merged.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+        for element in document.element.body:
+            if element.tag == qn('w:sectPr'):
+                continue
+            element = copy.deepcopy(element)
+            copy_relationships(element, document.part, merged.part)
+            if section_properties is not None:
+                section_properties.addprevious(element)
+            else:
+                body.append(element)
+    merged.save(output_path)
+    return output_path
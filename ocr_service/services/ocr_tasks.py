@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from ocr_service.models.ocr_task_model import OcrTask
+from ocr_service.services.abbyy import download_result, get_task_status
+from ocr_service.services.ocr_cache import ocr_cache
+from ocr_service.services.result_store import result_store
+
+
+def register_task(ocr_response, file_name='', source_language='', target_language='', cache_key='', engine='abbyy'):
+    """Record a task an OCR engine accepted, from its parsed (processImage style) response."""
+    task, _ = OcrTask.objects.update_or_create(
+        task_id=ocr_response['taskId'],
+        defaults={
+            'file_name': file_name,
+            'source_language': source_language,
+            'target_language': target_language,
+            'status': ocr_response.get('status') or 'Submitted',
+            'estimated_processing_time': ocr_response.get('estimatedProcessingTime') or '',
+            'cache_key': cache_key,
+            'engine': engine,
+        },
+    )
+    return task
+
+
+def claim_poll(task):
+    """
+    Take the right to call getTaskStatus for `task` in this interval.
+
+    A single conditional UPDATE, so of all the requests and workers asking
+    about the task at the same moment exactly one sees a row count of 1.
+    """
+    now = timezone.now()
+    due = Q(last_polled_at__isnull=True) | Q(last_polled_at__lte=now - timedelta(seconds=settings.OCR_POLL_INTERVAL))
+    claimed = OcrTask.objects.filter(due, pk=task.pk).exclude(status__in=OcrTask.TERMINAL_STATUSES).update(
+        last_polled_at=now
+    )
+    if claimed:
+        task.last_polled_at = now
+    return bool(claimed)
+
+
+def poll_upstream(task):
+    """
+    getTaskStatus for `task` and, once completed, the result download.
+
+    Only updates the instance, the caller saves it, so shards can be polled
+    from worker threads. Errors are kept on the task rather than raised.
+    """
+    try:
+        parsed_response = get_task_status(task.task_id)
+    except Exception as e:
+        print(f"OCR status poll for {task.task_id} failed: {e}")
+        task.error = str(e)
+        return task
+    if parsed_response is None:
+        task.error = 'Invalid response from ABBYY'
+        return task
+
+    task.status = parsed_response.get('status') or task.status
+    task.estimated_processing_time = parsed_response.get('estimatedProcessingTime') or task.estimated_processing_time
+    task.result_url = parsed_response.get('resultUrl') or task.result_url
+    task.error = None
+    if task.status == 'Completed':
+        if not task.result_url:
+            # Keep polling until ABBYY hands out the URL
+            task.status = 'InProgress'
+            task.error = 'Result URL not found'
+        else:
+            path = result_store.temporary_path()
+            try:
+                task.result_hash = result_store.put_file(download_result(task.result_url, path))
+                task.completed_at = timezone.now()
+            except Exception as e:
+                print(f"OCR result download for {task.task_id} failed: {e}")
+                result_store.discard(path)
+                task.status = 'InProgress'
+                task.error = str(e)
+    return task
+
+
+def refresh_task(task):
+    """
+    Bring `task` up to date with its engine, at most once per OCR_POLL_INTERVAL.
+
+    Everyone else gets the registry row as it is; the next interval simply
+    polls again after an upstream error. A sharded task refreshes its shards,
+    other tasks ask the engine that runs them.
+    """
+    if task.is_terminal or not claim_poll(task):
+        return task
+
+    if task.shard_count:
+        from ocr_service.services.ocr_shards import refresh_sharded_task
+        refresh_sharded_task(task)
+    else:
+        from ocr_service.services.ocr_engines import get_engine
+        get_engine(task.engine).poll(task)
+    task.save()
+    if task.status == 'Completed':
+        ocr_cache.store(task)
+    return task
+
+
+def get_task(task_id):
+    """
+    The registry row for `task_id`.
+
+    Raises OcrTask.DoesNotExist for ids this service never submitted, so a
+    made-up id costs neither a row nor ABBYY calls.
+    """
+    return OcrTask.objects.get(task_id=task_id)
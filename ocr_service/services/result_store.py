@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+class ResultStore:
+    """
+    Content-addressed files under OCR_RESULT_DIR, shared by every task.
+
+    A file is stored once per SHA-256 as blobs/<2 hex>/<hash>.docx. Writes go to
+    a temporary file in the same directory and are renamed into place, so a
+    reader never sees a partial file and concurrent writers of the same content
+    simply replace each other. Reading a blob refreshes its mtime; blobs unread
+    for OCR_RESULT_TTL seconds are evicted, then the least recently read ones
+    until the store fits in OCR_RESULT_MAX_BYTES. Eviction runs at most every
+    OCR_RESULT_EVICT_INTERVAL seconds, after a write, and leaves files under
+    blobs/tmp alone until they are OCR_RESULT_TMP_GRACE seconds old.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+
+    @property
+    def root(self):
+        return os.path.join(settings.OCR_RESULT_DIR, 'blobs')
+
+    def path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}.docx")
+
+    def temporary_path(self):
+        """A fresh path inside the store to build a file in before put_file()."""
+        directory = os.path.join(self.root, 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix='.docx', dir=directory)
+        os.close(fd)
+        return path
+
+    def discard(self, path):
+        """Remove a temporary_path() file that never made it into the store."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def put_file(self, source_path):
+        """Move `source_path` into the store; returns its content hash."""
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        path = self.path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        self.maybe_evict()
+        return content_hash
+
+    def get(self, content_hash):
+        """Path of the blob, marked as just read, or None once it has been evicted."""
+        if not content_hash:
+            return None
+        path = self.path(content_hash)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def maybe_evict(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_eviction < settings.OCR_RESULT_EVICT_INTERVAL:
+                return
+            self._last_eviction = now
+        self.evict()
+
+    def evict(self):
+        """Drop expired blobs, then the least recently read ones over the size cap; returns the count removed."""
+        now = time.time()
+        removed = self.evict_temporary(now)
+        blobs = []
+        for directory, subdirectories, names in os.walk(self.root):
+            if directory == self.root and 'tmp' in subdirectories:
+                # Files still being written, evict_temporary() handles leftovers
+                subdirectories.remove('tmp')
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+
+        blobs.sort()
+        total = sum(size for _, size, _ in blobs)
+        for mtime, size, path in blobs:
+            if now - mtime < settings.OCR_RESULT_TTL and total <= settings.OCR_RESULT_MAX_BYTES:
+                break
+            try:
+                # An open download keeps reading the unlinked file
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            print(f"OCR result store: evicted {removed} files, {total} bytes left")
+        return removed
+
+    def evict_temporary(self, now):
+        """Remove temporary files older than OCR_RESULT_TMP_GRACE, left behind by a crashed writer."""
+        directory = os.path.join(self.root, 'tmp')
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                if now - os.stat(path).st_mtime > settings.OCR_RESULT_TMP_GRACE:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+result_store = ResultStore()
@@ -0,0 +1,36 @@
+import pypdfium2 as pdfium
+import pytesseract
+from PIL import Image, ImageOps
+
+
+# Runs in the spawned processes of TesseractEngine's pool, which never set up
+# Django: keep this module free of settings and model imports.
+
+
+def recognize_page(path, page_index, language, dpi, tesseract_cmd):
+    """
+    Paragraphs of one page.
+
+    `page_index` is None for an image file. PDF pages are rendered with
+    pdfium at `dpi`; the grayscale, contrast-stretched image goes to
+    Tesseract and its words are joined per detected paragraph.
+    """
+    if page_index is None:
+        image = Image.open(path)
+    else:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page = pdf[page_index]
+            image = page.render(scale=dpi / 72).to_pil()
+            page.close()
+        finally:
+            pdf.close()
+    image = ImageOps.autocontrast(ImageOps.grayscale(image))
+
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    data = pytesseract.image_to_data(image, lang=language, output_type=pytesseract.Output.DICT)
+    paragraphs = {}
+    for block, paragraph, word in zip(data['block_num'], data['par_num'], data['text']):
+        if word.strip():
+            paragraphs.setdefault((block, paragraph), []).append(word.strip())
+    return [' '.join(words) for words in paragraphs.values()]
@@ -0,0 +1,139 @@
+import statistics
+
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+from django.conf import settings
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+
+def usable_text(text):
+    """Enough characters, and not mostly glyphs without a Unicode mapping."""
+    characters = sum(not character.isspace() for character in text)
+    if characters < settings.OCR_TEXT_LAYER_MIN_CHARS:
+        return False
+    unmapped = sum(character in '\ufffd\x00' for character in text)
+    return unmapped < characters * settings.OCR_TEXT_LAYER_MAX_GARBLED
+
+
+# pdfium marks a hyphen at a line break with \x02 (\ufffe in page text)
+HYPHEN_MARKERS = str.maketrans({'\x02': '-', '\ufffe': '-'})
+
+
+def clean_text(text):
+    """Hyphen markers as hyphens, without the control characters DOCX cannot hold."""
+    return ''.join(character for character in text.translate(HYPHEN_MARKERS) if character >= ' ' or character == '\t')
+
+
+def covered_share(rects, width, height):
+    """Share of a `width` x `height` page covered by (left, bottom, right, top) rects, overlaps counted twice."""
+    area = 0.0
+    for left, bottom, right, top in rects:
+        area += max(0.0, min(right, width) - max(left, 0.0)) * max(0.0, min(top, height) - max(bottom, 0.0))
+    return min(1.0, area / (width * height)) if width and height else 0.0
+
+
+def is_scanned(page, text_page):
+    """
+    A page image with only a little text on it, e.g. a fax header or Bates stamp.
+
+    Such pages pass usable_text() but their content is in the image. A
+    searchable scan, whose invisible text layer covers the page text, is not.
+    """
+    width, height = page.get_size()
+    images = [image.get_bounds() for image in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE])]
+    if covered_share(images, width, height) < settings.OCR_TEXT_LAYER_SCAN_IMAGE_COVERAGE:
+        return False
+    text_rects = [text_page.get_rect(index) for index in range(text_page.count_rects())]
+    return covered_share(text_rects, width, height) < settings.OCR_TEXT_LAYER_MIN_TEXT_COVERAGE
+
+
+def text_lines(text_page):
+    """
+    (text, top, bottom) lines of a pdfium text page, in content order.
+
+    pdfium reports runs of text as rectangles; runs that overlap vertically
+    with the previous one continue its line.
+    """
+    lines = []
+    for index in range(text_page.count_rects()):
+        left, bottom, right, top = text_page.get_rect(index)
+        text = clean_text(text_page.get_text_bounded(left, bottom, right, top)).strip()
+        if not text:
+            continue
+        if lines:
+            line_text, line_top, line_bottom = lines[-1]
+            overlap = min(top, line_top) - max(bottom, line_bottom)
+            if overlap > 0.5 * min(top - bottom, line_top - line_bottom):
+                lines[-1] = (f"{line_text} {text}", max(top, line_top), min(bottom, line_bottom))
+                continue
+        lines.append((text, top, bottom))
+    return lines
+
+
+def page_paragraphs(page):
+    """
+    The text layer of a pypdfium2 page as paragraphs, or None for a page that needs OCR.
+
+    Lines are joined into a paragraph until the gap to the next line exceeds
+    OCR_TEXT_LAYER_PARAGRAPH_GAP line heights; a word hyphenated at the end
+    of a line is joined back together.
+    """
+    text_page = page.get_textpage()
+    try:
+        if not usable_text(text_page.get_text_range()) or is_scanned(page, text_page):
+            return None
+        lines = text_lines(text_page)
+    finally:
+        text_page.close()
+    if not lines:
+        # Text pdfium reports outside of any text rect, leave the page to OCR
+        return None
+
+    max_gap = statistics.median(top - bottom for _, top, bottom in lines) * settings.OCR_TEXT_LAYER_PARAGRAPH_GAP
+    paragraphs = []
+    current = ''
+    previous_bottom = None
+    for text, top, bottom in lines:
+        # PDF coordinates grow upwards
+        if previous_bottom is not None and previous_bottom - top > max_gap and current:
+            paragraphs.append(current)
+            current = ''
+        if current.endswith('-') and text[:1].islower():
+            current = current[:-1] + text
+        else:
+            current = f"{current} {text}" if current else text
+        previous_bottom = bottom
+    if current:
+        paragraphs.append(current)
+    return paragraphs
+
+
+def text_layer_pages(content):
+    """page_paragraphs() of every page of a PDF, in page order; empty when pdfium cannot open it."""
+    try:
+        pdf = pdfium.PdfDocument(content)
+    except pdfium.PdfiumError as e:
+        # Left to ABBYY, which copes with more broken files
+        print(f"PDF text layer check failed: {e}")
+        return []
+    try:
+        pages = []
+        for page in pdf:
+            pages.append(page_paragraphs(page))
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def build_docx(pages, output_path):
+    """A DOCX of the paragraphs of each page, each page after a page break."""
+    document = Document()
+    for index, paragraphs in enumerate(pages):
+        if index:
+            document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+    document.save(output_path)
+    return output_path
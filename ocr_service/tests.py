@@ -1,3 +1,1097 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+
+import openai
+import pypdfium2 as pdfium
+import requests
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from docx import Document
+from openpyxl import Workbook
 
 # Create your tests here.
+from ocr_service.models import ImportJob, Memory, MemoryAsset, OcrTask, Settings
+from ocr_service.models.memory_models import source_text_hash
+from ocr_service.services.abbyy import credentials, get_task_status
+from ocr_service.services.fake_servers import DEFAULT_PARAGRAPHS, abbyy_server
+from ocr_service.services.gpt_translate import translate_texts
+from ocr_service.services.import_jobs import claim_next_job, enqueue_import, run_job
+from ocr_service.services.memory_cache import MATCH_CHUNK_SIZE, bump_pair_versions, find_exact_many, pair_cache
+from ocr_service.services.memory_fuzzy import QUERY_CHUNK_SIZE as FUZZY_QUERY_CHUNK_SIZE
+from ocr_service.services.memory_fuzzy import band_buckets, find_fuzzy, index_memories, similarity
+from ocr_service.services.memory_import import MemoryBatchWriter, import_xlsx
+from ocr_service.services.mt_writeback import mt_buffer
+from ocr_service.services.ocr_cache import ocr_cache
+from ocr_service.services.ocr_engines import OcrEngine, get_engine, tesseract_language
+from ocr_service.services.ocr_tasks import get_task, refresh_task
+from ocr_service.services.result_store import result_store
+from ocr_service.views.ocr_views import create_translated_file, format_extracted_sentences
+
+# Only the fake ABBYY server sees these
+ABBYY_TEST_CREDENTIALS = {"ABBYY_APPLICATION_ID": "test-app", "ABBYY_PASSWORD": "test-password"}
+
+
+def fixture_sentence(i):
+    # A reference of its own keeps each sentence in fuzzy buckets of its own
+    return f"Sentence {i} with reference {hashlib.sha1(str(i).encode()).hexdigest()[:12]}"
+
+
+class FormatExtractedSentencesTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+
+        asset = MemoryAsset(name="test", source_language="en")
+        asset.set_target_languages(["fr"])
+        for i in range(0, 3000, 2):
+            Memory.objects.create(
+                name="test",
+                source_language="en",
+                target_language="fr",
+                source_text=fixture_sentence(i),
+                target_text=f"Phrase {i}",
+                memory_asset=asset,
+            )
+        bump_pair_versions([("en", "fr")])
+        index_memories(Memory.objects.values_list("id", "source_language", "target_language", "source_text"))
+
+        # Every other sentence is an exact match, the rest only differ from the one before by a full stop
+        self.sentences = {fixture_sentence(i) if i % 2 == 0 else f"{fixture_sentence(i - 1)}.": "" for i in range(3000)}
+
+    def fuzzy_queries(self):
+        """Bound on the fuzzy lookup of the 1500 misses: a query per chunk of their buckets and of the candidates."""
+        buckets = {bucket for i in range(0, 3000, 2) for bucket in band_buckets(f"{fixture_sentence(i)}.")}
+        return -(-len(buckets) // FUZZY_QUERY_CHUNK_SIZE) + -(-Memory.objects.count() // FUZZY_QUERY_CHUNK_SIZE)
+
+    @contextmanager
+    def assertQueriesAtMost(self, limit):
+        with CaptureQueriesContext(connection) as queries:
+            yield
+        self.assertLessEqual(len(queries), limit)
+
+    def assert_payload(self, formatted):
+        self.assertEqual(len(formatted), 3000)
+        for i, item in enumerate(formatted):
+            stored = fixture_sentence(i - i % 2)
+            self.assertEqual(item, {
+                "id": i + 1,
+                "originalText": stored if i % 2 == 0 else f"{stored}.",
+                "translatedText": f"Phrase {i - i % 2}",
+                # The full stop is one edit on top of the stored sentence
+                "matchScore": 1.0 if i % 2 == 0 else round(1 - 1 / (len(stored) + 1), 4),
+                "machineTranslation": False,
+            })
+
+    def test_cached_pair_is_matched_without_per_sentence_queries(self):
+        # Version check and the pair load, then only the version check, plus the fuzzy lookup of the misses
+        with self.assertQueriesAtMost(2 + self.fuzzy_queries()):
+            self.assert_payload(format_extracted_sentences(self.sentences, "en", "fr"))
+        with self.assertQueriesAtMost(1 + self.fuzzy_queries()):
+            self.assert_payload(format_extracted_sentences(self.sentences, "en", "fr"))
+
+    def test_uncached_pair_is_matched_in_chunked_queries(self):
+        self.addCleanup(setattr, pair_cache, "max_bytes", pair_cache.max_bytes)
+        pair_cache.max_bytes = 0
+
+        chunks = -(-len(self.sentences) // MATCH_CHUNK_SIZE)
+        # Version check, the aborted pair load, one IN query per chunk, then the fuzzy lookup of the misses
+        with self.assertQueriesAtMost(2 + chunks + self.fuzzy_queries()):
+            self.assert_payload(format_extracted_sentences(self.sentences, "en", "fr"))
+
+    @override_settings(TM_FUZZY_ENABLED=False)
+    def test_exact_matching_alone_without_fuzzy_index(self):
+        with self.assertNumQueries(2):
+            formatted = format_extracted_sentences(self.sentences, "en", "fr")
+        self.assertEqual(
+            formatted[1],
+            {"id": 2, "originalText": f"{fixture_sentence(0)}.", "translatedText": "", "matchScore": None,
+             "machineTranslation": None},
+        )
+
+
+class MemoryAssetLanguagesTest(TestCase):
+    def test_assets_match_the_exact_target_language_set(self):
+        assets = {}
+        for name, source_language, target_languages in [
+            ("fr", "en", ["fr"]), ("fr-de", "en", ["de", "fr"]), ("fr-de-it", "en", ["fr", "de", "it"]),
+            ("de-fr from tr", "tr", ["de", "fr"]),
+        ]:
+            assets[name] = MemoryAsset(name=name, source_language=source_language)
+            assets[name].set_target_languages(target_languages)
+
+        self.assertEqual(list(MemoryAsset.objects.with_target_languages("en", "fr, de")), [assets["fr-de"]])
+        self.assertEqual(list(MemoryAsset.objects.with_target_languages("en", ["fr"])), [assets["fr"]])
+        self.assertEqual(list(MemoryAsset.objects.with_target_languages("tr", ["fr", "de"])), [assets["de-fr from tr"]])
+        self.assertFalse(MemoryAsset.objects.with_target_languages("en", ["it"]).exists())
+
+
+class SourceHashTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+        self.asset = MemoryAsset(name="test", source_language="en")
+        self.asset.set_target_languages(["fr"])
+
+    def test_saved_and_backfilled_rows_hash_the_normalized_text(self):
+        # Decomposed "é" and surrounding whitespace, looked up as composed text
+        saved = Memory.objects.create(name="test", source_language="en", target_language="fr",
+                                      source_text=" Cafe\u0301 ", target_text="Café", memory_asset=self.asset)
+        legacy = Memory.objects.create(name="test", source_language="en", target_language="fr",
+                                       source_text="Cre\u0300me\n", target_text="Crème", memory_asset=self.asset)
+        self.assertEqual(saved.source_hash, source_text_hash("Café"))
+
+        Memory.objects.filter(pk=legacy.pk).update(source_hash="")
+        backfill = importlib.import_module("ocr_service.migrations.0006_memory_source_hash").backfill_source_hash
+        backfill(django_apps, None)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.source_hash, source_text_hash("Crème"))
+
+        matches = find_exact_many("en", "fr", ["Café", "Crème"])
+        self.assertEqual({text: match[0] for text, match in matches.items()}, {"Café": saved.pk, "Crème": legacy.pk})
+
+
+class MemoryBatchWriterTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+        self.asset = MemoryAsset(name="import", source_language="en")
+        self.asset.set_target_languages(["fr"])
+        Memory.objects.create(name="old", source_language="en", target_language="fr", source_text="Hello",
+                              target_text="Salut", memory_asset=self.asset)
+        self.reports = []
+
+    def writer(self, batch_size=100):
+        def report(writer):
+            self.reports.append((writer.inserted, writer.updated, writer.skipped))
+        return MemoryBatchWriter("en", "import", self.asset, batch_size=batch_size, on_flush=report)
+
+    def test_chunk_counts_inserts_updates_and_skips(self):
+        writer = self.writer()
+        writer.add(1, "Hello", "fr", "Bonjour")
+        writer.add(2, "Goodbye", "fr", "Au revoir")
+        writer.add(3, "Thanks", "fr", None)  # no record to refresh
+        writer.skip(4)
+        self.assertEqual(writer.close(), {"inserted": 1, "updated": 1, "skipped": 2})
+        self.assertEqual(self.reports, [(1, 1, 2), (1, 1, 2)])  # the flush and the final report
+
+        self.assertEqual(Memory.objects.get(source_text="Hello").target_text, "Bonjour")
+        self.assertEqual(Memory.objects.get(source_text="Hello").name, "import")
+        self.assertFalse(Memory.objects.filter(source_text="Thanks").exists())
+
+    def test_duplicates_within_and_across_chunks(self):
+        writer = self.writer(batch_size=2)
+        writer.add(1, "Goodbye", "fr", "Adieu")
+        writer.add(2, "Goodbye", "fr", "Au revoir")  # same chunk, the later unit wins
+        writer.add(3, "Goodbye", "fr", None)  # a missing target keeps the queued one
+        writer.add(4, "Hello", "fr", "Bonjour")  # fills the chunk
+        self.assertEqual(self.reports, [(1, 1, 0)])
+        writer.add(5, "Goodbye", "fr", "À bientôt")  # next chunk, updates the row just inserted
+        self.assertEqual(writer.close(), {"inserted": 1, "updated": 2, "skipped": 0})
+        self.assertEqual(self.reports, [(1, 1, 0), (1, 2, 0), (1, 2, 0)])
+
+        self.assertEqual(
+            sorted(Memory.objects.values_list("source_text", "target_text")),
+            [("Goodbye", "À bientôt"), ("Hello", "Bonjour")],
+        )
+
+
+def xlsx(rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    content = io.BytesIO()
+    workbook.save(content)
+    content.seek(0)
+    return content
+
+
+class XlsxImportTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+        self.asset = MemoryAsset(name="import", source_language="en")
+        self.asset.set_target_languages(["fr"])
+        Memory.objects.create(name="old", source_language="en", target_language="fr", source_text="Hello",
+                              target_text="Salut", memory_asset=self.asset)
+        Memory.objects.create(name="old", source_language="en", target_language="fr", source_text="Thanks",
+                              target_text="Merci", memory_asset=self.asset)
+
+    def test_rows_are_inserted_updated_and_skipped(self):
+        # Only the span from the source to the target column is read, "Notes" and "de" are left out
+        workbook = xlsx([
+            ["Notes", "en", "Comment", "fr", "de"],
+            ["x", "Hello", None, "Bonjour", "Hallo"],
+            ["x", "Goodbye", None, "Au revoir", "Tschüss"],
+            ["x", None, None, "Orphelin", None],
+            ["x", "Thanks", None, None, "Danke"],  # refreshes the row, keeps its translation
+            ["x", "Untranslated", None, "  ", None],  # no row to refresh, none created
+        ])
+        reports = []
+
+        summary = import_xlsx(workbook, "en", ["fr"], "import", self.asset,
+                              on_flush=lambda writer: reports.append((writer.rows_processed, writer.progress)))
+
+        self.assertEqual(summary, {"inserted": 1, "updated": 2, "skipped": 2})
+        self.assertEqual(reports[-1], (5, 1.0))
+        self.assertEqual(
+            sorted(Memory.objects.values_list("source_text", "target_text", "name")),
+            [("Goodbye", "Au revoir", "import"), ("Hello", "Bonjour", "import"), ("Thanks", "Merci", "import")],
+        )
+
+    def test_missing_language_column_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Target language column 'de' not found"):
+            import_xlsx(xlsx([["en", "fr"], ["Hello", "Bonjour"]]), "en", ["fr", "de"], "import", self.asset)
+        with self.assertRaisesRegex(ValueError, "Source language column 'tr' not found"):
+            import_xlsx(xlsx([["en", "fr"], ["Hello", "Bonjour"]]), "tr", ["fr"], "import", self.asset)
+        self.assertEqual(Memory.objects.get(source_text="Hello").target_text, "Salut")
+
+
+@override_settings(TM_FUZZY_ENABLED=True, TM_FUZZY_MIN_SCORE=0.75)
+class FuzzyMatchTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+
+        asset = MemoryAsset(name="test", source_language="en")
+        asset.set_target_languages(["fr"])
+        texts = [
+            "The contract is valid until 31 December 2024.",
+            "Payment is due within thirty days of the invoice date.",
+            "The parties agree to the terms set out below.",
+        ]
+        memories = [
+            Memory.objects.create(
+                name="test",
+                source_language="en",
+                target_language="fr",
+                source_text=text,
+                target_text=f"fr: {text}",
+                memory_asset=asset,
+            )
+            for text in texts
+        ]
+        index_memories(memories)
+        bump_pair_versions([("en", "fr")])
+
+    def test_similarity_is_normalized_edit_distance(self):
+        self.assertEqual(similarity("abcd", "abcd"), 1.0)
+        self.assertEqual(similarity("abcd", "abce"), 0.75)
+        self.assertEqual(similarity("", "abc"), 0.0)
+
+    def test_changed_digit_is_a_fuzzy_hit(self):
+        matches = find_fuzzy("en", "fr", "The contract is valid until 31 December 2025.")
+        self.assertEqual(matches[0]["source_text"], "The contract is valid until 31 December 2024.")
+        self.assertGreater(matches[0]["score"], 0.95)
+
+    def test_untranslated_memory_is_not_a_fuzzy_hit(self):
+        untranslated = Memory.objects.create(
+            name="test",
+            source_language="en",
+            target_language="fr",
+            source_text="The contract is valid until 31 December 2025.",
+            target_text="",
+            memory_asset=MemoryAsset.objects.get(name="test"),
+        )
+        index_memories([untranslated])
+
+        matches = find_fuzzy("en", "fr", "The contract is valid until 31 December 2025!")
+        self.assertEqual([match["source_text"] for match in matches], ["The contract is valid until 31 December 2024."])
+
+    def test_unrelated_text_is_not_matched(self):
+        self.assertEqual(find_fuzzy("en", "fr", "Completely different wording here."), [])
+        self.assertEqual(find_fuzzy("en", "de", "The contract is valid until 31 December 2025."), [])
+
+    def test_format_extracted_sentences_uses_fuzzy_for_misses(self):
+        formatted = format_extracted_sentences(
+            {"Payment is due within thirty days of the invoice date": "", "Nothing like it": ""}, "en", "fr"
+        )
+        self.assertEqual(formatted[0]["translatedText"], "fr: Payment is due within thirty days of the invoice date.")
+        self.assertLess(formatted[0]["matchScore"], 1.0)
+        self.assertEqual(formatted[1]["translatedText"], "")
+        self.assertIsNone(formatted[1]["matchScore"])
+
+
+@override_settings(TM_BATCH_LOOKUP_MAX=5)
+class GetMemoryBySourceBatchTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+
+        asset = MemoryAsset(name="test", source_language="en")
+        asset.set_target_languages(["fr"])
+        self.memory = Memory.objects.create(
+            name="test",
+            source_language="en",
+            target_language="fr",
+            source_text="Hello",
+            target_text="Bonjour",
+            memory_asset=asset,
+        )
+        bump_pair_versions([("en", "fr")])
+
+    def test_matches_are_keyed_by_input_index(self):
+        response = self.client.put(
+            "/memory/get-by-source-text/batch/",
+            {"source_texts": ["Missing", "Hello", "", "Hello"], "source_language": "English", "target_language": "French"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(sorted(data), ["1", "3"])
+        self.assertEqual(data["1"]["id"], self.memory.id)
+        self.assertEqual(data["3"]["target_text"], "Bonjour")
+        self.assertEqual(data["1"]["match_score"], 1.0)
+
+    def assert_min_score_rejected(self, path, payload):
+        for value in ["abc", 5, -1]:
+            response = self.client.put(
+                path,
+                {**payload, "source_language": "English", "target_language": "French", "min_score": value},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_invalid_min_score_is_rejected(self):
+        self.assert_min_score_rejected("/memory/get-by-source-text/", {"source_text": "Helo"})
+
+    def test_invalid_min_score_is_rejected_in_batches(self):
+        self.assert_min_score_rejected("/memory/get-by-source-text/batch/", {"source_texts": ["Helo"]})
+
+    def test_batch_size_is_bounded(self):
+        response = self.client.put(
+            "/memory/get-by-source-text/batch/",
+            {"source_texts": ["Hello"] * 6, "source_language": "English", "target_language": "French"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CreateTranslatedFileTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.input_path = os.path.join(directory.name, "in.docx")
+        self.output_path = os.path.join(directory.name, "out.docx")
+        document = Document()
+        for text in ["Hello", "Goodbye", "Untouched"]:
+            document.add_paragraph(text)
+        document.save(self.input_path)
+
+        asset = MemoryAsset(name="test", source_language="en")
+        asset.set_target_languages(["fr"])
+        for source_text, target_text, machine in [
+            ("Hello", "Bonjour", False), ("Goodbye", "Au revoir (MT)", True),
+            ("Hello", "Salut", False), ("Goodbye", "Au revoir", False),
+        ]:
+            Memory.objects.create(name="test", source_language="en", target_language="fr", source_text=source_text,
+                                  target_text=target_text, is_machine_translation=machine, memory_asset=asset)
+        bump_pair_versions([("en", "fr")])
+
+    def translate(self):
+        """Translated paragraphs and the number of translation_memory queries it took."""
+        with CaptureQueriesContext(connection) as queries:
+            create_translated_file(self.input_path, self.output_path, "fr", "en")
+        memory_queries = [query for query in queries if '"translation_memory"' in query["sql"]]
+        return [paragraph.text for paragraph in Document(self.output_path).paragraphs], len(memory_queries)
+
+    def test_repeat_documents_are_translated_from_the_pair_cache(self):
+        # The oldest translation of a duplicated source wins, unless it is a machine translation
+        expected = ["Bonjour", "Au revoir", "Untouched"]
+        self.assertEqual(self.translate(), (expected, 1))
+        self.assertEqual(self.translate(), (expected, 0))
+
+        bump_pair_versions([("en", "fr")])
+        self.assertEqual(self.translate(), (expected, 1))
+
+    def test_uncached_pair_keeps_the_same_translation(self):
+        self.addCleanup(setattr, pair_cache, "max_bytes", pair_cache.max_bytes)
+        pair_cache.max_bytes = 0
+        self.assertEqual(self.translate()[0], ["Bonjour", "Au revoir", "Untouched"])
+
+
+@override_settings(GPT_RETRY_BASE_DELAY=0, GPT_MAX_RETRIES=2)
+class TranslateTextsTest(SimpleTestCase):
+    def completion(self, content):
+        return openai.openai_object.OpenAIObject.construct_from({
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"total_tokens": 30},
+        })
+
+    def test_results_keep_input_order_and_429s_are_retried(self):
+        texts = [f"Segment {i}" for i in range(20)]
+        failed = set()
+
+        def create(**kwargs):
+            text = kwargs["messages"][-1]["content"]
+            if text not in failed:
+                failed.add(text)
+                raise openai.error.RateLimitError("Rate limit reached")
+            return self.completion(f"fr: {text}")
+
+        with mock.patch("openai.ChatCompletion.create", side_effect=create) as create_mock:
+            translated = translate_texts(texts, "English", "French", "test-key", concurrency=4, batch=False)
+
+        self.assertEqual(translated, [f"fr: {text}" for text in texts])
+        self.assertEqual(create_mock.call_count, 40)
+
+    def test_client_errors_are_not_retried(self):
+        error = openai.error.InvalidRequestError("Bad request", None)
+        with mock.patch("openai.ChatCompletion.create", side_effect=error) as create_mock:
+            with self.assertRaises(openai.error.InvalidRequestError):
+                translate_texts(["Segment"], "English", "French", "test-key", batch=False)
+        self.assertEqual(create_mock.call_count, 1)
+
+    @override_settings(GPT_BATCH_MAX_SEGMENTS=10)
+    def test_batches_retry_only_the_segments_missing_from_the_reply(self):
+        texts = [f"Segment {i}" for i in range(10)]
+        prompts = []
+
+        def create(**kwargs):
+            content = kwargs["messages"][-1]["content"]
+            prompts.append(content)
+            if "response_format" not in kwargs:
+                return self.completion(f"fr: {content}")
+            items = json.loads(content)
+            # Drop the segment with id 3 and answer the rest
+            translations = [{"id": item["id"], "text": f"fr: {item['text']}"} for item in items if item["id"] != 3]
+            return self.completion(json.dumps({"translations": translations}))
+
+        with mock.patch("openai.ChatCompletion.create", side_effect=create):
+            translated = translate_texts(texts, "English", "French", "test-key")
+
+        self.assertEqual(translated, [f"fr: {text}" for text in texts])
+        # The full batch, then the single-segment prompt for the missing one
+        self.assertEqual(len(prompts), 2)
+        self.assertEqual(prompts[1], "Segment 3")
+
+    @override_settings(GPT_SEGMENT_MAX_TOKENS=30)
+    def test_long_segments_are_split_at_sentences_and_rejoined(self):
+        sentences = [f"This is sentence number {i} of a long paragraph." for i in range(6)]
+        prompts = []
+
+        def create(**kwargs):
+            text = kwargs["messages"][-1]["content"]
+            prompts.append((text, kwargs["max_tokens"]))
+            return self.completion(text.upper())
+
+        split = lambda text: [sentence + "." for sentence in text.split(".") if sentence.strip()]
+        with mock.patch("openai.ChatCompletion.create", side_effect=create):
+            translated = translate_texts(
+                [" ".join(sentences), "Short one."], "English", "French", "test-key", batch=False, split_sentences=split
+            )
+
+        self.assertEqual(translated, [" ".join(sentences).upper(), "SHORT ONE."])
+        # Every chunk stays under the budget and is cut at a sentence end
+        chunks = [text for text, _ in prompts if text != "Short one."]
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk.endswith(".") and len(chunk) <= 30 * 4 for chunk in chunks))
+
+
+# A long interval keeps the write-back thread idle, the tests flush the buffer themselves
+@override_settings(GPT_BATCH_ENABLED=False, MT_WRITEBACK_INTERVAL=3600)
+class TranslateRecordsViewTest(TestCase):
+    def setUp(self):
+        pair_cache.clear()
+        self.addCleanup(pair_cache.clear)
+
+        asset = MemoryAsset(name="test", source_language="en")
+        asset.set_target_languages(["fr"])
+        Memory.objects.create(
+            name="test",
+            source_language="en",
+            target_language="fr",
+            source_text="Hello",
+            target_text="Bonjour",
+            memory_asset=asset,
+        )
+        bump_pair_versions([("en", "fr")])
+
+    def test_tm_hits_and_duplicates_are_not_sent_to_gpt(self):
+        records = [{"originalText": text} for text in ["Hello", "Goodbye", "Hello", "Goodbye"]]
+        upload = SimpleUploadedFile("records.json", json.dumps(records).encode(), content_type="application/json")
+        completion = openai.openai_object.OpenAIObject.construct_from({
+            "choices": [{"message": {"role": "assistant", "content": "Au revoir"}}],
+        })
+
+        with mock.patch("openai.ChatCompletion.create", return_value=completion) as create_mock:
+            response = self.client.post("/memory/translation/", {
+                "file": upload, "source_language": "English", "target_language": "French", "gptKey": "test-key",
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(create_mock.call_count, 1)
+        self.assertEqual(
+            [(record["target_text"], record["source"], record["gptGenerated"]) for record in response.json()["translatedRecords"]],
+            [("Bonjour", "tm", False), ("Au revoir", "gpt", True), ("Bonjour", "tm", False), ("Au revoir", "gpt", True)],
+        )
+
+        # The GPT result is saved once the buffer flushes and is then served from the TM
+        self.assertEqual(mt_buffer.flush(), 1)
+        saved = Memory.objects.get(source_text="Goodbye")
+        self.assertEqual((saved.target_text, saved.is_machine_translation, saved.mt_model), ("Au revoir", True, "gpt-4o-mini"))
+        self.assertIsNotNone(saved.translated_at)
+
+        formatted = format_extracted_sentences({"Hello": "", "Goodbye": ""}, "en", "fr")
+        self.assertEqual(
+            [(item["translatedText"], item["machineTranslation"]) for item in formatted],
+            [("Bonjour", False), ("Au revoir", True)],
+        )
+
+    async def test_streamed_records_survive_a_failed_segment(self):
+        records = [{"originalText": text} for text in ["Hello", "Goodbye", "Broken"]]
+        upload = SimpleUploadedFile("records.json", json.dumps(records).encode(), content_type="application/json")
+
+        def create(**kwargs):
+            text = kwargs["messages"][-1]["content"]
+            if text == "Broken":
+                raise openai.error.InvalidRequestError("Bad request", None)
+            return openai.openai_object.OpenAIObject.construct_from({
+                "choices": [{"message": {"role": "assistant", "content": "Au revoir"}}],
+            })
+
+        with mock.patch("openai.ChatCompletion.create", side_effect=create):
+            response = await self.async_client.post("/memory/translation/", {
+                "file": upload, "source_language": "English", "target_language": "French", "gptKey": "test-key",
+                "stream": "ndjson",
+            })
+            frames = [json.loads(chunk) async for chunk in response.streaming_content]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(frames[0], {"type": "record", "index": 0, "source_text": "Hello", "target_text": "Bonjour",
+                                     "source": "tm", "gptGenerated": False})
+        self.assertIn({"type": "record", "index": 1, "source_text": "Goodbye", "target_text": "Au revoir",
+                       "source": "gpt", "gptGenerated": True}, frames)
+        self.assertIn({"type": "error", "error": "OpenAI API error: Bad request", "indices": [2]}, frames)
+        self.assertEqual(frames[-1], {"type": "done", "total": 3, "translated": 2, "failed": 1})
+        await sync_to_async(mt_buffer.flush)()
+
+    async def test_first_frame_is_sent_before_the_model_answers(self):
+        records = [{"originalText": text} for text in ["Hello", "Goodbye"]]
+        upload = SimpleUploadedFile("records.json", json.dumps(records).encode(), content_type="application/json")
+        release = threading.Event()
+        answered = threading.Event()
+
+        def create(**kwargs):
+            release.wait(5)
+            answered.set()
+            return openai.openai_object.OpenAIObject.construct_from({
+                "choices": [{"message": {"role": "assistant", "content": "Au revoir"}}],
+            })
+
+        with mock.patch("openai.ChatCompletion.create", side_effect=create):
+            response = await self.async_client.post("/memory/translation/", {
+                "file": upload, "source_language": "English", "target_language": "French", "gptKey": "test-key",
+                "stream": "ndjson",
+            })
+            # Iterated like the ASGI handler sends it; the TM match goes out while the GPT call is still running
+            chunks = aiter(response)
+            self.assertEqual(json.loads(await anext(chunks))["source"], "tm")
+            self.assertFalse(answered.is_set())
+
+            release.set()
+            frames = [json.loads(chunk) async for chunk in chunks]
+
+        self.assertEqual(frames[-1], {"type": "done", "total": 2, "translated": 2, "failed": 0})
+        await sync_to_async(mt_buffer.flush)()
+
+    def test_gpt_result_fills_in_an_untranslated_memory(self):
+        # Rows like DuplicateMemory creates, with the source text only
+        untranslated = Memory.objects.create(
+            name="test", source_language="en", target_language="fr", source_text="Goodbye", target_text="",
+            memory_asset=MemoryAsset.objects.get(name="test"),
+        )
+        mt_buffer.add("en", "fr", [("Goodbye", "Au revoir"), ("Hello", "Salut")], "gpt-4o-mini")
+        self.assertEqual(mt_buffer.flush(), 1)
+
+        untranslated.refresh_from_db()
+        self.assertEqual((untranslated.target_text, untranslated.is_machine_translation), ("Au revoir", True))
+        self.assertEqual(Memory.objects.get(source_text="Hello").target_text, "Bonjour")
+        self.assertEqual(Memory.objects.filter(source_text="Goodbye").count(), 1)
+
+
+def tmx(units, source_language="en", target_language="fr"):
+    body = "".join(
+        f'<tu><tuv xml:lang="{source_language}"><seg>{source}</seg></tuv>'
+        f'<tuv xml:lang="{target_language}"><seg>{target}</seg></tuv></tu>'
+        for source, target in units
+    )
+    return f"<tmx version=\"1.4\"><body>{body}</body></tmx>".encode()
+
+
+class ImportJobTest(TestCase):
+    def setUp(self):
+        import_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(import_dir.cleanup)
+        settings_override = override_settings(MEMORY_IMPORT_DIR=import_dir.name, IMPORT_JOB_STALE_AFTER=600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.asset = MemoryAsset(name="import", source_language="en")
+        self.asset.set_target_languages(["fr", "de"])
+
+    def enqueue(self, content, target_languages=("fr",)):
+        upload = SimpleUploadedFile("memories.tmx", content)
+        return enqueue_import(upload, "tmx", self.asset, "import", "en", list(target_languages))
+
+    def test_jobs_of_a_busy_pair_wait_for_the_running_one(self):
+        first = self.enqueue(tmx([("Hello", "Bonjour")]), ["fr", "de"])
+        same_pair = self.enqueue(tmx([("Hello", "Salut")]))
+        other_pair = self.enqueue(tmx([("Hello", "Hallo")]), ["de"])
+        unrelated = self.enqueue(tmx([("Hello", "Ciao")], target_language="it"), ["it"])
+
+        self.assertEqual(claim_next_job("a").pk, first.pk)
+        # Both of the next jobs share a pair with the running one
+        self.assertEqual(claim_next_job("b").pk, unrelated.pk)
+        self.assertIsNone(claim_next_job("c"))
+
+        self.assertTrue(run_job(ImportJob.objects.get(pk=first.pk)))
+        self.assertEqual(claim_next_job("c").pk, same_pair.pk)
+        self.assertEqual(claim_next_job("d").pk, other_pair.pk)
+
+    def test_stale_job_is_requeued_and_its_old_worker_fenced_off(self):
+        job = self.enqueue(tmx([("Hello", "Bonjour"), ("Goodbye", "Au revoir")]))
+        slow = claim_next_job("slow")
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=1, inserted=1, progress=0.5, heartbeat_at=timezone.now() - timedelta(seconds=601),
+        )
+
+        claimed = claim_next_job("fresh")
+        self.assertEqual((claimed.pk, claimed.worker, claimed.rows_processed, claimed.inserted, claimed.progress),
+                         (job.pk, "fresh", 0, 0, None))
+
+        # The slow worker may no longer write memories, report or complete the job
+        self.assertFalse(run_job(slow))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.rows_processed), (ImportJob.STATUS_RUNNING, "fresh", 0))
+        self.assertFalse(Memory.objects.filter(name="import").exists())
+        self.assertTrue(os.path.exists(job.file_path))
+
+        self.assertTrue(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.inserted, job.updated), (ImportJob.STATUS_COMPLETED, 2, 0))
+        self.assertEqual(Memory.objects.filter(name="import").count(), 2)
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_status_endpoint_reports_the_job(self):
+        job = self.enqueue(tmx([("Hello", "Bonjour"), ("", "Vide")]))
+        run_job(claim_next_job("a"))
+
+        response = self.client.get(f"/memory/upload/status/{job.pk}/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(
+            {key: data[key] for key in ["job_id", "status", "rows_processed", "progress", "inserted", "updated",
+                                        "skipped", "eta_seconds", "errors"]},
+            {"job_id": job.pk, "status": ImportJob.STATUS_COMPLETED, "rows_processed": 2, "progress": 1.0,
+             "inserted": 1, "updated": 0, "skipped": 1, "eta_seconds": 0, "errors": []},
+        )
+        self.assertEqual(self.client.get(f"/memory/upload/status/{job.pk + 1}/").status_code, 404)
+
+    def test_failed_job_removes_its_file(self):
+        job = self.enqueue(b"<tmx><body><tu>")
+        self.assertFalse(run_job(claim_next_job("a")))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+        self.assertFalse(os.path.exists(job.file_path))
+
+
+class OcrTaskRegistryTest(TestCase):
+    def setUp(self):
+        self.server = abbyy_server(processing_time=60).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        result_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(result_dir.cleanup)
+        settings_override = override_settings(ABBYY_BASE_URL=self.server.base_url, OCR_RESULT_DIR=result_dir.name, **ABBYY_TEST_CREDENTIALS)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def submit(self, language="English"):
+        upload = SimpleUploadedFile("scan.pdf", b"%PDF-1.4", content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": language})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["taskId"]
+
+    @override_settings(OCR_POLL_INTERVAL=60)
+    def test_status_requests_within_the_interval_share_one_upstream_poll(self):
+        task_id = self.submit()
+        self.assertEqual(OcrTask.objects.get(task_id=task_id).file_name, "scan.pdf")
+
+        statuses = [self.client.get("/memory/tasks/", {"taskId": task_id}).json()["status"] for _ in range(5)]
+
+        self.assertEqual(statuses, ["InProgress"] * 5)
+        self.assertEqual(self.server.calls, 2)  # processImage and a single getTaskStatus
+
+    def test_unknown_task_is_not_registered(self):
+        response = self.client.get("/memory/tasks/", {"taskId": "made-up"})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(OcrTask.objects.filter(task_id="made-up").exists())
+        self.assertEqual(self.server.calls, 0)
+
+    def test_invalid_fuzzy_min_score_is_rejected(self):
+        for value in ["abc", "1.5"]:
+            response = self.client.get("/memory/tasks/", {"taskId": "any", "fuzzy_min_score": value})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.calls, 0)
+
+    @override_settings(OCR_POLL_INTERVAL=0)
+    def test_completed_result_is_downloaded_once(self):
+        task_id = self.submit()
+        self.server.tasks[task_id]["ready_at"] = 0
+
+        task = refresh_task(get_task(task_id))
+        self.assertEqual(task.status, "Completed")
+        self.assertIsNotNone(task.completed_at)
+        with open(result_store.get(task.result_hash), "rb") as f:
+            self.assertEqual(f.read(), self.server.result)
+
+        calls = self.server.calls
+        self.assertEqual(refresh_task(get_task(task_id)).result_hash, task.result_hash)
+        self.assertEqual(self.server.calls, calls)
+
+        response = self.client.get("/download-generated-docx/", {"taskId": task_id})
+        self.assertEqual(b"".join(response.streaming_content), self.server.result)
+        self.assertIn('filename="scan.docx"', response["Content-Disposition"])
+        self.assertEqual(self.client.get("/download-generated-docx/", {"taskId": "unknown"}).status_code, 404)
+
+    def test_failed_download_leaves_no_temporary_file(self):
+        task_id = self.submit()
+        self.server.tasks[task_id]["ready_at"] = 0
+
+        with mock.patch("ocr_service.services.ocr_tasks.download_result", side_effect=requests.ConnectionError("reset")):
+            task = refresh_task(get_task(task_id))
+
+        self.assertEqual(task.status, "InProgress")
+        self.assertEqual(os.listdir(os.path.join(result_store.root, "tmp")), [])
+
+    @override_settings(OCR_POLL_INTERVAL=0)
+    def test_repeat_upload_is_served_from_the_cache(self):
+        ocr_cache.hits = ocr_cache.misses = 0
+        task_id = self.submit()
+        self.server.tasks[task_id]["ready_at"] = 0
+        refresh_task(get_task(task_id))
+        calls = self.server.calls
+
+        cached_task_id = self.submit()
+        self.assertEqual(self.server.calls, calls)
+        response = self.client.get("/memory/tasks/", {"taskId": cached_task_id, "source_language": "English"})
+        self.assertEqual(response.json()["status"], "Completed")
+        self.assertEqual(self.server.calls, calls)
+
+        # Other recognition settings are a different key
+        self.submit(language="French")
+        self.assertEqual(self.server.calls, calls + 1)
+        self.assertEqual(self.client.get("/extract-text/cache/stats/").json(),
+                         {"hits": 1, "misses": 2, "hitRate": 1 / 3, "entries": 1})
+
+    @override_settings(ABBYY_RETRY_BASE_DELAY=0, ABBYY_MAX_RETRIES=3)
+    def test_status_polls_are_retried_and_submissions_are_not(self):
+        task_id = self.submit()
+        self.server.error_rate = 1.0
+
+        calls = self.server.calls
+        with self.assertRaises(requests.HTTPError):
+            get_task_status(task_id)
+        self.assertEqual(self.server.calls, calls + 4)
+
+        upload = SimpleUploadedFile("other.pdf", b"%PDF-1.5", content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English"})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.server.calls, calls + 5)
+
+    def test_saved_credentials_replace_the_defaults(self):
+        self.assertEqual(credentials(), (settings.ABBYY_APPLICATION_ID, settings.ABBYY_PASSWORD))
+        Settings.objects.create(abby_app_id="app", abby_password="secret")
+        self.assertEqual(credentials(), ("app", "secret"))
+
+    @override_settings(ABBYY_APPLICATION_ID="", ABBYY_PASSWORD="")
+    def test_missing_credentials_are_a_configuration_error(self):
+        with self.assertRaises(ImproperlyConfigured):
+            credentials()
+
+    @override_settings(OCR_RESULT_TTL=60, OCR_RESULT_MAX_BYTES=10)
+    def test_results_are_evicted_by_age_then_size(self):
+        hashes = []
+        for content in [b"old", b"older", b"newest"]:
+            path = result_store.temporary_path()
+            with open(path, "wb") as f:
+                f.write(content)
+            hashes.append(result_store.put_file(path))
+        os.utime(result_store.path(hashes[0]), (0, time.time() - 120))
+        os.utime(result_store.path(hashes[1]), (0, time.time() - 30))
+
+        # The expired blob goes, then the least recently read one until 10 bytes fit
+        self.assertEqual(result_store.evict(), 2)
+        self.assertEqual([result_store.get(content_hash) is not None for content_hash in hashes], [False, False, True])
+
+    @override_settings(OCR_RESULT_TTL=60, OCR_RESULT_MAX_BYTES=0, OCR_RESULT_TMP_GRACE=60)
+    def test_eviction_spares_temporary_files_being_written(self):
+        writing = result_store.temporary_path()
+        abandoned = result_store.temporary_path()
+        os.utime(abandoned, (0, time.time() - 120))
+
+        self.assertEqual(result_store.evict(), 1)
+        self.assertTrue(os.path.exists(writing))
+        self.assertFalse(os.path.exists(abandoned))
+
+
+@override_settings(OCR_POLL_INTERVAL=0.05, OCR_STATUS_HEARTBEAT_INTERVAL=0.5)
+class TaskStatusEventsTest(TransactionTestCase):
+    def setUp(self):
+        self.server = abbyy_server(processing_time=0.3).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        result_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(result_dir.cleanup)
+        settings_override = override_settings(ABBYY_BASE_URL=self.server.base_url, OCR_RESULT_DIR=result_dir.name, **ABBYY_TEST_CREDENTIALS)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        upload = SimpleUploadedFile("scan.pdf", b"%PDF-1.4", content_type="application/pdf")
+        self.task_id = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English"}).json()["taskId"]
+
+    async def test_status_changes_are_pushed_until_completion(self):
+        response = await self.async_client.get("/memory/tasks/events/", {"taskId": self.task_id, "stream": "ndjson"})
+        frames = [json.loads(chunk) async for chunk in response.streaming_content]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        statuses = [frame["status"] for frame in frames if frame["type"] == "status"]
+        self.assertEqual(statuses, ["InProgress", "Completed"])
+        self.assertEqual(frames[-1], {"type": "done", "taskId": self.task_id, "status": "Completed"})
+
+    async def test_long_poll_answers_on_the_next_status(self):
+        response = await self.async_client.get("/memory/tasks/wait/", {"taskId": self.task_id, "status": "Queued"})
+        self.assertEqual(response.json()["status"], "InProgress")
+
+        response = await self.async_client.get("/memory/tasks/wait/", {"taskId": self.task_id, "status": "InProgress"})
+        self.assertEqual(response.json()["status"], "Completed")
+        self.assertTrue(response.json()["terminal"])
+
+
+def blank_pdf(pages):
+    document = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        document.new_page(200, 200)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def text_pdf(pages, scanned=()):
+    """
+    A PDF whose pages show the given lines in Helvetica; None makes a page without text.
+
+    Pages whose index is in `scanned` are covered by an image under their text.
+    """
+    page_count = len(pages)
+    image = 4 + 2 * page_count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % (4 + 2 * index) for index in range(page_count)), page_count
+        ),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for index, lines in enumerate(pages):
+        commands = [b"q 612 0 0 792 0 0 cm /Im1 Do Q"] if index in scanned else []
+        commands.append(b"BT /F1 12 Tf 14 TL 72 720 Td")
+        for line in lines or []:
+            commands.append(b"T*" if line == "" else b"(%s) Tj T*" % line.encode())
+        stream = b" ".join(commands + [b"ET"]) if lines else b" ".join(commands[:-1])
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> /XObject << /Im1 %d 0 R >> >> >>" % (5 + 2 * index, image))
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects.append(b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray "
+                   b"/BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+@override_settings(OCR_POLL_INTERVAL=0)
+class ShardedOcrTest(TransactionTestCase):
+    def setUp(self):
+        self.server = abbyy_server(processing_time=0).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        result_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(result_dir.cleanup)
+        settings_override = override_settings(ABBYY_BASE_URL=self.server.base_url, OCR_RESULT_DIR=result_dir.name, **ABBYY_TEST_CREDENTIALS)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_born_digital_pdf_is_extracted_without_ocr(self):
+        pdf = text_pdf([
+            ["This agreement is made between the", "parties listed below.", "", "Payment is due within thirty days."],
+            ["The contract is valid until 31 Decem-", "ber 2024."],
+        ])
+        upload = SimpleUploadedFile("digital.pdf", pdf, content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English"})
+        self.assertTrue(response.json()["textLayer"])
+
+        response = self.client.get("/memory/tasks/", {"taskId": response.json()["taskId"], "source_language": "English"})
+        self.assertEqual([item["originalText"] for item in response.json()["data"]], [
+            "This agreement is made between the parties listed below.",
+            "Payment is due within thirty days.",
+            "The contract is valid until 31 December 2024.",
+        ])
+        self.assertEqual(self.server.calls, 0)
+
+    def test_only_image_pages_of_a_mixed_pdf_go_to_ocr(self):
+        pdf = text_pdf([["Page one has a text layer of its own."], None, ["Page three has one as well."]])
+        upload = SimpleUploadedFile("mixed.pdf", pdf, content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English"})
+        self.assertEqual(response.json()["shards"], 3)
+        self.assertEqual(self.server.calls, 1)
+
+        task = refresh_task(get_task(response.json()["taskId"]))
+        self.assertEqual(task.status, "Completed")
+        merged = Document(result_store.get(task.result_hash))
+        self.assertEqual(
+            [paragraph.text for paragraph in merged.paragraphs if paragraph.text],
+            ["Page one has a text layer of its own.", *DEFAULT_PARAGRAPHS, "Page three has one as well."],
+        )
+
+    def test_scanned_page_with_a_text_stamp_goes_to_ocr(self):
+        pdf = text_pdf([["Page one has a text layer of its own."], ["Page 2 of 40 - Confidential"]], scanned={1})
+        upload = SimpleUploadedFile("stamped.pdf", pdf, content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English"})
+        self.assertEqual(response.json()["shards"], 2)
+        self.assertEqual(self.server.calls, 1)
+
+    def test_failed_shard_is_resubmitted_alone_and_results_merge_in_page_order(self):
+        upload = SimpleUploadedFile("long.pdf", blank_pdf(5), content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English", "shardPages": 2})
+        self.assertEqual(response.json()["shards"], 3)
+        task_id = response.json()["taskId"]
+        shards = list(OcrTask.objects.filter(parent__task_id=task_id).order_by("page_start"))
+        self.assertEqual([(shard.page_start, shard.page_end) for shard in shards], [(0, 2), (2, 4), (4, 5)])
+        self.server.tasks[shards[1].task_id]["status"] = "ProcessingFailed"
+
+        calls = self.server.calls
+        task = refresh_task(get_task(task_id))
+        self.assertEqual(task.status, "InProgress")
+        self.assertEqual(self.server.calls, calls + 3 + 1)  # three polls and one resubmission
+        self.assertEqual([shard.attempts for shard in task.shards.order_by("page_start")], [1, 2, 1])
+
+        task = refresh_task(get_task(task_id))
+        self.assertEqual(task.status, "Completed")
+        self.assertEqual(self.server.calls, calls + 3 + 1 + 1)
+        merged = Document(result_store.get(task.result_hash))
+        self.assertEqual([paragraph.text for paragraph in merged.paragraphs if paragraph.text], DEFAULT_PARAGRAPHS * 3)
+
+
+# Stands in for the tesseract binary in TesseractEngine's pool processes, whatever their start method
+FAKE_TESSERACT = """#!{python}
+import os
+import sys
+
+if sys.argv[1] == "--version":
+    print("tesseract 5.3.0")
+    sys.exit()
+with open(os.path.join(os.path.dirname(sys.argv[0]), "languages.log"), "a") as log:
+    log.write(sys.argv[sys.argv.index("-l") + 1] + "\\n")
+# Every page reads as two paragraphs
+rows = [
+    "level\\tpage_num\\tblock_num\\tpar_num\\tline_num\\tword_num\\tleft\\ttop\\twidth\\theight\\tconf\\ttext",
+    "1\\t1\\t0\\t0\\t0\\t0\\t0\\t0\\t100\\t100\\t-1\\t",
+]
+for block, words in [(1, ["Scanned", "page", "text."]), (2, ["Second", "paragraph."])]:
+    for number, word in enumerate(words, start=1):
+        rows.append(f"5\\t1\\t{{block}}\\t1\\t1\\t{{number}}\\t0\\t0\\t10\\t10\\t95\\t{{word}}")
+with open(sys.argv[2] + ".tsv", "w") as tsv:
+    tsv.write("\\n".join(rows) + "\\n")
+"""
+
+
+@override_settings(OCR_POLL_INTERVAL=0, OCR_LOCAL_WORKERS=2)
+class TesseractEngineTest(TestCase):
+    def setUp(self):
+        self.server = abbyy_server(processing_time=0).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.tesseract = os.path.join(work_dir.name, "tesseract")
+        with open(self.tesseract, "w") as f:
+            f.write(FAKE_TESSERACT.format(python=sys.executable))
+        os.chmod(self.tesseract, 0o755)
+        settings_override = override_settings(
+            ABBYY_BASE_URL=self.server.base_url, OCR_RESULT_DIR=os.path.join(work_dir.name, "results"),
+            OCR_TESSERACT_CMD=self.tesseract, **ABBYY_TEST_CREDENTIALS,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.engine = get_engine("tesseract")
+        self.addCleanup(self.engine.shutdown)
+
+    def languages(self):
+        with open(os.path.join(os.path.dirname(self.tesseract), "languages.log")) as log:
+            return log.read().split()
+
+    def wait_for(self, task_id):
+        deadline = time.monotonic() + 60
+        task = refresh_task(get_task(task_id))
+        while not task.is_terminal and time.monotonic() < deadline:
+            time.sleep(0.05)
+            task = refresh_task(get_task(task_id))
+        return task
+
+    def test_image_pages_are_recognized_in_the_local_pool(self):
+        pdf = text_pdf([["Page one has a text layer of its own."], None])
+        upload = SimpleUploadedFile("mixed.pdf", pdf, content_type="application/pdf")
+        response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English,Turkish",
+                                                       "engine": "tesseract"})
+        self.assertEqual(response.json()["engine"], "tesseract")
+        task = self.wait_for(response.json()["taskId"])
+
+        self.assertEqual((task.status, task.engine), ("Completed", "tesseract"))
+        document = Document(result_store.get(task.result_hash))
+        self.assertEqual(
+            [paragraph.text for paragraph in document.paragraphs if paragraph.text],
+            ["Page one has a text layer of its own.", "Scanned page text.", "Second paragraph."],
+        )
+        self.assertEqual(self.languages(), ["eng+tur"])  # the image page only
+        self.assertEqual(self.server.calls, 0)
+        self.assertEqual(os.listdir(self.engine.job_dir()), [])
+
+    @override_settings(OCR_ENGINE_FALLBACK="tesseract")
+    def test_failed_abbyy_submission_falls_back_to_tesseract(self):
+        upload = SimpleUploadedFile("scan.pdf", blank_pdf(1), content_type="application/pdf")
+        with mock.patch("ocr_service.services.ocr_engines.submit_file_for_ocr",
+                        side_effect=requests.ConnectionError("ABBYY is down")):
+            response = self.client.post("/extract-text/", {"file": upload, "sourceLanguage": "English"})
+        self.assertEqual(response.json()["engine"], "tesseract")
+        self.assertEqual(self.wait_for(response.json()["taskId"]).status, "Completed")
+        self.assertEqual(self.languages(), ["eng"])
+
+    def test_engines_implement_the_interface(self):
+        with self.assertRaises(TypeError):
+            OcrEngine()
+        self.assertEqual(tesseract_language("Turkish, Klingon"), "tur")
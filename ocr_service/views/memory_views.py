@@ -2,10 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
-from lxml import etree
-import pandas as pd
-from ocr_service.models.memory_models import Memory, MemoryAsset
-from xlsx2csv import Xlsx2csv
+from ocr_service.models.memory_models import Memory, MemoryAsset, source_text_hash
+from ocr_service.models.memory_asset_model import parse_target_languages
+from ocr_service.models.import_job_model import ImportJob
+from ocr_service.services.import_jobs import enqueue_import, job_status
+from ocr_service.services.memory_cache import bump_pair_versions, find_exact, find_exact_many, memory_pairs
+from ocr_service.services.memory_fuzzy import find_fuzzy, find_fuzzy_many, index_memories
 from django.http import HttpResponse
 import csv
 from io import BytesIO, StringIO
@@ -214,6 +216,15 @@ LANGUAGE_CODES = {
 }
 
 
+def parse_min_score(value):
+    """The optional fuzzy min_score of a request; ValueError unless it is a number between 0 and 1."""
+    if value in (None, ''):
+        return None
+    min_score = float(value)
+    if not 0 <= min_score <= 1:
+        raise ValueError(value)
+    return min_score
+
 
 class TranslationMemoryUploadAPI(APIView):
     parser_classes = (MultiPartParser, FormParser)
@@ -232,19 +243,18 @@ class TranslationMemoryUploadAPI(APIView):
             )
 
         # Parse target languages
-        target_languages = [lang.strip() for lang in target_languages.split(',')]
+        target_languages = parse_target_languages(target_languages)
 
-        # Check if MemoryAsset already exists
-        memory_asset, created = MemoryAsset.objects.get_or_create(
-            source_language=source_language,
-            target_languages=",".join(target_languages),
-            defaults={'name': name}
-        )
+        # Check if MemoryAsset already exists for the same language set, in any order
+        memory_asset = MemoryAsset.objects.with_target_languages(source_language, target_languages).first()
 
-        if not created:
+        if memory_asset:
             # Update the name of the existing MemoryAsset
             memory_asset.name = name
             memory_asset.save()
+        else:
+            memory_asset = MemoryAsset(name=name, source_language=source_language)
+            memory_asset.set_target_languages(target_languages)
 
         # If no file is provided, only update the MemoryAsset name and return the response
         if not file:
@@ -261,148 +271,33 @@ class TranslationMemoryUploadAPI(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Process file
+        # Queue the file, a run_import_worker process imports it in the background
         try:
-            if file_type == 'tmx':
-                self.process_tmx(file, source_language, target_languages, name, memory_asset)
-            elif file_type == 'xlsx':
-                self.process_xlsx(file, source_language, target_languages, name, memory_asset)
+            job = enqueue_import(file, file_type, memory_asset, name, source_language, target_languages)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return Response(
-            {"message": "Translations saved successfully!", "memory_asset_id": memory_asset.id},
-            status=status.HTTP_201_CREATED
+            {
+                "message": "Translations queued for import.",
+                "memory_asset_id": memory_asset.id,
+                "job_id": job.id,
+            },
+            status=status.HTTP_202_ACCEPTED
         )
 
-    def process_tmx(self, file, source_language, target_languages, name, memory_asset):
-        """Process TMX file and update or save translations for multiple target languages."""
-        try:
-            tree = etree.parse(file)
-            root = tree.getroot()
-
-            # TMX namespace
-            namespace = {'xml': 'http://www.w3.org/XML/1998/namespace'}
-
-            for tu_number, tu in enumerate(root.findall('.//tu'), start=1):  # Iterate through translation units
-                source_text = None
-                target_texts = {lang: None for lang in target_languages}
-
-                for tuv in tu.findall('./tuv'):  # Translation unit variants
-                    lang = tuv.attrib.get(f'{{{namespace["xml"]}}}lang')
-                    seg = tuv.find('./seg')
-
-                    if seg is not None:
-                        # Clean the text content
-                        cleaned_text = etree.tostring(seg, encoding='unicode', method='text').strip()
-
-                        if lang == source_language:
-                            source_text = cleaned_text
-                        elif lang in target_languages:
-                            target_texts[lang] = cleaned_text
-
-                # Process source and target text
-                if source_text:
-                    for lang, target_text in target_texts.items():
-                        target_text = target_text.strip() if target_text else None
-
-                        # Ensure no duplicate records; update if existing, otherwise create
-                        if target_text:
-                            existing_record = Memory.objects.filter(
-                                source_language=source_language,
-                                target_language=lang,
-                                source_text=source_text
-                            ).first()
-
-                            if existing_record:
-                                # Update existing record
-                                existing_record.target_text = target_text
-                                existing_record.memory_asset = memory_asset
-                                existing_record.name = name
-                                existing_record.save()
-                                print(f"Updated TU #{tu_number} for target language '{lang}'")
-                            else:
-                                # Create a new record
-                                Memory.objects.create(
-                                    name=name,
-                                    source_language=source_language,
-                                    target_language=lang,
-                                    source_text=source_text,
-                                    target_text=target_text,
-                                    memory_asset=memory_asset,
-                                )
-                                print(f"Added TU #{tu_number} for target language '{lang}'")
-                        else:
-                            print(f"Skipping TU #{tu_number} for target language '{lang}': Missing target text")
-                else:
-                    print(f"Skipping TU #{tu_number}: Missing source text")
+class ImportJobStatusAPI(APIView):
+    def get(self, request, *args, **kwargs):
+        job_id = kwargs.get('job_id')
 
-        except Exception as e:
-            print(f"Error processing TMX file: {e}")
-            raise ValueError(f"Error processing TMX file: {e}")
+        job = ImportJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response(
+                {"error": "Import job not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-    def process_xlsx(self, file, source_language, target_languages, name, memory_asset):
-        """Process XLSX file and update or save translations for multiple target languages."""
-        try:
-            # Convert XLSX to CSV
-            csv_output = StringIO()
-            Xlsx2csv(file, outputencoding="utf-8").convert(csv_output)
-
-            # Load CSV into Pandas DataFrame
-            csv_output.seek(0)
-            df = pd.read_csv(csv_output)
-
-            # Verify columns
-            if source_language not in df.columns:
-                raise ValueError(f"Source language column '{source_language}' not found in the file.")
-            for lang in target_languages:
-                if lang not in df.columns:
-                    raise ValueError(f"Target language column '{lang}' not found in the file.")
-
-            # Process rows
-            for index, row in df.iterrows():
-                source_text = row.get(source_language)
-                target_texts = {lang: row.get(lang) for lang in target_languages}
-
-                source_text = str(source_text).strip() if pd.notna(source_text) else None
-                if source_text:
-                    for lang, target_text in target_texts.items():
-                        target_text = str(target_text).strip() if pd.notna(target_text) else None
-
-                        # Check for existing record
-                        existing_record = Memory.objects.filter(
-                            source_language=source_language,
-                            target_language=lang,
-                            source_text=source_text,
-                        ).first()
-
-                        if existing_record:
-                            # Update existing record
-                            if target_text:
-                                existing_record.target_text = target_text
-                            existing_record.memory_asset = memory_asset
-                            existing_record.name = name
-                            existing_record.save()
-                            print(f"Updated Row #{index + 1} for target language '{lang}'")
-                        else:
-                            # Only create a new record if target_text is provided
-                            if target_text:
-                                Memory.objects.create(
-                                    name=name,
-                                    source_language=source_language,
-                                    target_language=lang,
-                                    source_text=source_text,
-                                    target_text=target_text,
-                                    memory_asset=memory_asset,
-                                )
-                                print(f"Added Row #{index + 1} for target language '{lang}'")
-                            else:
-                                print(f"Skipping Row #{index + 1} for target language '{lang}': Missing target text")
-                else:
-                    print(f"Skipping Row #{index + 1}: Missing source text")
-        except Exception as e:
-            print(f"Error processing XLSX file: {e}")
-            raise ValueError(f"Error processing XLSX file: {e}")
+        return Response({"data": job_status(job)}, status=status.HTTP_200_OK)
 
 class MemoryListAPI(APIView):
     def get(self, request, *args, **kwargs):
@@ -471,7 +366,10 @@ class MemoryDeleteAPI(APIView):
 
         try:
             # Delete all related memories
-            deleted_memories_count, _ = Memory.objects.filter(memory_asset_id=memory_asset_id).delete()
+            memories = Memory.objects.filter(memory_asset_id=memory_asset_id)
+            pairs = memory_pairs(memories)
+            deleted_memories_count, _ = memories.delete()
+            bump_pair_versions(pairs)
 
             # Delete the memory asset
             deleted_memory_asset_count, _ = MemoryAsset.objects.filter(id=memory_asset_id).delete()
@@ -527,12 +425,22 @@ class MemoryUpdateAPI(APIView):
                 # Update the Memory record
                 Memory.objects.filter(id=memory_id).update(
                     source_text=source_text,
-                    target_text=target_text
+                    source_hash=source_text_hash(source_text),
+                    target_text=target_text,
+                    # Saved by a translator, no longer an unreviewed machine translation
+                    is_machine_translation=False,
+                    mt_model='',
+                    translated_at=None,
                 )
                 updated_count += 1
             except Exception as e:
                 errors.append({"id": memory_id, "error": str(e)})
 
+        # Cached lookups and fuzzy buckets of every row touched by the update are refreshed
+        row_ids = [row.get('id') for row in updated_rows if row.get('id')]
+        bump_pair_versions(memory_pairs(Memory.objects.filter(id__in=row_ids)))
+        index_memories(Memory.objects.filter(id__in=row_ids))
+
         response_data = {
             "message": f"{updated_count} rows updated successfully.",
             "errors": errors,
@@ -554,15 +462,37 @@ class GetMemoryBySource(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            min_score = parse_min_score(request.data.get('min_score'))
+        except (TypeError, ValueError):
+            return Response({"error": "min_score must be a number between 0 and 1."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         errors = []
 
+        source_language_code = LANGUAGE_CODES.get(source_language, 'en')
+        target_language_code = LANGUAGE_CODES.get(target_language, 'en')
+        matched_memory = None
+        match_score = None
+
         try:
-            # Find the first matching memory record
-            matched_memory = Memory.objects.filter(
-                source_text=source_text,
-                source_language=LANGUAGE_CODES.get(source_language, 'en'),
-                target_language=LANGUAGE_CODES.get(target_language, 'en')
-            ).first()
+            # Find the first matching memory record, served from the pair cache when possible
+            matched_memory = find_exact(source_language_code, target_language_code, source_text)
+            if matched_memory:
+                match_score = 1.0
+            else:
+                # Fall back to the closest fuzzy match above the minimum score
+                fuzzy_matches = find_fuzzy(
+                    source_language_code,
+                    target_language_code,
+                    source_text,
+                    min_score=min_score,
+                    limit=1,
+                )
+                if fuzzy_matches:
+                    best = fuzzy_matches[0]
+                    matched_memory = (best["id"], best["source_text"], best["target_text"], best["is_machine_translation"])
+                    match_score = best["score"]
 
             # If no record is found, return an empty response (204 No Content)
             if not matched_memory:
@@ -572,20 +502,103 @@ class GetMemoryBySource(APIView):
             errors.append({"error": str(e)})
 
         # Construct response data if a matched record is found
+        memory_id, matched_source_text, matched_target_text, machine_translation = matched_memory or (None, None, None, None)
         response_data = {
             "errors": errors,
             "data": {
-                "id": matched_memory.id if matched_memory else None,
-                "source_text": matched_memory.source_text if matched_memory else None,
-                "target_text": matched_memory.target_text if matched_memory else None,
-                "source_language": matched_memory.source_language if matched_memory else None,
-                "target_language": matched_memory.target_language if matched_memory else None,
+                "id": memory_id,
+                "source_text": matched_source_text,
+                "target_text": matched_target_text,
+                "source_language": source_language_code if matched_memory else None,
+                "target_language": target_language_code if matched_memory else None,
+                "match_score": match_score,
+                "is_machine_translation": machine_translation,
             }
         }
 
         # Return a response
         return Response(response_data, status=status.HTTP_200_OK)
 
+class GetMemoryBySourceBatch(APIView):
+    def put(self, request, *args, **kwargs):
+        # Same lookup as GetMemoryBySource for a list of source texts of one language pair
+        source_texts = request.data.get('source_texts')
+        target_language = request.data.get('target_language')
+        source_language = request.data.get('source_language')
+
+        if not isinstance(source_texts, list) or not target_language or not source_language:
+            return Response(
+                {"error": "Missing required fields (source_texts, target_language, source_language)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(source_texts) > settings.TM_BATCH_LOOKUP_MAX:
+            return Response(
+                {"error": f"At most {settings.TM_BATCH_LOOKUP_MAX} source_texts can be looked up per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not all(isinstance(text, str) for text in source_texts):
+            return Response(
+                {"error": "source_texts must be a list of strings."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            min_score = parse_min_score(request.data.get('min_score'))
+        except (TypeError, ValueError):
+            return Response({"error": "min_score must be a number between 0 and 1."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        errors = []
+        data = {}
+
+        source_language_code = LANGUAGE_CODES.get(source_language, 'en')
+        target_language_code = LANGUAGE_CODES.get(target_language, 'en')
+        texts = [text for text in source_texts if text]
+
+        try:
+            # Exact matches for every text at once, then one fuzzy pass over the misses
+            matches = {
+                text: (match, 1.0)
+                for text, match in find_exact_many(source_language_code, target_language_code, texts).items()
+            }
+            misses = [text for text in texts if text not in matches]
+            if misses:
+                fuzzy_matches = find_fuzzy_many(
+                    source_language_code,
+                    target_language_code,
+                    misses,
+                    min_score=min_score,
+                    limit=1,
+                )
+                for text, found in fuzzy_matches.items():
+                    best = found[0]
+                    matches[text] = (
+                        (best["id"], best["source_text"], best["target_text"], best["is_machine_translation"]),
+                        best["score"],
+                    )
+
+            # Key the matches by the position of the text in the request
+            for index, text in enumerate(source_texts):
+                if text not in matches:
+                    continue
+                (memory_id, matched_source_text, matched_target_text, machine_translation), match_score = matches[text]
+                data[index] = {
+                    "id": memory_id,
+                    "source_text": matched_source_text,
+                    "target_text": matched_target_text,
+                    "source_language": source_language_code,
+                    "target_language": target_language_code,
+                    "match_score": match_score,
+                    "is_machine_translation": machine_translation,
+                }
+
+        except Exception as e:
+            errors.append({"error": str(e)})
+
+        return Response({"errors": errors, "data": data}, status=status.HTTP_200_OK)
+
 class MemoryUpdateAPIBySourceAndTargetLanguage(APIView):
     def put(self, request, *args, **kwargs):
         # Retrieve `source_language`, `target_language`, and rows to update
@@ -606,11 +619,13 @@ class MemoryUpdateAPIBySourceAndTargetLanguage(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Retrieve the MemoryAsset for the given languages
-        memory_asset = MemoryAsset.objects.filter(
-            source_language=LANGUAGE_CODES.get(source_language, 'en'),
-            target_languages=LANGUAGE_CODES.get(target_language, 'fr'),
-        ).first()
+        # Retrieve the MemoryAsset for the given languages, preferring an asset dedicated to the pair
+        source_language_code = LANGUAGE_CODES.get(source_language, 'en')
+        target_language_code = LANGUAGE_CODES.get(target_language, 'fr')
+        memory_asset = (
+            MemoryAsset.objects.with_target_languages(source_language_code, [target_language_code]).first()
+            or MemoryAsset.objects.covering(source_language_code, target_language_code).order_by('id').first()
+        )
 
         if not memory_asset:
             return Response(
@@ -619,6 +634,7 @@ class MemoryUpdateAPIBySourceAndTargetLanguage(APIView):
             )
 
         processed_records = []
+        processed_memories = []
         errors = []
 
         # Process each row
@@ -634,14 +650,20 @@ class MemoryUpdateAPIBySourceAndTargetLanguage(APIView):
 
             try:
                 memory, created = Memory.objects.update_or_create(
-                    source_language=LANGUAGE_CODES.get(source_language, 'en'),
-                    target_language=LANGUAGE_CODES.get(target_language, 'fr'),
-                    source_text=original_text,
+                    source_language=source_language_code,
+                    target_language=target_language_code,
+                    source_hash=source_text_hash(original_text),
                     defaults={
+                        "source_text": original_text,
                         "target_text": translated_text,
                         "memory_asset": memory_asset,
+                        # A translator's edit replaces any machine translation stored for the text
+                        "is_machine_translation": False,
+                        "mt_model": "",
+                        "translated_at": None,
                     },
                 )
+                processed_memories.append(memory)
                 processed_records.append({
                     "id": memory.id,
                     "source_language": memory.source_language,
@@ -653,6 +675,9 @@ class MemoryUpdateAPIBySourceAndTargetLanguage(APIView):
             except Exception as e:
                 errors.append({"error": str(e), "row": row})
 
+        bump_pair_versions([(source_language_code, target_language_code)])
+        index_memories(processed_memories)
+
         # Prepare the response
         response_data = {
             "message": f"{len([r for r in processed_records if r['status'] == 'updated'])} rows updated and "
@@ -824,7 +849,7 @@ class DuplicateMemory(APIView):
                 )
 
             # Convert comma-separated string to a list of target languages
-            target_languages = [lang.strip() for lang in target_languages_str.split(",") if lang.strip()]
+            target_languages = parse_target_languages(target_languages_str)
             if not target_languages:
                 return Response(
                     {"error": "Invalid target languages provided"},
@@ -832,25 +857,25 @@ class DuplicateMemory(APIView):
                 )
 
             # Check if a MemoryAsset already exists with the same source_language and target_languages
-            existing_memory_asset = MemoryAsset.objects.filter(
-                source_language=original_memory_asset.source_language,
-                target_languages=target_languages_str,
+            existing_memory_asset = MemoryAsset.objects.with_target_languages(
+                original_memory_asset.source_language, target_languages
             ).first()
 
             # Use the existing memory asset or create a new one
             if existing_memory_asset:
                 new_memory_asset = existing_memory_asset
             else:
-                new_memory_asset = MemoryAsset.objects.create(
+                new_memory_asset = MemoryAsset(
                     name=f"duplicate_{original_memory_asset.name}",
                     source_language=original_memory_asset.source_language,
-                    target_languages=target_languages_str,
                 )
+                new_memory_asset.set_target_languages(target_languages)
 
             # Fetch memory records for the original memory asset
             memories = Memory.objects.filter(memory_asset=original_memory_asset)
 
             # Duplicate memory records
+            created_memories = []
             for memory in memories:
                 for target_language in target_languages:
                     # Check if a memory record with the same source_text exists
@@ -858,16 +883,19 @@ class DuplicateMemory(APIView):
                         memory_asset=new_memory_asset,
                         source_language=memory.source_language,
                         target_language=target_language,
-                        source_text=memory.source_text,
+                        source_hash=memory.source_hash,
                     ).exists()
 
                     if not existing_memory:
-                        Memory.objects.create(
+                        created_memories.append(Memory.objects.create(
                             memory_asset=new_memory_asset,
                             source_language=memory.source_language,
                             target_language=target_language,
                             source_text=memory.source_text,
-                        )
+                        ))
+
+            bump_pair_versions((original_memory_asset.source_language, lang) for lang in target_languages)
+            index_memories(created_memories)
 
             return Response(
                 {"message": "Memory asset duplicated successfully"},
@@ -894,7 +922,10 @@ class MemoryBulkDeleteAPI(APIView):
 
         try:
             # Delete the specified Memory records
-            deleted_count, _ = Memory.objects.filter(id__in=memory_ids).delete()
+            memories = Memory.objects.filter(id__in=memory_ids)
+            pairs = memory_pairs(memories)
+            deleted_count, _ = memories.delete()
+            bump_pair_versions(pairs)
 
             if deleted_count == 0:
                 return Response(
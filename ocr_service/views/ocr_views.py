@@ -1,15 +1,13 @@
 import os
 import mimetypes
-import requests
 from docx import Document
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
-import time
+import asyncio
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
-import xml.etree.ElementTree as ET
 import spacy
 from spacy.cli import download
 from django.http import FileResponse
@@ -17,14 +15,26 @@ from trtokenizer import SentenceTokenizer
 from ..models import Memory
 from ..models import MemoryAsset
 from ..models import Settings
+from ..models import OcrTask
+from ..models.memory_models import source_text_hash
+from ..services.memory_cache import find_exact_many, pair_cache, preferred
+from ..services.memory_fuzzy import find_fuzzy_many
+from ..services.gpt_translate import iter_translated_batches, translate_texts
+from ..services.mt_writeback import mt_buffer
+from ..services.ocr_tasks import get_task, refresh_task, register_task
+from ..services.ocr_events import task_state, task_watcher
+from ..services.result_store import result_store
+from ..services.ocr_cache import cache_key, file_hash, ocr_cache
+from ..services.ocr_engines import ENGINES, get_engine
+from ..services.ocr_shards import submit_sharded
+from ..services.text_layer import build_docx, text_layer_pages
 import json
 import openai
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
 
-# ABBYY Cloud OCR credentials
-application_id = '88bff69a-a1ab-453c-9b8c-1dfdd03de30c'
-password = 'fVXQz2zQlLRktS7gLX9ZiIWo'
-base_url = 'https://cloud-westus.ocrsdk.com'
 # Function to detect if the file is PDF or an image
 
 LANGUAGE_CODES = {
@@ -242,6 +252,13 @@ nlp = load_spacy_model("en_core_web_sm")
 sentence_tokenizer = SentenceTokenizer()  # Initialize trtokenizer for Turkish
 
 
+def split_sentences(text, language_code):
+    """Sentences of a text with the models loaded above: trtokenizer for Turkish, spaCy otherwise."""
+    if language_code == 'tr':
+        return list(sentence_tokenizer.tokenize(text))
+    return [sentence.text for sentence in nlp(text).sents]
+
+
 def detect_file_type(file_path):
     mime_type, _ = mimetypes.guess_type(file_path)
     if mime_type == "application/pdf":
@@ -251,82 +268,24 @@ def detect_file_type(file_path):
     else:
         return None
 
-# Function to parse XML responses and extract taskId, status, and resultUrl
-def parse_xml_response(response_text):
-    root = ET.fromstring(response_text)
-    task_element = root.find('task')
-    if task_element is not None:
-        return {
-            'taskId': task_element.attrib.get('id'),
-            'status': task_element.attrib.get('status'),
-            'resultUrl': task_element.attrib.get('resultUrl'),
-            'estimatedProcessingTime': task_element.attrib.get('estimatedProcessingTime')
-        }
-    return None
-
-# Submit file to ABBYY OCR
-def submit_file_for_ocr(file, file_type, language):
-    url = f'{base_url}/processImage'
-    auth = (application_id, password)
-    files = {'file': file}
-    data = {
-        'language': language,
-        'exportFormat': 'docx',
-        'textType': 'normal,handprinted,gothic,typewriter,cmc7',
-        'correctSkew': 'true',
-        'correctOrientation': 'true',
-        'imageSource': 'auto'
-    }
-    response = requests.post(url, files=files, auth=auth, data=data)
-    response.raise_for_status()
-    return parse_xml_response(response.text)
-
-# Function to save OCR result as DOCX file
-def get_ocr_result(task_id, output_docx_path):
-    url = f'{base_url}/getTaskStatus'
-    auth = (application_id, password)
-    params = {'taskId': task_id}
-
-    while True:
-        response = requests.get(url, params=params, auth=auth)
-        response.raise_for_status()
-        parsed_response = parse_xml_response(response.text)
-
-        if parsed_response is None:
-            return None
-
-        status = parsed_response.get('status', 'Unknown')
-
-        if status == 'Completed':
-            result_url = parsed_response.get('resultUrl', None)
-            if result_url:
-                docx_response = requests.get(result_url)
-                with open(output_docx_path, 'wb') as f:
-                    f.write(docx_response.content)
-                return output_docx_path
-        elif status == 'ProcessingFailed':
-            return None
-        time.sleep(5)
-
-# Main function to submit the file, extract text, and convert to DOCX
-def convert_pdf_to_docx(file, output_docx_path, source_language):
-    file_type = detect_file_type(file.name)
-    if not file_type:
-        return
-
-    ocr_response = submit_file_for_ocr(file, file_type, source_language)
-    if ocr_response and 'taskId' in ocr_response:
-        get_ocr_result(ocr_response['taskId'], output_docx_path)
-
 def create_translated_file(input_path, output_path, target_language, source_language):
     """
     Translates a Word document's content by replacing text based on memory entries.
+
+    A source text stored more than once is replaced by its oldest translation,
+    preferring a translator's over a machine one (memory_cache.preferred), with
+    or without the pair cache.
     """
     def replace_text_in_runs(runs, memory_dict):
         # Replace text directly using the dictionary for efficiency
         for run in runs:
             if run.text in memory_dict:
                 run.text = memory_dict[run.text]
+            elif memory_lookup is not None and run.text:
+                # Cached pair map, keyed by source hash; only exact source text replaces the run
+                match = memory_lookup.get(source_text_hash(run.text))
+                if match and match[2] and match[1] == run.text:
+                    run.text = match[2]
 
     def replace_text_in_paragraphs(paragraphs, memory_dict):
         for para in paragraphs:
@@ -341,12 +300,22 @@ def create_translated_file(input_path, output_path, target_language, source_lang
     # Load the document
     doc = Document(input_path)
     
-    # Pre-load memory entries into a dictionary for faster lookups
-    memories = Memory.objects.filter(
-        source_language=source_language,
-        target_language=target_language
-    ).exclude(target_text='')
-    memory_dict = {memory.source_text: memory.target_text for memory in memories}
+    # Memory entries come from the per-pair cache, reloaded only after the pair was written to
+    memory_lookup = pair_cache.get(source_language, target_language)
+    if memory_lookup is not None:
+        memory_dict = {}
+    else:
+        # Pair too large for the cache budget, pre-load it into a dictionary for this document
+        memories = Memory.objects.filter(
+            source_language=source_language,
+            target_language=target_language
+        ).exclude(target_text='').order_by('id').values_list('id', 'source_text', 'target_text', 'is_machine_translation')
+        best = {}
+        for memory in memories:
+            current = best.get(memory[1])
+            if current is None or preferred(memory, current):
+                best[memory[1]] = memory
+        memory_dict = {source_text: memory[2] for source_text, memory in best.items()}
 
     # Replace text in paragraphs
     replace_text_in_paragraphs(doc.paragraphs, memory_dict)
@@ -434,18 +403,32 @@ def extract_sentences_for_translation(docx_path, language="turkish"):
 
     return extracted_text
 
-def format_extracted_sentences(extracted_sentences, memories):
+def format_extracted_sentences(extracted_sentences, source_language, target_language, fuzzy_min_score=None):
     formatted_sentences = []
-    
+
+    # Resolve every sentence of the document in one batched match stage
+    matches = find_exact_many(source_language, target_language, extracted_sentences.keys())
+
+    # Sentences without an exact match get the best fuzzy match above the minimum score
+    misses = [sentence for sentence in extracted_sentences.keys() if sentence not in matches]
+    fuzzy_matches = find_fuzzy_many(source_language, target_language, misses, min_score=fuzzy_min_score) if misses else {}
+
     for idx, sentence in enumerate(extracted_sentences.keys(), start=1):
         # Find the corresponding memory entry for the sentence
-        matching_memory = memories.filter(source_text=sentence).first()
+        matching_memory = matches.get(sentence)
+        match_score = 1.0 if matching_memory else None
+        if not matching_memory and sentence in fuzzy_matches:
+            best = fuzzy_matches[sentence][0]
+            matching_memory = (best["id"], best["source_text"], best["target_text"], best["is_machine_translation"])
+            match_score = best["score"]
         
         # Append the formatted object with an ID to the list
         formatted_sentences.append({
             "id": idx,  # Unique ID for each sentence
             "originalText": sentence,
-            "translatedText": matching_memory.target_text if matching_memory else ""  # Use target_text if available
+            "translatedText": matching_memory[2] if matching_memory else "",  # Use target_text if available
+            "matchScore": match_score,  # 1.0 for exact matches, similarity for fuzzy ones
+            "machineTranslation": matching_memory[3] if matching_memory else None,  # MT saved from an earlier run
         })
     
     return formatted_sentences
@@ -465,94 +448,266 @@ class ConvertPDFToDocxAPI(APIView):
         if not file_type:
             return Response({'error': 'Unsupported file type'}, status=status.HTTP_400_BAD_REQUEST)
 
+        target_language = request.data.get('targetLanguage', '')
+        try:
+            shard_pages = int(request.data.get('shardPages') or settings.OCR_SHARD_PAGES)
+        except ValueError:
+            return Response({'error': 'shardPages must be a number of pages'}, status=status.HTTP_400_BAD_REQUEST)
+        engine = request.data.get('engine') or settings.OCR_ENGINE
+        if engine not in ENGINES:
+            return Response({'error': f"engine must be one of {', '.join(ENGINES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            # Submit the file to ABBYY OCR
-            ocr_response = submit_file_for_ocr(file, file_type, source_language)
+            # The same bytes recognized with the same settings before are served from the result store
+            content_hash = file_hash(file) if settings.OCR_CACHE_ENABLED else ''
+            key = cache_key(content_hash, source_language, engine) if content_hash else ''
+            result_hash = ocr_cache.lookup(key) if key else None
+            if result_hash:
+                task = ocr_cache.completed_task(result_hash, key, file.name, source_language, target_language)
+                return Response({
+                    'taskId': task.task_id,
+                    'estimatedProcessingTime': '0',
+                    'cached': True
+                }, status=200)
+
+            # Pages of born-digital PDFs are read from their text layer, only image-only pages need OCR
+            local_pages = {}
+            if file_type == 'pdf' and settings.OCR_TEXT_LAYER_ENABLED:
+                pages = text_layer_pages(file.read())
+                file.seek(0)
+                if pages and all(paragraphs is not None for paragraphs in pages):
+                    result_hash = result_store.put_file(build_docx(pages, result_store.temporary_path()))
+                    task = ocr_cache.completed_task(
+                        result_hash, key, file.name, source_language, target_language, prefix='local'
+                    )
+                    ocr_cache.store(task)
+                    return Response({
+                        'taskId': task.task_id,
+                        'estimatedProcessingTime': '0',
+                        'textLayer': True
+                    }, status=200)
+                local_pages = {page: paragraphs for page, paragraphs in enumerate(pages) if paragraphs is not None}
+
+            # Large PDFs can go out as concurrent page-range ABBYY tasks under one parent task
+            if engine == 'abbyy' and file_type == 'pdf' and (shard_pages > 0 or local_pages):
+                task = submit_sharded(
+                    file.read(), shard_pages, file.name, source_language, target_language, key, local_pages
+                )
+                file.seek(0)
+                if task is not None:
+                    return Response({
+                        'taskId': task.task_id,
+                        'estimatedProcessingTime': task.estimated_processing_time or '5000',
+                        'shards': task.shard_count
+                    }, status=200)
+
+            # Submit the file to the OCR engine
+            try:
+                ocr_response = get_engine(engine).submit(file, file_type, source_language, local_pages)
+            except Exception as e:
+                print(f"OCR submit to {engine} failed: {e}")
+                ocr_response = None
             print(ocr_response, 'this is the ocr response')
+            fallback = settings.OCR_ENGINE_FALLBACK
+            if (not ocr_response or 'taskId' not in ocr_response) and fallback and fallback != engine:
+                # ABBYY down or out of credits, recognize the file with the fallback engine instead
+                engine = fallback
+                key = cache_key(content_hash, source_language, engine) if content_hash else ''
+                file.seek(0)
+                ocr_response = get_engine(engine).submit(file, file_type, source_language, local_pages)
             if not ocr_response or 'taskId' not in ocr_response:
                 return Response({'error': 'Failed to process the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            register_task(
+                ocr_response,
+                file_name=file.name,
+                source_language=source_language,
+                target_language=target_language,
+                cache_key=key,
+                engine=engine,
+            )
 
             # Return taskId and estimated processing time
             return Response({
                 'taskId': ocr_response['taskId'],
-                'estimatedProcessingTime': ocr_response.get('estimatedProcessingTime', '5000')
+                'estimatedProcessingTime': ocr_response.get('estimatedProcessingTime', '5000'),
+                'engine': engine
             }, status=200)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Hit/miss counters of the OCR result cache in this process
+class OcrCacheStatsAPI(APIView):
+    def get(self, request, *args, **kwargs):
+        return Response(ocr_cache.stats(), status=200)
+
 # Get Task Status API
 class GetTaskStatusAPI(APIView):
     def get(self, request, *args, **kwargs):
         task_id = request.query_params.get('taskId')
         source_language = request.query_params.get('source_language')
         target_language = request.query_params.get('target_language')  # Corrected typo
+        fuzzy_min_score = request.query_params.get('fuzzy_min_score')
 
         if not task_id:
             return Response({'error': 'Task ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-
-        url = f'{base_url}/getTaskStatus'
-        auth = (application_id, password)
-        params = {'taskId': task_id}
+        try:
+            fuzzy_min_score = float(fuzzy_min_score) if fuzzy_min_score else None
+            if fuzzy_min_score is not None and not 0 <= fuzzy_min_score <= 1:
+                raise ValueError(fuzzy_min_score)
+        except ValueError:
+            return Response({'error': 'fuzzy_min_score must be a number between 0 and 1'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         # Use LANGUAGE_CODES to map the languages
-        memories = Memory.objects.filter(
-            source_language=LANGUAGE_CODES.get(source_language, 'en'),
-            target_language=LANGUAGE_CODES.get(target_language, 'fr')  # Corrected typo here
-        )
+        source_language_code = LANGUAGE_CODES.get(source_language, 'en')
+        target_language_code = LANGUAGE_CODES.get(target_language, 'fr')  # Corrected typo here
 
         try:
-            response = requests.get(url, params=params, auth=auth)
-            response.raise_for_status()
-            parsed_response = parse_xml_response(response.text)
-
-            if parsed_response is None:
-                return Response({'error': 'Invalid response from ABBYY'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            status = parsed_response.get('status')
-            if status == 'Completed':
-                # Fetch the result file and process it
-                result_url = parsed_response.get('resultUrl')
-                if not result_url:
-                    return Response({'error': 'Result URL not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            # Answered from the registry, ABBYY is asked at most once per OCR_POLL_INTERVAL per task
+            try:
+                task = refresh_task(get_task(task_id))
+            except OcrTask.DoesNotExist:
+                return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
 
-                output_docx_path = 'result_file.docx'
-                docx_response = requests.get(result_url)
-                with open(output_docx_path, 'wb') as f:
-                    f.write(docx_response.content)
+            if task.status == 'Completed':
+                output_docx_path = result_store.get(task.result_hash)
+                if output_docx_path is None:
+                    return Response({'error': 'Result expired, submit the file again'}, status=status.HTTP_410_GONE)
 
                 # Extract text and format it for frontend
                 extracted_sentences = extract_sentences_for_translation(output_docx_path)
-                response_data = format_extracted_sentences(extracted_sentences, memories)
-                return Response({"data": response_data, "status": status}, status=200)
+                response_data = format_extracted_sentences(
+                    extracted_sentences,
+                    source_language_code,
+                    target_language_code,
+                    fuzzy_min_score=fuzzy_min_score,
+                )
+                return Response({"data": response_data, "status": task.status}, status=200)
+
+            if task.is_terminal:
+                return Response({'error': f'OCR task {task.status}', 'status': task.status},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+            # A failed poll is retried next interval, the client keeps polling as before
             return Response({
-                'taskId': parsed_response.get('taskId'),
-                'status': parsed_response.get('status'),
-                'estimatedProcessingTime': parsed_response.get('estimatedProcessingTime')
+                'taskId': task.task_id,
+                'status': task.status,
+                'estimatedProcessingTime': task.estimated_processing_time or None,
+                'error': task.error,
             }, status=200)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Task status pushed to the client, served without a worker thread under ASGI
+class TaskStatusEventsView(View):
+    STREAM_CONTENT_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+    async def get(self, request, *args, **kwargs):
+        task_id = request.GET.get('taskId')
+        stream_format = request.GET.get('stream', 'sse')
+
+        if not task_id:
+            return JsonResponse({'error': 'Task ID is required'}, status=400)
+        if stream_format not in self.STREAM_CONTENT_TYPES:
+            return JsonResponse({'error': 'Invalid stream format, use ndjson or sse.'}, status=400)
+        if not await OcrTask.objects.filter(task_id=task_id).aexists():
+            return JsonResponse({'error': 'Task not found'}, status=404)
+
+        response = StreamingHttpResponse(
+            self.stream_status(stream_format, task_id),
+            content_type=self.STREAM_CONTENT_TYPES[stream_format],
+        )
+        # Keep proxies from buffering the frames
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream_status(self, stream_format, task_id):
+        """
+        A "status" frame now and on every status change, a "heartbeat" every
+        OCR_STATUS_HEARTBEAT_INTERVAL seconds in between, then "done" once the
+        task is terminal or OCR_STATUS_STREAM_TIMEOUT has passed.
+        The Completed task's extracted text is fetched from memory/tasks/ as before.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.OCR_STATUS_STREAM_TIMEOUT
+        known_status = None
+        while True:
+            timeout = min(settings.OCR_STATUS_HEARTBEAT_INTERVAL, deadline - loop.time())
+            state = await task_watcher.wait(task_id, known_status, timeout=max(timeout, 0))
+            if state is None:
+                if loop.time() >= deadline:
+                    yield stream_frame(stream_format, "done", {"taskId": task_id, "status": known_status})
+                    return
+                yield stream_frame(stream_format, "heartbeat", {"taskId": task_id})
+                continue
+
+            known_status = state['status']
+            yield stream_frame(stream_format, "status", state)
+            if state['terminal']:
+                yield stream_frame(stream_format, "done", {"taskId": task_id, "status": known_status})
+                return
+
+
+# Long-poll variant: answers once the status differs from `status`, or after `timeout` seconds
+class TaskStatusWaitView(View):
+    async def get(self, request, *args, **kwargs):
+        task_id = request.GET.get('taskId')
+        known_status = request.GET.get('status')
+
+        if not task_id:
+            return JsonResponse({'error': 'Task ID is required'}, status=400)
+        try:
+            timeout = min(float(request.GET.get('timeout', settings.OCR_LONG_POLL_TIMEOUT)),
+                          settings.OCR_LONG_POLL_TIMEOUT)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid timeout'}, status=400)
+        if not await OcrTask.objects.filter(task_id=task_id).aexists():
+            return JsonResponse({'error': 'Task not found'}, status=404)
+
+        state = await task_watcher.wait(task_id, known_status, timeout=timeout)
+        if state is None:
+            # Unchanged, straight from the registry
+            state = task_state(await sync_to_async(get_task)(task_id))
+        return JsonResponse(state, status=200)
+
+def task_result_path(task_id):
+    """The stored OCR result of a completed task, or an error Response."""
+    task = OcrTask.objects.filter(task_id=task_id).first()
+    if task is None or not task.result_hash:
+        return None, Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+    result_path = result_store.get(task.result_hash)
+    if result_path is None:
+        return None, Response({'error': 'Result expired, submit the file again'}, status=status.HTTP_410_GONE)
+    return result_path, None
+
+
+def download_name(task_id, suffix=''):
+    task = OcrTask.objects.filter(task_id=task_id).first()
+    base = os.path.splitext(task.file_name)[0] if task and task.file_name else task_id
+    return f"{base}{suffix}.docx"
+
+
 # API View for downloading the original DOCX document
 class DownloadOriginalDocxAPI(APIView):
     def get(self, request, *args, **kwargs):
-        output_docx_path = 'result_file.docx'
-        
-        # Check if the file exists
-        if not os.path.exists(output_docx_path):
-            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        task_id = request.query_params.get('taskId')
+        if not task_id:
+            return Response({'error': 'Task ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        output_docx_path, error_response = task_result_path(task_id)
+        if error_response is not None:
+            return error_response
 
         # Return the file as a downloadable attachment
-        response = FileResponse(open(output_docx_path, 'rb'), as_attachment=True)
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(output_docx_path)}"'
-        return response
+        return FileResponse(open(output_docx_path, 'rb'), as_attachment=True, filename=download_name(task_id))
 
 # API View for downloading the translated DOCX document
 class DownloadReplacedDocxAPI(APIView):
     def get(self, request, *args, **kwargs):
-        # Define paths and parameters
-        output_docx_path = 'result_file.docx'  # Input DOCX file
-        replaced_output_docx_path = 'replaced_design_original_file_name.docx'  # Output DOCX file
+        task_id = request.query_params.get('taskId')
+        if not task_id:
+            return Response({'error': 'Task ID is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Get target and source languages as human-readable names from query params
         target_language_name = request.query_params.get('target_language', 'English')  # Default to English
@@ -563,37 +718,67 @@ class DownloadReplacedDocxAPI(APIView):
         source_language = LANGUAGE_CODES.get(source_language_name, 'fr')  # Default to 'fr' if not found
 
         # Ensure the input file exists before proceeding
-        if not os.path.exists(output_docx_path):
-            return Response({'error': 'Original file not found'}, status=status.HTTP_404_NOT_FOUND)
+        output_docx_path, error_response = task_result_path(task_id)
+        if error_response is not None:
+            return error_response
 
-        # Call the create_translated_file function
+        # Built next to the store and moved in, concurrent downloads never share a file
+        replaced_output_docx_path = result_store.temporary_path()
         try:
             create_translated_file(output_docx_path, replaced_output_docx_path, target_language, source_language)
+            replaced_output_docx_path = result_store.get(result_store.put_file(replaced_output_docx_path))
         except Exception as e:
+            if os.path.exists(replaced_output_docx_path):
+                os.remove(replaced_output_docx_path)
             return Response({'error': f'Error generating replaced file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Check if the replaced file was created successfully
-        if not os.path.exists(replaced_output_docx_path):
-            return Response({'error': 'Replaced file not found'}, status=status.HTTP_404_NOT_FOUND)
-
         # Return the replaced file as a downloadable attachment
-        response = FileResponse(open(replaced_output_docx_path, 'rb'), as_attachment=True)
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(replaced_output_docx_path)}"'
-        return response
+        return FileResponse(
+            open(replaced_output_docx_path, 'rb'), as_attachment=True, filename=download_name(task_id, f'_{target_language}')
+        )
+
+def translated_record(source_text, translated_text, origin):
+    return {
+        "source_text": source_text,
+        "target_text": translated_text,
+        "source": origin,  # "tm" for an exact memory match, "gpt" for a model translation
+        "gptGenerated": origin == "gpt"  # Add this flag to indicate translation by GPT
+    }
+
+
+def stream_frame(stream_format, kind, payload):
+    """One NDJSON line, or one Server-Sent Event named after the frame kind."""
+    if stream_format == "sse":
+        return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"type": kind, **payload}) + "\n"
+
+
+def openai_error_message(error):
+    if isinstance(error, openai.error.OpenAIError):
+        return f"OpenAI API error: {error}"
+    return str(error)
+
 
 class TranslateRecordsView(APIView):
+    STREAM_CONTENT_TYPES = {
+        "ndjson": "application/x-ndjson",
+        "sse": "text/event-stream",
+    }
+
     def post(self, request):
         # Validate required parameters
         file = request.FILES.get('file')
         source_language = request.POST.get('source_language')
         target_language = request.POST.get('target_language')
         gpt_key = request.POST.get('gptKey')
+        # Optional streaming mode: "ndjson" or "sse"
+        stream_format = request.POST.get('stream') or request.GET.get('stream')
 
         if not all([file, source_language, target_language, gpt_key]):
             return JsonResponse({"error": "Missing file or required parameters."}, status=400)
 
-        # Set the OpenAI API key
-        openai.api_key = gpt_key
+        if stream_format and stream_format not in self.STREAM_CONTENT_TYPES:
+            return JsonResponse({"error": "Invalid stream format, use ndjson or sse."}, status=400)
 
         # Process the uploaded file
         try:
@@ -616,24 +801,49 @@ class TranslateRecordsView(APIView):
         if not untranslated_records:
             return JsonResponse({"error": "No valid records to translate."}, status=400)
 
-        # Batch processing for OpenAI API
+        try:
+            # Each distinct text is resolved once: exact TM matches first, GPT only for the rest
+            unique_texts = list(dict.fromkeys(untranslated_records))
+            tm_matches = find_exact_many(source_language_code, target_language_code, unique_texts)
+            translations = {
+                text: (match[2], "tm")
+                for text, match in tm_matches.items() if match[2]
+            }
+            misses = [text for text in unique_texts if text not in translations]
+            print(f"TM pre-filter: {len(untranslated_records)} segments, {len(unique_texts)} distinct, "
+                  f"{len(translations)} from TM, {len(misses)} sent to GPT")
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+        if stream_format:
+            response = StreamingHttpResponse(
+                self.stream_records(
+                    stream_format, untranslated_records, translations, misses,
+                    source_language, target_language, source_language_code, target_language_code, gpt_key,
+                ),
+                content_type=self.STREAM_CONTENT_TYPES[stream_format],
+            )
+            # Keep proxies from buffering the frames
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
         translated_records = []
         try:
-            for source_text in untranslated_records:
-                response = openai.ChatCompletion.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": f"You are a professional translator. Translate the following text from {source_language} to {target_language}. If a translation isn't possible or the text doesn't require translation, return it as it is without adding any unrelated content."},
-                        {"role": "user", "content": source_text}
-                    ],
-                    max_tokens=500,
+            # Concurrent calls to the OpenAI API, bounded by GPT_MAX_CONCURRENCY and the key's rate limits
+            if misses:
+                translated_texts = translate_texts(
+                    misses, source_language, target_language, gpt_key,
+                    split_sentences=lambda text: split_sentences(text, source_language_code),
                 )
-                translated_text = response.choices[0].message['content'].strip()
-                translated_records.append({
-                    "source_text": source_text,
-                    "target_text": translated_text,
-                    "gptGenerated": True  # Add this flag to indicate translation by GPT
-                })
+                for text, translated_text in zip(misses, translated_texts):
+                    translations[text] = (translated_text, "gpt")
+                # Saved to the TM in the background, the response doesn't wait for the inserts
+                mt_buffer.add(source_language_code, target_language_code, zip(misses, translated_texts), settings.GPT_MODEL)
+
+            for source_text in untranslated_records:
+                translated_text, origin = translations[source_text]
+                translated_records.append(translated_record(source_text, translated_text, origin))
 
         except openai.error.OpenAIError as e:
             return JsonResponse({"error": f"OpenAI API error: {e}"}, status=500)
@@ -643,6 +853,72 @@ class TranslateRecordsView(APIView):
         # Return translated records
         return JsonResponse({"translatedRecords": translated_records}, status=200)
 
+    async def stream_records(self, stream_format, untranslated_records, translations, misses,
+                             source_language, target_language, source_language_code, target_language_code, gpt_key):
+        """
+        Frames of a streamed translation: a "record" per input position (with its index)
+        as soon as its text is translated, "progress" after every batch and at least every
+        GPT_STREAM_PROGRESS_INTERVAL seconds, an "error" per failed batch, then "done".
+        Records already sent are kept when a later batch fails.
+
+        An async generator: under ASGI Django collects a sync iterator into a list before
+        sending anything, an async one goes out frame by frame. Batches are awaited in a
+        worker thread.
+        """
+        positions = {}
+        for index, text in enumerate(untranslated_records):
+            positions.setdefault(text, []).append(index)
+        counts = {"total": len(untranslated_records), "translated": 0, "failed": 0}
+
+        def records(text, translated_text, origin):
+            for index in positions[text]:
+                counts["translated"] += 1
+                yield stream_frame(
+                    stream_format, "record", {"index": index, **translated_record(text, translated_text, origin)}
+                )
+
+        # TM matches are known before the first model call
+        for text, (translated_text, origin) in translations.items():
+            for frame in records(text, translated_text, origin):
+                yield frame
+        yield stream_frame(stream_format, "progress", dict(counts))
+
+        batches = iter_translated_batches(
+            misses, source_language, target_language, gpt_key,
+            heartbeat=settings.GPT_STREAM_PROGRESS_INTERVAL,
+            split_sentences=lambda text: split_sentences(text, source_language_code),
+        )
+        next_batch = sync_to_async(next, thread_sensitive=False)
+        try:
+            while True:
+                batch = await next_batch(batches, None)
+                if batch is None:
+                    break
+                items, batch_translations, error = batch
+                if items is None:
+                    yield stream_frame(stream_format, "progress", dict(counts))
+                    continue
+
+                if error is not None:
+                    indices = sorted(index for _, text in items for index in positions[text])
+                    counts["failed"] += len(indices)
+                    yield stream_frame(stream_format, "error", {"error": openai_error_message(error), "indices": indices})
+                else:
+                    finished = [(misses[index], translated_text) for index, translated_text in batch_translations.items()]
+                    # Saved to the TM in the background, like the non-streamed response
+                    mt_buffer.add(source_language_code, target_language_code, finished, settings.GPT_MODEL)
+                    for text, translated_text in finished:
+                        for frame in records(text, translated_text, "gpt"):
+                            yield frame
+                yield stream_frame(stream_format, "progress", dict(counts))
+        except Exception as e:
+            yield stream_frame(stream_format, "error", {"error": openai_error_message(e), "indices": []})
+        finally:
+            # Cancels the batches not started yet when the client went away
+            await sync_to_async(batches.close, thread_sensitive=False)()
+
+        yield stream_frame(stream_format, "done", dict(counts))
+
 class SaveApplicationSettings(APIView):
     def get(self, request, *args, **kwargs):
         """